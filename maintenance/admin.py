@@ -1,6 +1,68 @@
 # Register your models here.
-from django.contrib import admin
-from .models import Equipment, MaintenanceLog, Step
+from django.contrib import admin, messages
+from django.contrib.admin.views.main import ChangeList
+from django.db.models import Count, Min, Q
+from django.http import Http404
+from django.template.response import TemplateResponse
+from django.utils import timezone
+
+from .models import (
+    AlarmCode, Attachment, Equipment, LogRevision, MaintenanceLog, OutboxEvent,
+    Site, Step, WebhookEndpoint,
+)
+from .profiling import ProfileStore, call_tree, top_functions
+from .reliability import NO_FAILURES, describe, metrics_for
+from .revisions import record_revision
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Site scoping: every partitioned model only shows the current site's rows
+# (request.site, switched with the site picker on the main pages)
+# ─────────────────────────────────────────────────────────────────────────────
+class SiteScopedAdmin(admin.ModelAdmin):
+    site_lookup = "site"
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).filter(
+            **{self.site_lookup: getattr(request, "site", None)})
+
+    def get_readonly_fields(self, request, obj=None):
+        fields = tuple(super().get_readonly_fields(request, obj))
+        return fields + ("site",) if self.site_lookup == "site" else fields
+
+    def save_model(self, request, obj, form, change):
+        if self.site_lookup == "site" and obj.site_id is None:
+            obj.site = request.site
+        super().save_model(request, obj, form, change)
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if db_field.name in ("equipment", "log", "step"):
+            lookup = "site" if db_field.name != "step" else "log__site"
+            kwargs["queryset"] = db_field.related_model._default_manager.filter(
+                **{lookup: getattr(request, "site", None)})
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Site Admin (equipment and logs live in the site's database, if it has one)
+# ─────────────────────────────────────────────────────────────────────────────
+@admin.register(Site)
+class SiteAdmin(admin.ModelAdmin):
+    list_display = ("name", "code", "database")
+    search_fields = ("name", "code")
+    filter_horizontal = ("members",)
+
+    def get_readonly_fields(self, request, obj=None):
+        # Moving a site's data between databases is not supported
+        return ("database",) if obj is not None else ()
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        if not change and obj.database:
+            self.message_user(
+                request, f"Run `manage.py migrate --database {obj.database}` and "
+                "`manage.py sync_site_directory` before using this site.",
+                messages.WARNING)
 
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -15,27 +77,84 @@ class StepInline(admin.TabularInline):
     show_change_link = True
 
 
+# ─────────────────────────────────────────────────────────────────────────────
+# Inline: read-only edit history inside the Maintenance Log edit page
+# ─────────────────────────────────────────────────────────────────────────────
+class LogRevisionInline(admin.TabularInline):
+    model = LogRevision
+    fields = ("number", "changed", "is_snapshot", "user", "created_at")
+    readonly_fields = fields
+    ordering = ("-number",)
+    extra = 0
+    can_delete = False
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
 # ─────────────────────────────────────────────────────────────────────────────
 # Equipment Admin
 # ─────────────────────────────────────────────────────────────────────────────
+class EquipmentChangeList(ChangeList):
+    def get_results(self, request):
+        super().get_results(request)
+        # One cached lookup for the page, not one per row and column
+        metrics = (metrics_for(request.site)["equipment"]
+                   if getattr(request, "site", None) else {})
+        for equipment in self.result_list:
+            equipment.reliability = metrics.get(equipment.pk, NO_FAILURES)
+
+
 @admin.register(Equipment)
-class EquipmentAdmin(admin.ModelAdmin):
-    list_display = ("name", "asset_tag", "zone", "status", "updated_at")
+class EquipmentAdmin(SiteScopedAdmin):
+    list_display = ("name", "asset_tag", "zone", "status",
+                    "log_count", "last_log_at", "mtbf", "failure_rate",
+                    "repeat_alarms", "updated_at")
     list_filter = ("status", "zone")
+    readonly_fields = ("log_count", "last_log_at", "reliability_summary")
     search_fields = ("name", "asset_tag", "location", "description")
     ordering = ("zone", "name")
     list_per_page = 25
 
+    def get_changelist(self, request, **kwargs):
+        return EquipmentChangeList
+
+    @admin.display(description="MTBF (h)")
+    def mtbf(self, obj):
+        value = obj.reliability.mtbf_hours
+        return "—" if value is None else f"{value:.1f}"
+
+    @admin.display(description="Failures / 1,000 h")
+    def failure_rate(self, obj):
+        return f"{obj.reliability.failures_per_1000h:.2f}"
+
+    @admin.display(description="Repeat alarms")
+    def repeat_alarms(self, obj):
+        value = obj.reliability.repeat_alarm_percent
+        return "—" if value is None else f"{value:.0f}%"
+
+    @admin.display(description="Reliability")
+    def reliability_summary(self, obj):
+        if obj.pk is None:
+            return "—"
+        metrics = metrics_for(obj.site)
+        return (f"Since {metrics['since']:%Y-%m-%d}: "
+                f"{describe(metrics['equipment'].get(obj.pk, NO_FAILURES))}; "
+                f"zone {obj.zone}: "
+                f"{describe(metrics['zones'].get(obj.zone, NO_FAILURES))}")
+
 
 # ─────────────────────────────────────────────────────────────────────────────
 # Maintenance Log Admin (with Step inline)
 # ─────────────────────────────────────────────────────────────────────────────
 @admin.register(MaintenanceLog)
-class MaintenanceLogAdmin(admin.ModelAdmin):
+class MaintenanceLogAdmin(SiteScopedAdmin):
     list_display = (
         "id", "equipment", "zone", "alarm_code", "alarm_name",
-        "difficulty", "lam_checked", "created_by", "created_at",
+        "difficulty", "lam_checked", "step_count", "total_duration_minutes",
+        "created_by", "created_at",
     )
+    readonly_fields = ("alarm", "step_count", "total_duration_minutes")
     list_filter = ("difficulty", "lam_checked", "zone", "created_at")
     search_fields = (
         "alarm_code", "alarm_name", "description",
@@ -45,7 +164,7 @@ class MaintenanceLogAdmin(admin.ModelAdmin):
     date_hierarchy = "created_at"
     ordering = ("-created_at",)
     list_per_page = 25
-    inlines = [StepInline]
+    inlines = [StepInline, LogRevisionInline]
 
     def get_queryset(self, request):
         # Reduce N+1 queries in list view
@@ -58,8 +177,15 @@ class MaintenanceLogAdmin(admin.ModelAdmin):
             obj.created_by = request.user
         if (obj.zone is None or obj.zone == 0) and obj.equipment and obj.equipment.zone:
             obj.zone = obj.equipment.zone
+        if change:
+            record_revision(obj.pk)  # baseline before this edit
         super().save_model(request, obj, form, change)
 
+    # Steps are saved with the inline, so record the revision after it
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        record_revision(form.instance.pk, request.user)
+
     # Quick action: mark LAM as checked
     @admin.action(description="Mark selected logs as LAM checked")
     def mark_lam_checked(self, request, queryset):
@@ -68,15 +194,31 @@ class MaintenanceLogAdmin(admin.ModelAdmin):
     actions = ["mark_lam_checked"]
 
 
+# ─────────────────────────────────────────────────────────────────────────────
+# Alarm Code Admin (catalog; new codes are added as they are logged)
+# ─────────────────────────────────────────────────────────────────────────────
+@admin.register(AlarmCode)
+class AlarmCodeAdmin(SiteScopedAdmin):
+    list_display = ("code", "name", "default_difficulty", "occurrence_count",
+                    "updated_at")
+    list_filter = ("default_difficulty",)
+    readonly_fields = ("occurrence_count",)
+    search_fields = ("code", "name")
+    ordering = ("code",)
+    list_per_page = 50
+
+
 # ─────────────────────────────────────────────────────────────────────────────
 # Step Admin (standalone view)
 # ─────────────────────────────────────────────────────────────────────────────
 @admin.register(Step)
-class StepAdmin(admin.ModelAdmin):
+class StepAdmin(SiteScopedAdmin):
+    site_lookup = "log__site"
     list_display = ("log", "order", "performed_by", "duration_minutes", "created_at")
     list_filter = ("performed_by",)
     search_fields = ("log__alarm_code", "action", "result", "performed_by__username")
     autocomplete_fields = ("log", "performed_by")
+    list_select_related = ("log__equipment", "performed_by")  # Log.__str__ shows equipment
     ordering = ("log", "order")
 
     def save_model(self, request, obj, form, change):
@@ -85,6 +227,103 @@ class StepAdmin(admin.ModelAdmin):
         super().save_model(request, obj, form, change)
 
 
+# ─────────────────────────────────────────────────────────────────────────────
+# Attachment Admin (files are uploaded from the log detail page)
+# ─────────────────────────────────────────────────────────────────────────────
+@admin.register(Attachment)
+class AttachmentAdmin(SiteScopedAdmin):
+    site_lookup = "log__site"
+    list_display = ("original_name", "log", "step", "content_type", "size",
+                    "uploaded_by", "created_at")
+    list_filter = ("content_type",)
+    search_fields = ("original_name", "sha256", "log__alarm_code")
+    readonly_fields = ("sha256", "size", "content_type", "original_name",
+                       "uploaded_by", "created_at")
+    autocomplete_fields = ("log", "step")
+    list_select_related = ("log__equipment", "step", "uploaded_by")
+
+    def has_add_permission(self, request):
+        return False
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Webhooks (events are queued by maintenance.outbox, sent by deliver_webhooks)
+# ─────────────────────────────────────────────────────────────────────────────
+@admin.register(WebhookEndpoint)
+class WebhookEndpointAdmin(SiteScopedAdmin):
+    list_display = ("name", "url", "is_active", "hard_logs", "equipment_down",
+                    "pending", "oldest_pending", "delivered_count",
+                    "failed_requests", "dropped_count", "last_delivered_at",
+                    "last_latency_ms", "last_error")
+    list_filter = ("is_active",)
+    readonly_fields = WebhookEndpoint.COUNTER_FIELDS
+    search_fields = ("name", "url")
+
+    def get_queryset(self, request):
+        pending = Q(events__state=OutboxEvent.State.PENDING)
+        return super().get_queryset(request).annotate(
+            pending_count=Count("events", filter=pending),
+            oldest_pending_at=Min("events__created_at", filter=pending))
+
+    @admin.display(description="Pending", ordering="pending_count")
+    def pending(self, obj):
+        return obj.pending_count
+
+    @admin.display(description="Oldest pending", ordering="oldest_pending_at")
+    def oldest_pending(self, obj):
+        return obj.oldest_pending_at or "—"
+
+
+@admin.register(OutboxEvent)
+class OutboxEventAdmin(SiteScopedAdmin):
+    list_display = ("id", "event", "endpoint", "state", "attempts",
+                    "next_attempt_at", "created_at", "delivered_at", "last_error")
+    list_filter = ("state", "event")
+    search_fields = ("endpoint__name",)
+    readonly_fields = ("endpoint", "event", "payload", "state", "attempts",
+                       "next_attempt_at", "last_error", "created_at", "delivered_at")
+    list_select_related = ("endpoint",)
+    ordering = ("-id",)
+    list_per_page = 50
+
+    def has_add_permission(self, request):
+        return False
+
+    @admin.action(description="Send the selected events again")
+    def send_again(self, request, queryset):
+        queued = queryset.exclude(state=OutboxEvent.State.PENDING).update(
+            state=OutboxEvent.State.PENDING, attempts=0,
+            next_attempt_at=timezone.now(), delivered_at=None, last_error="")
+        self.message_user(request, f"{queued} event(s) queued again.")
+    actions = ["send_again"]
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Profile browser (captures from ProfilingMiddleware; wired in project urls)
+# ─────────────────────────────────────────────────────────────────────────────
+def profile_list_view(request):
+    return TemplateResponse(request, "admin/maintenance/profile_list.html", {
+        **admin.site.each_context(request),
+        "title": "Request profiles",
+        "profiles": ProfileStore().list(),
+    })
+
+
+def profile_detail_view(request, profile_id):
+    store = ProfileStore()
+    meta = store.meta(profile_id)
+    if meta is None:
+        raise Http404("Profile not found (it may have been evicted).")
+    stats = store.stats(profile_id)
+    return TemplateResponse(request, "admin/maintenance/profile_detail.html", {
+        **admin.site.each_context(request),
+        "title": f"Profile {meta.get('url_name') or meta.get('path')}",
+        "meta": meta,
+        "tree": call_tree(stats),
+        "top": top_functions(stats),
+    })
+
+
 # ─────────────────────────────────────────────────────────────────────────────
 # Optional: brand the admin
 # ─────────────────────────────────────────────────────────────────────────────
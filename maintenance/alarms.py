@@ -0,0 +1,120 @@
+"""Alarm code catalog and its type-ahead.
+
+- link_alarm: on save, points a log at the AlarmCode entry for its
+  alarm_code, creating the entry (named after the log) the first time a code
+  is logged at a site.
+- PrefixIndex: sorted keys (the code, the whole name, each word of the name)
+  of every entry; a lookup is two bisects over the keys plus ranking the
+  matches: code matches first, then name matches, most logged first.
+- suggest: type-ahead for a site. Each worker keeps one index per site in
+  memory and rebuilds it when an entry is saved or deleted (a version stamp
+  shared by every worker, see maintenance.cache, bumped by
+  maintenance.signals) or ALARM_INDEX_TTL seconds have passed, which also
+  picks up changed occurrence counts.
+"""
+
+import re
+import time
+from bisect import bisect_left
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import router
+
+from .cache import bump_version, current_version
+from .models import AlarmCode, MaintenanceLog
+
+SUGGEST_LIMIT = 10
+_WORD = re.compile(r"\w+")
+
+_indexes: Dict[int, Tuple[float, Any, "PrefixIndex"]] = {}
+
+
+def normalize(code: str) -> str:
+    return (code or "").strip().upper()
+
+
+def link_alarm(log: MaintenanceLog, using: Optional[str] = None) -> bool:
+    """Link ``log`` to its catalog entry; returns whether the log changed."""
+    if (log.alarm_id is not None
+            and log.alarm_code == getattr(log, "_loaded_alarm_code", None)):
+        return False
+    code = normalize(log.alarm_code)
+    if not code or log.site_id is None:
+        changed = log.alarm_id is not None
+        log.alarm = None
+        return changed
+    using = using or router.db_for_write(MaintenanceLog, instance=log)
+    entry, _ = AlarmCode.objects.using(using).get_or_create(
+        site_id=log.site_id, code=code,
+        defaults={"name": (log.alarm_name or "").strip(),
+                  "default_difficulty": log.difficulty or ""})
+    log.alarm = entry
+    if not log.alarm_name and entry.name:
+        log.alarm_name = entry.name
+    return True
+
+
+class PrefixIndex:
+    def __init__(self, entries: Iterable[Dict[str, Any]]):
+        rows = []
+        for entry in entries:
+            rank = -entry["count"]
+            rows.append((entry["code"].lower(), 0, rank, entry["code"], entry))
+            name = entry["name"].lower()
+            if name:
+                rows.append((name, 1, rank, entry["code"], entry))
+                for word in set(_WORD.findall(name)) - {name}:
+                    rows.append((word, 2, rank, entry["code"], entry))
+        rows.sort(key=lambda row: row[:4])
+        self._keys = [row[0] for row in rows]
+        self._rows = rows
+
+    def __len__(self) -> int:
+        return len({row[3] for row in self._rows})
+
+    def search(self, prefix: str, limit: int = SUGGEST_LIMIT) -> List[Dict[str, Any]]:
+        prefix = prefix.strip().lower()
+        if not prefix:
+            return []
+        lo = bisect_left(self._keys, prefix)
+        hi = bisect_left(self._keys, prefix + "\U0010ffff", lo)
+        found, seen = [], set()
+        for row in sorted(self._rows[lo:hi], key=lambda row: row[1:4]):
+            if row[3] not in seen:
+                seen.add(row[3])
+                found.append(row[4])
+                if len(found) >= limit:
+                    break
+        return found
+
+
+def _stamp(site_id: int) -> str:
+    return f"maintenance:alarms:{site_id}"
+
+
+def invalidate_alarms(site_id: int) -> None:
+    bump_version(_stamp(site_id))
+    _indexes.pop(site_id, None)
+
+
+def index_for(site) -> PrefixIndex:
+    """The site's index, rebuilt if stale; the site must be the current one."""
+    ttl = getattr(settings, "ALARM_INDEX_TTL", 300)
+    version = current_version(_stamp(site.pk))
+    held = _indexes.get(site.pk)
+    if (held is not None and held[1] == version
+            and time.monotonic() - held[0] < ttl):
+        return held[2]
+    index = PrefixIndex(
+        {"code": code, "name": name, "difficulty": difficulty, "count": count}
+        for code, name, difficulty, count in AlarmCode.objects
+        .filter(site=site)
+        .values_list("code", "name", "default_difficulty", "occurrence_count")
+        .iterator(chunk_size=2000))
+    _indexes[site.pk] = (time.monotonic(), version, index)
+    return index
+
+
+def suggest(site, prefix: str, limit: int = SUGGEST_LIMIT) -> List[Dict[str, Any]]:
+    return index_for(site).search(prefix, limit)
@@ -0,0 +1,263 @@
+"""Photo/file attachments for logs and steps.
+
+- HashingUploadHandler: streams each uploaded file in chunks straight to a
+  temporary file under MEDIA_ROOT, hashing as it goes and skipping any file
+  over ATTACHMENT_MAX_BYTES, so uploads are never buffered in memory.
+- store_upload: moves the upload to its content-addressed path
+  (``attachments/<sha[:2]>/<sha>``); content already stored is discarded.
+- blob_locks / delete_unreferenced: content is deleted with its last
+  Attachment, once that deletion commits. A file lock per content (striped
+  by ``<sha[:2]>``) is held from the reference check to the unlink, and by
+  uploads from store_upload until their Attachments commit, so an upload
+  reusing stored content cannot lose it to a deletion in between.
+- schedule_thumbnail: renders the thumbnail in a process pool once the
+  transaction commits; ``manage.py make_thumbnails`` catches up on any that
+  were lost (e.g. a worker restarted mid-job).
+- serve: response with single-range Range support and immutable caching.
+"""
+
+import atexit
+import hashlib
+import mimetypes
+import multiprocessing
+import os
+import re
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack, contextmanager
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler, SkipFile
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.template.defaultfilters import filesizeformat
+from django.utils.http import content_disposition_header
+
+from .thumbnails import make_thumbnail
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, uploads and deletions are not serialized
+    fcntl = None
+
+ALLOWED_TYPES = {"image/jpeg", "image/png", "image/webp", "image/gif",
+                 "application/pdf", "text/plain"}
+CACHE_CONTROL = "public, max-age=31536000, immutable"
+_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def storage_root() -> Path:
+    return Path(settings.MEDIA_ROOT) / "attachments"
+
+
+def blob_path(sha256: str) -> Path:
+    return storage_root() / sha256[:2] / sha256
+
+
+def thumbnail_path(sha256: str) -> Path:
+    return storage_root() / "thumbs" / sha256[:2] / f"{sha256}.jpg"
+
+
+def max_bytes() -> int:
+    return getattr(settings, "ATTACHMENT_MAX_BYTES", 10 * 1024 * 1024)
+
+
+# -- uploads ---------------------------------------------------------------
+class HashedUpload(UploadedFile):
+    """An upload already on disk, with its SHA-256."""
+
+    def __init__(self, path: Path, sha256: str, **kwargs):
+        super().__init__(file=open(path, "rb"), **kwargs)
+        self.path = path
+        self.sha256 = sha256
+
+    def temporary_file_path(self) -> str:
+        return str(self.path)
+
+    def close(self):
+        try:
+            return self.file.close()
+        except FileNotFoundError:
+            pass
+
+
+class HashingUploadHandler(FileUploadHandler):
+    """Replaces Django's memory/temp-file handlers for attachment uploads."""
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.rejected: List[str] = []
+        self.completed: List[HashedUpload] = []
+        self._file = None
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        content_type = (mimetypes.guess_type(self.file_name or "")[0]
+                        or self.content_type)
+        if content_type not in ALLOWED_TYPES:
+            self.rejected.append(f"{self.file_name}: file type not allowed")
+            raise SkipFile()
+        self.content_type = content_type
+        tmp = storage_root() / "tmp"
+        tmp.mkdir(parents=True, exist_ok=True)
+        self._path = tmp / uuid.uuid4().hex
+        self._file = open(self._path, "wb")
+        self._hash = hashlib.sha256()
+        self._size = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self._size += len(raw_data)
+        if self._size > max_bytes():
+            self._discard()
+            self.rejected.append(
+                f"{self.file_name}: larger than {filesizeformat(max_bytes())}")
+            raise SkipFile()
+        self._hash.update(raw_data)
+        self._file.write(raw_data)
+        return None  # consumed; nothing for later handlers
+
+    def file_complete(self, file_size):
+        self._file.close()
+        self._file = None
+        upload = HashedUpload(
+            self._path, self._hash.hexdigest(), name=self.file_name,
+            content_type=self.content_type, size=self._size,
+            charset=self.charset)
+        self.completed.append(upload)
+        return upload
+
+    def upload_interrupted(self):
+        self._discard()
+
+    def cleanup(self):
+        """Remove temporary files of uploads that were never stored."""
+        for upload in self.completed:
+            upload.close()
+            upload.path.unlink(missing_ok=True)
+
+    def _discard(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            self._path.unlink(missing_ok=True)
+
+
+def store_upload(upload: HashedUpload) -> str:
+    """Move the upload to its content-addressed path; returns the SHA-256."""
+    target = blob_path(upload.sha256)
+    upload.close()
+    if target.exists():
+        upload.path.unlink(missing_ok=True)  # same content already stored
+    else:
+        target.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(upload.path, target)
+    return upload.sha256
+
+
+@contextmanager
+def blob_locks(sha256s: Iterable[str]):
+    """Hold the locks of these contents, taken in order so holders never deadlock."""
+    with ExitStack() as locks:
+        if fcntl is not None:
+            directory = storage_root() / "locks"
+            directory.mkdir(parents=True, exist_ok=True)
+            for stripe in sorted({sha256[:2] for sha256 in sha256s}):
+                lock = locks.enter_context(open(directory / f"{stripe}.lock", "a"))
+                fcntl.flock(lock, fcntl.LOCK_EX)  # released when closed
+        yield
+
+
+def delete_unreferenced(sha256: str) -> None:
+    from .models import Attachment
+    from .sites import site_databases
+    with blob_locks([sha256]):
+        # Content is shared by every site, so check every site's database
+        if not any(Attachment.objects.using(alias).filter(sha256=sha256).exists()
+                   for alias in [DEFAULT_DB_ALIAS, *site_databases()]):
+            blob_path(sha256).unlink(missing_ok=True)
+            thumbnail_path(sha256).unlink(missing_ok=True)
+
+
+# -- thumbnails ------------------------------------------------------------
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # Created lazily, so each Gunicorn worker gets its own pool after the
+        # fork; spawned children only import maintenance.thumbnails
+        _pool = ProcessPoolExecutor(
+            max_workers=getattr(settings, "ATTACHMENT_THUMBNAIL_WORKERS", 2),
+            mp_context=multiprocessing.get_context("spawn"))
+        atexit.register(_pool.shutdown, wait=False)
+    return _pool
+
+
+def schedule_thumbnail(sha256: str, content_type: str,
+                       using: Optional[str] = None) -> None:
+    if not content_type.startswith("image/") or thumbnail_path(sha256).exists():
+        return
+    source, target = str(blob_path(sha256)), str(thumbnail_path(sha256))
+    transaction.on_commit(lambda: _get_pool().submit(make_thumbnail, source, target),
+                          using=using)
+
+
+# -- serving ---------------------------------------------------------------
+def serve(request, path: Path, content_type: str, etag: str,
+          filename: Optional[str] = None) -> HttpResponse:
+    """Serve an immutable file, honouring If-None-Match and a single Range."""
+    if request.headers.get("If-None-Match") == etag:
+        response = HttpResponse(status=304)
+        response["ETag"] = etag
+        response["Cache-Control"] = CACHE_CONTROL
+        return response
+
+    size = path.stat().st_size
+    match = _RANGE.match(request.headers.get("Range", ""))
+    start, end = 0, size - 1
+    status = 200
+    if match and (match[1] or match[2]):
+        if match[1]:
+            start = int(match[1])
+            end = min(int(match[2]), size - 1) if match[2] else size - 1
+        else:  # suffix range: the last N bytes
+            start = max(0, size - int(match[2]))
+        if start > end or start >= size:
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{size}"
+            return response
+        status = 206
+
+    handle = open(path, "rb")
+    if status == 200:
+        response = FileResponse(handle, content_type=content_type)
+    else:
+        handle.seek(start)
+        response = StreamingHttpResponse(
+            _limited(handle, end - start + 1), status=206,
+            content_type=content_type)
+        response["Content-Length"] = str(end - start + 1)
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+    response["Accept-Ranges"] = "bytes"
+    response["ETag"] = etag
+    response["Cache-Control"] = CACHE_CONTROL
+    if filename:
+        inline = content_type.startswith("image/") or content_type == "application/pdf"
+        response.headers["Content-Disposition"] = content_disposition_header(
+            not inline, filename)
+    return response
+
+
+def _limited(handle, length: int, chunk: int = 64 * 1024):
+    try:
+        while length > 0:
+            data = handle.read(min(chunk, length))
+            if not data:
+                break
+            length -= len(data)
+            yield data
+    finally:
+        handle.close()
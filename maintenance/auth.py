@@ -0,0 +1,60 @@
+"""Cached lookup of the authenticated user.
+
+AuthenticationMiddleware loads the User row on every request. get_user()
+keeps the loaded user in the AUTH_USER_CACHE cache for AUTH_USER_CACHE_TTL
+seconds. An entry is only served to a session whose auth hash (and backend)
+match the ones Django verified when the entry was stored, so a password
+change or a forged session never picks up a cached user.
+
+Entries are dropped whenever the User row is saved or deleted (see
+maintenance.signals). That only reaches the other workers through a shared
+cache, so the settings leave the TTL at 0 (no caching) unless REDIS_URL is
+set: with per-process LocMem a deactivated or demoted user would keep their
+access on every other worker until the entry expired.
+"""
+
+from django.conf import settings
+from django.contrib import auth
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY
+from django.core.cache import caches
+from django.utils.crypto import constant_time_compare
+
+
+def _cache():
+    return caches[getattr(settings, "AUTH_USER_CACHE", "default")]
+
+
+def _key(user_id) -> str:
+    return f"auth-user:{user_id}"
+
+
+def get_user(request):
+    """Drop-in for ``django.contrib.auth.get_user`` backed by the cache."""
+    ttl = getattr(settings, "AUTH_USER_CACHE_TTL", 0)
+    session = request.session
+    try:
+        user_id = auth._get_user_session_key(request)
+        backend_path = session[BACKEND_SESSION_KEY]
+        session_hash = session[HASH_SESSION_KEY]
+    except KeyError:
+        return auth.get_user(request)
+    if not ttl:
+        return auth.get_user(request)
+
+    entry = _cache().get(_key(user_id))
+    if entry is not None:
+        cached_backend, cached_hash, user = entry
+        if cached_backend == backend_path and constant_time_compare(
+                cached_hash, session_hash):
+            return user
+
+    user = auth.get_user(request)
+    # get_user() may have re-keyed the session (fallback secret) or flushed it
+    verified_hash = session.get(HASH_SESSION_KEY)
+    if user.is_authenticated and user.pk == user_id and verified_hash:
+        _cache().set(_key(user_id), (backend_path, verified_hash, user), ttl)
+    return user
+
+
+def invalidate_user(user_id) -> None:
+    _cache().delete(_key(user_id))
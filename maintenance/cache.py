@@ -0,0 +1,166 @@
+"""Cache backends for MaintenaTrack.
+
+- CounterCache: integer counters in the RateLimitCounter table, used as
+  django-ratelimit's store (RATELIMIT_USE_CACHE) so limits hold across all
+  Gunicorn workers without running Redis/Memcached.
+
+django-ratelimit only needs ``add`` (start a window) and ``incr`` (count a
+hit). ``add`` is one atomic ``INSERT ... ON CONFLICT DO UPDATE ... WHERE
+expired`` and ``incr`` one ``UPDATE ... RETURNING``, both supported by
+SQLite >= 3.35 and PostgreSQL. Only integer values can be stored.
+
+- current_version / bump_version / versioned_key: version stamps for
+  results kept in a per-process cache. The stamps live in a CounterCache
+  (the ``versions`` cache), so a bump made by one worker reaches every
+  worker: entries stored under the old stamp are never read again.
+"""
+
+import random
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.db import connections, router
+
+from .models import RateLimitCounter
+
+
+class CounterCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        # Fraction of add() calls that also purge expired counters
+        self._purge_probability = float(
+            params.get("OPTIONS", {}).get("PURGE_PROBABILITY", 0.01))
+
+    # -- helpers -----------------------------------------------------------
+    def _cursor(self):
+        alias = router.db_for_write(RateLimitCounter)
+        return connections[alias].cursor()
+
+    @property
+    def _table(self) -> str:
+        alias = router.db_for_write(RateLimitCounter)
+        return connections[alias].ops.quote_name(RateLimitCounter._meta.db_table)
+
+    @property
+    def _key(self) -> str:
+        # "key" is reserved in some SQL dialects
+        alias = router.db_for_write(RateLimitCounter)
+        return connections[alias].ops.quote_name("key")
+
+    def _expiry(self, timeout) -> float:
+        expires_at = self.get_backend_timeout(timeout)
+        # None means "never expires"; keep it finite so comparisons still work
+        if expires_at is None:
+            return time.time() + 10 * 365 * 86400
+        return expires_at
+
+    @staticmethod
+    def _check_int(value) -> int:
+        if isinstance(value, bool) or not isinstance(value, int):
+            raise TypeError("CounterCache only stores integers.")
+        return value
+
+    # -- cache API ---------------------------------------------------------
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        value = self._check_int(value)
+        now = time.time()
+        with self._cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {self._table} ({self._key}, value, expires_at) "
+                f"VALUES (%s, %s, %s) "
+                f"ON CONFLICT ({self._key}) DO UPDATE SET value = excluded.value, "
+                f"expires_at = excluded.expires_at "
+                f"WHERE {self._table}.expires_at <= %s",
+                [key, value, self._expiry(timeout), now],
+            )
+            added = cursor.rowcount == 1
+            if added and random.random() < self._purge_probability:
+                cursor.execute(
+                    f"DELETE FROM {self._table} WHERE expires_at <= %s", [now])
+        return added
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        with self._cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {self._table} SET value = value + %s "
+                f"WHERE {self._key} = %s AND expires_at > %s RETURNING value",
+                [self._check_int(delta), key, time.time()],
+            )
+            row = cursor.fetchone()
+        if row is None:
+            raise ValueError(f"Key '{key}' not found.")
+        return row[0]
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        with self._cursor() as cursor:
+            cursor.execute(
+                f"SELECT value FROM {self._table} "
+                f"WHERE {self._key} = %s AND expires_at > %s",
+                [key, time.time()],
+            )
+            row = cursor.fetchone()
+        return default if row is None else row[0]
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        with self._cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {self._table} ({self._key}, value, expires_at) "
+                f"VALUES (%s, %s, %s) "
+                f"ON CONFLICT ({self._key}) DO UPDATE SET value = excluded.value, "
+                f"expires_at = excluded.expires_at",
+                [key, self._check_int(value), self._expiry(timeout)],
+            )
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        with self._cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {self._table} SET expires_at = %s "
+                f"WHERE {self._key} = %s AND expires_at > %s",
+                [self._expiry(timeout), key, time.time()],
+            )
+            return cursor.rowcount == 1
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        with self._cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {self._table} WHERE {self._key} = %s", [key])
+            return cursor.rowcount == 1
+
+    def has_key(self, key, version=None):
+        return self.get(key, version=version) is not None
+
+    def clear(self):
+        with self._cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self._table}")
+
+
+# -- version stamps ----------------------------------------------------------
+def _stamps():
+    return caches[getattr(settings, "VERSION_STAMP_CACHE", "versions")]
+
+
+def current_version(name: str) -> int:
+    """The version stamp ``name``, created on first use."""
+    stamps = _stamps()
+    version = stamps.get(name)
+    if version is None:
+        stamps.add(name, time.time_ns(), None)
+        version = stamps.get(name)
+    return version
+
+
+def bump_version(name: str) -> None:
+    _stamps().set(name, time.time_ns(), None)
+
+
+def versioned_key(name: str, *parts) -> str:
+    """A cache key under the current stamp ``name``."""
+    return ":".join([name, str(current_version(name)), *map(str, parts)])
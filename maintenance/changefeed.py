@@ -0,0 +1,202 @@
+"""Change feed: what changed in a site's logs, steps and equipment since a cursor.
+
+- record_change: adds a Change row for a saved or deleted log, step or
+  equipment, on the database and in the transaction of the change
+  (maintenance.signals): writers save inside transaction.atomic, so a
+  change and its entry commit together. record_cleared adds rows for the
+  logs and steps an on_delete=SET_NULL is about to change with an update(),
+  which sends no signals (deleted equipment or users). Other writes that
+  skip signals (QuerySet update(), the counters) record nothing.
+- publish: gives the committed entries that have none a ``sequence``, above
+  every sequence already given. Publishers take turns (a lock on the site's
+  row), so sequences appear in increasing order: a transaction committing
+  late is published late, after the cursors that have moved on, instead of
+  behind them.
+- feed: publishes, then returns one page of at most ``limit`` changes after
+  a cursor, in sequence order, read from the (site, sequence) index. Saved
+  objects carry their current fields (each object once per page, one query
+  per kind); deleted ones are tombstones. The next cursor is opaque
+  (signed).
+- compact: deletes entries superseded by a newer one for the same object,
+  and tombstones older than CHANGE_FEED_TOMBSTONE_DAYS. A cursor from before
+  that horizon may have missed a deletion, so feed rejects it (CursorExpired)
+  and the client starts over without a cursor: every live object keeps an
+  entry, so a feed read from the start is a full export.
+"""
+
+from datetime import timedelta
+from functools import lru_cache
+from typing import Any, Dict, List
+
+from django.conf import settings
+from django.core import signing
+from django.db import router, transaction
+from django.db.models import Exists, F, Min, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Change, Equipment, MaintenanceLog, Site, Step
+
+PAGE_SIZE = 200
+MAX_PAGE_SIZE = 1000
+_SALT = "maintenance.changefeed"
+
+KINDS = {MaintenanceLog: Change.Kind.LOG, Step: Change.Kind.STEP,
+         Equipment: Change.Kind.EQUIPMENT}
+FIELDS = {
+    Change.Kind.LOG: (
+        "id", "equipment_id", "zone", "alarm_code", "alarm_name", "difficulty",
+        "lam_checked", "description", "step_count", "total_duration_minutes",
+        "created_by_id", "created_at", "updated_at"),
+    Change.Kind.STEP: (
+        "id", "log_id", "order", "action", "result", "duration_minutes",
+        "performed_by_id", "created_at"),
+    Change.Kind.EQUIPMENT: (
+        "id", "name", "asset_tag", "zone", "location", "status", "description",
+        "log_count", "last_log_at", "created_at", "updated_at"),
+}
+MODELS = {kind: model for model, kind in KINDS.items()}
+
+
+class CursorError(ValueError):
+    pass
+
+
+class CursorExpired(CursorError):
+    pass
+
+
+def _horizon() -> timedelta:
+    return timedelta(days=getattr(settings, "CHANGE_FEED_TOMBSTONE_DAYS", 30))
+
+
+@lru_cache(maxsize=4096)
+def _log_site(using: str, log_id: int) -> int:
+    # A log never changes site, and ids are not reused
+    return (MaintenanceLog.objects.using(using)
+            .values_list("site_id", flat=True).get(pk=log_id))
+
+
+def record_change(instance, using: str, deleted: bool = False) -> None:
+    kind = KINDS[type(instance)]
+    if kind == Change.Kind.STEP:
+        site_id = (instance.log.site_id if Step.log.is_cached(instance)
+                   else _log_site(using, instance.log_id))
+    else:
+        site_id = instance.site_id
+    Change.objects.using(using).create(
+        site_id=site_id, kind=kind, object_id=instance.pk, deleted=deleted)
+
+
+def record_cleared(queryset, using: str) -> None:
+    """Entries for the logs or steps in ``queryset``, whose foreign key SET_NULL clears."""
+    kind = KINDS[queryset.model]
+    site = "log__site_id" if kind == Change.Kind.STEP else "site_id"
+    Change.objects.using(using).bulk_create(
+        [Change(site_id=site_id, kind=kind, object_id=object_id)
+         for object_id, site_id in (queryset.using(using).order_by()
+                                    .values_list("pk", site))],
+        batch_size=500)
+
+
+def publish(site) -> int:
+    """Sequence the site's committed, unpublished entries; returns how many."""
+    using = router.db_for_write(Change)
+    pending = Change.objects.using(using).filter(site=site, sequence__isnull=True)
+    first = pending.aggregate(first=Min("pk"))["first"]
+    if first is None:
+        return 0
+    last = (Change.objects.using(using)
+            .filter(site=site, sequence__isnull=False)
+            .order_by("-sequence").values("sequence")[:1])
+    with transaction.atomic(using=using):
+        # One publisher at a time, so each one reads the last sequence after
+        # the previous one committed (no-op on SQLite, which serializes
+        # writers, and reads the last sequence inside the UPDATE)
+        Site.objects.using(using).select_for_update().filter(pk=site.pk).exists()
+        # Increasing with the id and above every sequence given so far;
+        # entries committed since ``first`` was read join in
+        return pending.filter(pk__gte=first).update(
+            sequence=F("pk") - first + Coalesce(Subquery(last), Value(0)) + 1)
+
+
+def encode_cursor(site, sequence: int, synced_at) -> str:
+    return signing.dumps(
+        {"site": site.pk, "seq": sequence, "at": int(synced_at.timestamp())},
+        salt=_SALT, compress=True)
+
+
+def decode_cursor(site, cursor: str) -> int:
+    """The sequence a cursor continues after."""
+    try:
+        data = signing.loads(cursor, salt=_SALT)
+    except signing.BadSignature:
+        raise CursorError("Invalid cursor.")
+    if data.get("site") != site.pk:
+        raise CursorError("The cursor belongs to another site.")
+    if data["at"] < (timezone.now() - _horizon()).timestamp():
+        raise CursorExpired("The cursor is older than the tombstones kept; "
+                            "read the feed again from the start.")
+    return data["seq"]
+
+
+def feed(site, cursor: str = "", limit: int = PAGE_SIZE) -> Dict[str, Any]:
+    """The page after ``cursor`` (from the start without one)."""
+    after = decode_cursor(site, cursor) if cursor else 0
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    publish(site)
+    now = timezone.now()
+    rows = list(Change.objects
+                .filter(site=site, sequence__gt=after)
+                .order_by("sequence")
+                .values_list("sequence", "kind", "object_id", "deleted", "recorded_at")
+                [:limit + 1])
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    # Each object once, at its last position in the page
+    last = {(kind, object_id): n for n, (_, kind, object_id, _, _) in enumerate(rows)}
+    wanted: Dict[str, List[int]] = {}
+    for (kind, object_id), n in last.items():
+        if not rows[n][3]:
+            wanted.setdefault(kind, []).append(object_id)
+    current = {
+        kind: {row["id"]: row for row in MODELS[kind].objects
+               .filter(pk__in=ids).order_by().values(*FIELDS[kind])}
+        for kind, ids in wanted.items()
+    }
+    changes = []
+    for n, (sequence, kind, object_id, deleted, _) in enumerate(rows):
+        if last[(kind, object_id)] != n:
+            continue
+        if deleted:
+            changes.append({"seq": sequence, "type": kind, "id": object_id,
+                            "op": "delete"})
+        elif object_id in current.get(kind, {}):
+            changes.append({"seq": sequence, "type": kind, "id": object_id,
+                            "op": "upsert", "data": current[kind][object_id]})
+        # else: deleted since; its tombstone follows
+
+    sequence = rows[-1][0] if rows else after
+    # Caught up: every entry published by ``now`` was read
+    synced_at = rows[-1][4] if has_more else now
+    return {
+        "changes": changes,
+        "cursor": encode_cursor(site, sequence, synced_at),
+        "has_more": has_more,
+    }
+
+
+def compact(site, superseded_before=None) -> Dict[str, int]:
+    """Delete superseded entries (older than ``superseded_before``) and old tombstones."""
+    now = timezone.now()
+    superseded_before = superseded_before or now
+    newer = Change.objects.filter(
+        site=site, kind=OuterRef("kind"), object_id=OuterRef("object_id"),
+        pk__gt=OuterRef("pk"))
+    superseded, _ = (Change.objects
+                     .filter(site=site, recorded_at__lt=superseded_before)
+                     .filter(Exists(newer)).delete())
+    tombstones, _ = Change.objects.filter(
+        site=site, deleted=True, recorded_at__lt=now - _horizon()).delete()
+    return {"superseded": superseded, "tombstones": tombstones}
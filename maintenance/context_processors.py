@@ -0,0 +1,18 @@
+"""Template context processors for MaintenaTrack.
+
+- site: the site the request works for and the ones the user can switch to
+  (the switcher in base.html only shows when there is more than one).
+"""
+
+from .sites import sites_for
+
+
+def site(request):
+    current = getattr(request, "site", None)
+    if current is None:
+        return {}
+    user = getattr(request, "user", None)
+    return {
+        "current_site": current,
+        "available_sites": sites_for(user) if user is not None else [current],
+    }
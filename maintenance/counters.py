@@ -0,0 +1,63 @@
+"""Recomputing the denormalized counters from source rows.
+
+Live maintenance happens incrementally in maintenance.signals; these helpers
+derive the true values with correlated subqueries, for the backfill migration
+and for ``manage.py verify_counters``. Model classes are parameters so the
+migration can pass its historical models.
+"""
+
+from typing import Dict, List
+
+from django.db.models import (Count, Expression, IntegerField, Max, OuterRef,
+                              Subquery, Sum, Value)
+from django.db.models.functions import Coalesce
+
+
+def _scalar(queryset, fk: str, aggregate) -> Subquery:
+    return Subquery(
+        queryset.filter(**{fk: OuterRef("pk")})
+        .values(fk)
+        .annotate(value=aggregate)
+        .values("value")
+    )
+
+
+def equipment_counters(MaintenanceLog) -> Dict[str, Expression]:
+    logs = MaintenanceLog.objects.order_by()
+    return {
+        "log_count": Coalesce(
+            _scalar(logs, "equipment", Count("pk")), Value(0),
+            output_field=IntegerField()),
+        "last_log_at": _scalar(logs, "equipment", Max("created_at")),
+    }
+
+
+def alarm_counters(MaintenanceLog) -> Dict[str, Expression]:
+    logs = MaintenanceLog.objects.order_by()
+    return {
+        "occurrence_count": Coalesce(
+            _scalar(logs, "alarm", Count("pk")), Value(0),
+            output_field=IntegerField()),
+    }
+
+
+def log_counters(Step) -> Dict[str, Expression]:
+    steps = Step.objects.order_by()
+    return {
+        "step_count": Coalesce(
+            _scalar(steps, "log", Count("pk")), Value(0),
+            output_field=IntegerField()),
+        "total_duration_minutes": Coalesce(
+            _scalar(steps, "log", Sum("duration_minutes")), Value(0),
+            output_field=IntegerField()),
+    }
+
+
+def drifted(queryset, expected: Dict[str, Expression]) -> List[int]:
+    """Primary keys of rows whose stored counters differ from ``expected``."""
+    fresh = {f"expected_{name}": expr for name, expr in expected.items()}
+    rows = queryset.annotate(**fresh).values_list(
+        "pk", *expected, *fresh).iterator(chunk_size=2000)
+    width = len(expected)
+    return [row[0] for row in rows
+            if row[1:1 + width] != row[1 + width:]]
@@ -0,0 +1,186 @@
+"""Database housekeeping behind ``manage.py db_maintain``.
+
+- purge_sessions: deletes expired django_session rows in small batches, so
+  the table is never locked for long (db and cached_db session engines).
+- vacuum: ANALYZE + VACUUM on SQLite (returns the file size before and
+  after), VACUUM (ANALYZE) on PostgreSQL. Other vendors are skipped.
+- table_stats: rows and on-disk size of every table and its indexes; exact
+  counts plus the ``dbstat`` table on SQLite, planner estimates plus dead
+  rows (what VACUUM reclaims) on PostgreSQL.
+- index_report: every index with its columns and how it is used: scan
+  counts from ``pg_stat_user_indexes``, or rows per key from SQLite's
+  ``sqlite_stat1`` (filled by ANALYZE; SQLite keeps no usage counters). An
+  index is flagged when it duplicates another, is a leading prefix of
+  another (which can serve the same lookups), was never scanned, or barely
+  narrows a large table down.
+"""
+
+from typing import Any, Dict, List, Optional
+
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from django.utils import timezone
+
+LOW_SELECTIVITY_ROWS = 1000  # tables smaller than this are not judged
+
+
+# -- sessions --------------------------------------------------------------
+def purge_sessions(batch_size: int = 1000, using: str = DEFAULT_DB_ALIAS) -> int:
+    """Delete expired sessions; returns how many were deleted."""
+    from django.contrib.sessions.models import Session
+    expired = Session.objects.using(using).filter(expire_date__lt=timezone.now())
+    total = 0
+    while True:
+        keys = list(expired.values_list("session_key", flat=True)[:batch_size])
+        if not keys:
+            return total
+        total += Session.objects.using(using).filter(session_key__in=keys).delete()[0]
+
+
+# -- vacuum ----------------------------------------------------------------
+def _sqlite_bytes(cursor) -> int:
+    cursor.execute("PRAGMA page_count")
+    pages = cursor.fetchone()[0]
+    cursor.execute("PRAGMA page_size")
+    return pages * cursor.fetchone()[0]
+
+
+def vacuum(alias: str) -> Optional[Dict[str, Any]]:
+    """Reclaim free space and refresh planner statistics (None: unsupported)."""
+    connection = connections[alias]
+    with connection.cursor() as cursor:
+        if connection.vendor == "sqlite":
+            before = _sqlite_bytes(cursor)
+            cursor.execute("ANALYZE")
+            cursor.execute("VACUUM")
+            return {"before": before, "after": _sqlite_bytes(cursor)}
+        if connection.vendor == "postgresql":
+            cursor.execute("VACUUM (ANALYZE)")
+            return {}
+    return None
+
+
+# -- table stats -----------------------------------------------------------
+def _sqlite_sizes(cursor) -> Dict[str, int]:
+    try:
+        cursor.execute("SELECT name, SUM(pgsize) FROM dbstat GROUP BY name")
+    except DatabaseError:
+        return {}  # SQLite built without the dbstat table
+    return dict(cursor.fetchall())
+
+
+def table_stats(alias: str) -> List[Dict[str, Any]]:
+    """Per table: rows, bytes, index_bytes and (PostgreSQL) dead_rows."""
+    connection = connections[alias]
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            cursor.execute("""
+                SELECT c.relname, c.reltuples::bigint, pg_table_size(c.oid),
+                       pg_indexes_size(c.oid), s.n_dead_tup
+                FROM pg_class c
+                JOIN pg_namespace n ON n.oid = c.relnamespace
+                LEFT JOIN pg_stat_user_tables s ON s.relid = c.oid
+                WHERE c.relkind = 'r' AND n.nspname = current_schema()
+            """)
+            stats = [{"table": name, "rows": rows if rows >= 0 else None,
+                      "bytes": size, "index_bytes": index_size, "dead_rows": dead}
+                     for name, rows, size, index_size, dead in cursor.fetchall()]
+        else:
+            sizes = _sqlite_sizes(cursor) if connection.vendor == "sqlite" else {}
+            owners: Dict[str, str] = {}
+            if connection.vendor == "sqlite":
+                cursor.execute(
+                    "SELECT name, tbl_name FROM sqlite_master WHERE type = 'index'")
+                owners = dict(cursor.fetchall())
+            stats = []
+            for table in connection.introspection.table_names(cursor):
+                cursor.execute(
+                    f"SELECT COUNT(*) FROM {connection.ops.quote_name(table)}")
+                stats.append({
+                    "table": table, "rows": cursor.fetchone()[0],
+                    "bytes": sizes.get(table),
+                    "index_bytes": sum(size for name, size in sizes.items()
+                                       if owners.get(name) == table) if sizes else None,
+                    "dead_rows": None,
+                })
+    return sorted(stats, key=lambda s: -((s["bytes"] or 0) + (s["index_bytes"] or 0)))
+
+
+def free_bytes(alias: str) -> Optional[int]:
+    """Space VACUUM would give back to the file system (SQLite only)."""
+    connection = connections[alias]
+    if connection.vendor != "sqlite":
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute("PRAGMA freelist_count")
+        pages = cursor.fetchone()[0]
+        cursor.execute("PRAGMA page_size")
+        return pages * cursor.fetchone()[0]
+
+
+# -- index report ----------------------------------------------------------
+def _usage(connection, cursor) -> Dict[str, Dict[str, Any]]:
+    if connection.vendor == "postgresql":
+        cursor.execute("""
+            SELECT indexrelname, idx_scan, pg_relation_size(indexrelid)
+            FROM pg_stat_user_indexes WHERE schemaname = current_schema()
+        """)
+        return {name: {"scans": scans, "bytes": size}
+                for name, scans, size in cursor.fetchall()}
+    if connection.vendor == "sqlite":
+        sizes = _sqlite_sizes(cursor)
+        try:
+            cursor.execute("SELECT idx, stat FROM sqlite_stat1 WHERE idx IS NOT NULL")
+            rows = cursor.fetchall()
+        except DatabaseError:
+            rows = []  # ANALYZE has never run
+        usage = {name: {"bytes": size} for name, size in sizes.items()}
+        for name, stat in rows:
+            numbers = [int(n) for n in stat.split() if n.isdigit()]
+            if len(numbers) >= 2:
+                usage.setdefault(name, {}).update(
+                    table_rows=numbers[0], rows_per_key=numbers[1])
+        return usage
+    return {}
+
+
+def index_report(alias: str) -> List[Dict[str, Any]]:
+    """Every index (primary keys aside) with its usage and any problems."""
+    connection = connections[alias]
+    report = []
+    with connection.cursor() as cursor:
+        usage = _usage(connection, cursor)
+        for table in connection.introspection.table_names(cursor):
+            indexes = {
+                name: info for name, info in
+                connection.introspection.get_constraints(cursor, table).items()
+                if (info["index"] or info["unique"]) and not info["primary_key"]
+                and info["columns"]
+            }
+            for name, info in sorted(indexes.items()):
+                columns = list(info["columns"])
+                stats = usage.get(name, {})
+                problems = []
+                for other, other_info in sorted(indexes.items()):
+                    other_columns = list(other_info["columns"])
+                    if other == name:
+                        continue
+                    if other_columns == columns:
+                        # Keep the unique one (or the first name) of a pair
+                        if not info["unique"] and (other_info["unique"] or other < name):
+                            problems.append(f"duplicate of {other}")
+                    elif (not info["unique"] and len(columns) < len(other_columns)
+                          and other_columns[:len(columns)] == columns):
+                        problems.append(f"prefix of {other}")
+                if stats.get("scans") == 0 and not info["unique"]:
+                    problems.append("never scanned")
+                rows, per_key = stats.get("table_rows"), stats.get("rows_per_key")
+                if (rows and per_key and rows >= LOW_SELECTIVITY_ROWS
+                        and per_key > rows * 0.1):
+                    problems.append(f"low selectivity (~{per_key} rows per key)")
+                report.append({
+                    "table": table, "index": name, "columns": columns,
+                    "unique": info["unique"], "bytes": stats.get("bytes"),
+                    "scans": stats.get("scans"), "rows_per_key": per_key,
+                    "problems": problems,
+                })
+    return report
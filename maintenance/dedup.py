@@ -0,0 +1,120 @@
+"""Duplicate-incident detection for MaintenanceLog.
+
+Every log stores two hashes, computed on save:
+- incident_key: zone + alarm code + equipment. Indexed together with
+  created_at, it narrows "same incident, recent" to a handful of rows.
+- fingerprint: incident_key + the normalized description's word shingles.
+  Equal fingerprints mean the same incident described the same way.
+
+find_duplicates() looks both up within DEDUP_WINDOW_MINUTES and scores
+near-duplicates by shingle overlap (Jaccard) in Python; only candidates
+sharing the incident_key are ever compared, so there is no text scan.
+append_steps() lets a duplicate submission add its steps to the existing log.
+"""
+
+import hashlib
+import re
+from datetime import timedelta
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from django.conf import settings
+from django.db.models import Max
+from django.utils import timezone
+
+SHINGLE_SIZE = 3
+MAX_CANDIDATES = 20
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def normalize(text: str) -> List[str]:
+    return _WORD.findall((text or "").lower())
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> Set[str]:
+    words = normalize(text)
+    if len(words) <= size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def similarity(a: Set[str], b: Set[str]) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def incident_key(zone: str, alarm_code: str, equipment_id: Optional[int]) -> str:
+    parts = [str(zone or "").strip().upper(), str(alarm_code or "").strip().upper(),
+             str(equipment_id or "")]
+    return hashlib.sha1("|".join(parts).encode()).hexdigest()
+
+
+def fingerprint(key: str, description: str) -> str:
+    body = "\n".join(sorted(shingles(description)))
+    return hashlib.sha1(f"{key}\n{body}".encode()).hexdigest()
+
+
+def find_duplicates(zone, alarm_code, equipment_id, description,
+                    exclude_pk=None, site=None) -> List[Dict[str, Any]]:
+    """Recent logs for the same incident at ``site``, best match first.
+
+    Each match is ``{"log", "similarity", "exact"}``; only matches at or above
+    DEDUP_SIMILARITY (or exact fingerprint matches) are returned.
+    """
+    from .models import MaintenanceLog
+
+    window = getattr(settings, "DEDUP_WINDOW_MINUTES", 60)
+    threshold = getattr(settings, "DEDUP_SIMILARITY", 0.6)
+    key = incident_key(zone, alarm_code, equipment_id)
+    wanted = fingerprint(key, description)
+    wanted_shingles = shingles(description)
+
+    candidates = MaintenanceLog.objects.filter(
+        incident_key=key,
+        created_at__gte=timezone.now() - timedelta(minutes=window))
+    if site is not None:
+        candidates = candidates.filter(site=site)
+    candidates = (candidates.exclude(pk=exclude_pk)
+                  .select_related("created_by")
+                  .order_by("-created_at")[:MAX_CANDIDATES])
+    matches = []
+    for log in candidates:
+        exact = log.fingerprint == wanted
+        score = 1.0 if exact else similarity(wanted_shingles,
+                                             shingles(log.description))
+        if exact or score >= threshold:
+            matches.append({"log": log, "similarity": round(score, 2),
+                            "exact": exact})
+    matches.sort(key=lambda m: (m["exact"], m["similarity"]), reverse=True)
+    return matches
+
+
+def append_steps(log, steps: Iterable[Dict[str, Any]], user) -> int:
+    """Add steps to an existing log after its last one, skipping repeats.
+
+    A step whose action and result match one the log already has (after
+    normalization) is not added again. Returns the number of steps added.
+    """
+    from .models import Step
+
+    existing = {(tuple(normalize(a)), tuple(normalize(r)))
+                for a, r in log.steps.values_list("action", "result")}
+    next_order = (log.steps.aggregate(last=Max("order"))["last"] or 0) + 1
+    added = 0
+    for data in steps:
+        action = (data.get("action") or "").strip()
+        if not action:
+            continue
+        signature = (tuple(normalize(action)),
+                     tuple(normalize(data.get("result") or "")))
+        if signature in existing:
+            continue
+        existing.add(signature)
+        Step.objects.create(
+            log=log, order=next_order + added, action=action,
+            result=data.get("result") or "",
+            duration_minutes=data.get("duration_minutes"),
+            performed_by=data.get("performed_by") or user,
+        )
+        added += 1
+    return added
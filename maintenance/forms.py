@@ -37,6 +37,19 @@ class MaintenanceLogForm(forms.ModelForm):
         model = MaintenanceLog
         fields = ["equipment", "zone", "alarm_code", "alarm_name",
                   "lam_checked", "difficulty", "description"]
+        widgets = {
+            # Filled from the alarm catalog as the technician types (log_form.js)
+            "alarm_code": forms.TextInput(
+                attrs={"list": "alarm-code-suggestions", "autocomplete": "off"}),
+            "alarm_name": forms.TextInput(
+                attrs={"list": "alarm-name-suggestions", "autocomplete": "off"}),
+        }
+
+    def __init__(self, *args, site=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if site is not None:
+            # Only the site's own equipment can be picked
+            self.fields["equipment"].queryset = Equipment.objects.filter(site=site)
 
     def clean_alarm_code(self):
         """Sanitize alarm code input"""
@@ -0,0 +1,110 @@
+"""Readiness probes for MaintenaTrack (served at /health/ready).
+
+Each probe returns ``(ok, details)`` and is timed by ``run_probes``. Results
+are kept in-process for HEALTH_PROBE_TTL seconds so a load balancer polling
+every second or two costs one round of probes per TTL per worker, not one
+per poll. The cache is deliberately not Django's cache: cache availability is
+itself one of the things being probed.
+"""
+
+import shutil
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Tuple
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+from django.db.migrations.executor import MigrationExecutor
+
+ProbeResult = Tuple[bool, Dict[str, Any]]
+
+_lock = threading.Lock()
+_cached: Dict[str, Any] = {"at": 0.0, "report": None}
+
+
+def probe_databases() -> ProbeResult:
+    """``SELECT 1`` round trip on every configured database."""
+    details, ok = {}, True
+    for alias in connections:
+        start = time.perf_counter()
+        try:
+            with connections[alias].cursor() as cursor:
+                cursor.execute("SELECT 1")
+                cursor.fetchone()
+        except Exception as exc:
+            ok = False
+            details[alias] = {"ok": False, "error": str(exc)}
+        else:
+            details[alias] = {
+                "ok": True,
+                "latency_ms": round((time.perf_counter() - start) * 1000, 2)}
+    return ok, details
+
+
+def probe_cache() -> ProbeResult:
+    """Write, read back and delete a throwaway key in the default cache."""
+    cache = caches["default"]
+    key, value = f"health:{uuid.uuid4().hex}", uuid.uuid4().hex
+    cache.set(key, value, 10)
+    ok = cache.get(key) == value
+    cache.delete(key)
+    return ok, {} if ok else {"error": "value written was not read back"}
+
+
+def probe_migrations() -> ProbeResult:
+    """No unapplied migrations on the primary database."""
+    executor = MigrationExecutor(connections["default"])
+    plan = executor.migration_plan(executor.loader.graph.leaf_nodes())
+    pending = [f"{migration.app_label}.{migration.name}"
+               for migration, backwards in plan]
+    return not pending, {"pending": pending}
+
+
+def probe_disk() -> ProbeResult:
+    """Free space on the volume holding logs/."""
+    path = settings.BASE_DIR / "logs"
+    path.mkdir(parents=True, exist_ok=True)
+    usage = shutil.disk_usage(path)
+    minimum = getattr(settings, "HEALTH_MIN_FREE_DISK_MB", 100)
+    free_mb = usage.free // (1024 * 1024)
+    return free_mb >= minimum, {"free_mb": free_mb, "min_free_mb": minimum}
+
+
+PROBES: Dict[str, Callable[[], ProbeResult]] = {
+    "database": probe_databases,
+    "cache": probe_cache,
+    "migrations": probe_migrations,
+    "disk": probe_disk,
+}
+
+
+def run_probes() -> Dict[str, Any]:
+    checks, ready = {}, True
+    for name, probe in PROBES.items():
+        start = time.perf_counter()
+        try:
+            ok, details = probe()
+        except Exception as exc:
+            ok, details = False, {"error": str(exc)}
+        checks[name] = {
+            "ok": ok,
+            "duration_ms": round((time.perf_counter() - start) * 1000, 2),
+            **details,
+        }
+        ready = ready and ok
+    return {"ready": ready, "checked_at": time.time(), "checks": checks}
+
+
+def readiness() -> Dict[str, Any]:
+    """Latest probe report, re-running the probes once the TTL has passed."""
+    ttl = getattr(settings, "HEALTH_PROBE_TTL", 5)
+    with _lock:
+        # Holding the lock while probing collapses concurrent polls into one run
+        now = time.monotonic()
+        if _cached["report"] is None or now - _cached["at"] >= ttl:
+            _cached["report"] = run_probes()
+            _cached["at"] = now
+        report = _cached["report"]
+    return {**report, "age_s": round(time.time() - report["checked_at"], 2)}
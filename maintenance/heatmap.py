@@ -0,0 +1,106 @@
+"""Incident heatmap: zones against the hour of day and day of week.
+
+- counts: one grouped query, the site's logs counted per (zone, ISO
+  weekday, hour) in local time over the last ``days``, optionally for one
+  difficulty and one alarm code. At most zones × 168 rows, whatever the
+  number of logs.
+- fold: those counts as a zones × columns matrix for one of AXES: "hour"
+  (24 columns), "weekday" (7) or "week" (168, Monday 00:00 first).
+- heatmap: the payload of the heatmap endpoint. The grouped counts are
+  computed on the primary and cached per site and filters (every axis
+  folds the same rows) under a version stamp, shared by every worker
+  (maintenance.cache), that maintenance.signals bumps when a log is saved
+  or deleted; entries also expire after HEATMAP_CACHE_TTL seconds, as the
+  window moves.
+"""
+
+import hashlib
+from datetime import timedelta
+from typing import Any, Dict, List, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+from django.db.models.functions import ExtractHour, ExtractIsoWeekDay
+from django.utils import timezone
+
+from .cache import bump_version, versioned_key
+from .models import MaintenanceLog
+from .routers import pin_to_primary
+
+WEEKDAYS = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+AXES = {
+    "hour": [f"{hour:02d}" for hour in range(24)],
+    "weekday": list(WEEKDAYS),
+    "week": [f"{day} {hour:02d}" for day in WEEKDAYS for hour in range(24)],
+}
+DAY_CHOICES = (7, 30, 90, 365)
+DEFAULT_DAYS = 90
+
+Counts = List[Tuple[str, int, int, int]]  # zone, ISO weekday, hour, logs
+
+
+def counts(site, days: int, difficulty: str = "", alarm_code: str = "") -> Counts:
+    tz = timezone.get_current_timezone()
+    logs = MaintenanceLog.objects.filter(
+        site=site, created_at__gte=timezone.now() - timedelta(days=days))
+    if difficulty:
+        logs = logs.filter(difficulty=difficulty)
+    if alarm_code:
+        logs = logs.filter(alarm_code=alarm_code)
+    return [tuple(row) for row in (
+        logs.annotate(weekday=ExtractIsoWeekDay("created_at", tzinfo=tz),
+                      hour=ExtractHour("created_at", tzinfo=tz))
+        .values_list("zone", "weekday", "hour")
+        .annotate(logs=Count("pk"))
+        .order_by())]
+
+
+def _zone_order(zone: str):
+    # "2" before "10"; named zones after the numbered ones
+    return (0, int(zone), "") if zone.isdecimal() else (1, 0, zone)
+
+
+def fold(rows: Counts, axis: str) -> Dict[str, Any]:
+    zones = sorted({zone for zone, *_ in rows}, key=_zone_order)
+    position = {zone: n for n, zone in enumerate(zones)}
+    matrix = [[0] * len(AXES[axis]) for _ in zones]
+    for zone, weekday, hour, logs in rows:
+        column = {"hour": hour, "weekday": weekday - 1,
+                  "week": (weekday - 1) * 24 + hour}[axis]
+        matrix[position[zone]][column] += logs
+    return {
+        "zones": zones,
+        "columns": AXES[axis],
+        "counts": matrix,
+        "max": max((max(row) for row in matrix), default=0),
+        "total": sum(logs for *_, logs in rows),
+    }
+
+
+def _stamp(site_id: int) -> str:
+    return f"maintenance:heatmap:{site_id}"
+
+
+def invalidate_heatmap(site_id: int) -> None:
+    bump_version(_stamp(site_id))
+
+
+def heatmap(site, axis: str = "hour", days: int = DEFAULT_DAYS,
+            difficulty: str = "", alarm_code: str = "") -> Dict[str, Any]:
+    """The endpoint payload; the site must be the current one."""
+    # Alarm codes are user input; hash the filters into a safe key
+    filters = hashlib.sha256(f"{days}|{difficulty}|{alarm_code}".encode()).hexdigest()[:16]
+    key = versioned_key(_stamp(site.pk), filters)
+    rows = cache.get(key)
+    if rows is None:
+        # From the primary: a replica may not have the write behind the bump
+        # yet, and what it returns would stay cached under the new version
+        with pin_to_primary():
+            rows = counts(site, days, difficulty, alarm_code)
+        cache.set(key, rows, getattr(settings, "HEATMAP_CACHE_TTL", 300))
+    return {
+        "axis": axis, "days": days,
+        "difficulty": difficulty, "alarm_code": alarm_code,
+        **fold(rows, axis),
+    }
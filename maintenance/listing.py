@@ -0,0 +1,92 @@
+"""Lean rows for the log list.
+
+The list shows a handful of short columns per log, so it never loads whole
+MaintenanceLog, Equipment and User rows (with their unbounded descriptions):
+- snippet: the first PREVIEW_LENGTH characters of a description, on one
+  line. MaintenanceLog stores it as ``description_preview`` on every save.
+- LIST_FIELDS: the columns log_list.html shows, for ``.values()``.
+- LogRow / EquipmentRow: light, read-only rows with the attribute names the
+  template already uses (``log.equipment.name``, ``log.created_by``).
+- log_rows: turns one page of ``values(*LIST_FIELDS)`` dicts into LogRows.
+- log_page: paginates a log queryset, counting ids only (no joins, and
+  DISTINCT over ids rather than whole rows) and projecting just the page.
+
+``manage.py bench_log_list`` compares this with loading full model rows.
+"""
+
+import re
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional
+
+from django.core.paginator import Page, Paginator
+
+PREVIEW_LENGTH = 160
+_SPACE = re.compile(r"\s+")
+
+LIST_FIELDS = (
+    "pk", "zone", "alarm_code", "alarm_name", "difficulty", "lam_checked",
+    "step_count", "total_duration_minutes", "description_preview",
+    "created_at", "created_by_id", "created_by__username", "equipment_id",
+    "equipment__name", "equipment__asset_tag", "equipment__log_count",
+    "equipment__last_log_at",
+)
+
+
+def snippet(text: str, length: int = PREVIEW_LENGTH) -> str:
+    """``text`` on one line, cut at a word boundary to at most ``length``."""
+    text = _SPACE.sub(" ", text or "").strip()
+    if len(text) <= length:
+        return text
+    cut = text[:length - 1]
+    if " " in cut[length // 2:]:
+        cut = cut[:cut.rindex(" ")]
+    return cut.rstrip(" .,;:") + "…"
+
+
+class EquipmentRow(NamedTuple):
+    pk: int
+    name: str
+    asset_tag: Optional[str]
+    log_count: int
+    last_log_at: Optional[datetime]
+
+
+class LogRow(NamedTuple):
+    pk: int
+    zone: str
+    alarm_code: str
+    alarm_name: str
+    difficulty: str
+    lam_checked: bool
+    step_count: int
+    total_duration_minutes: int
+    description_preview: str
+    created_at: datetime
+    created_by_id: Optional[int]
+    created_by: Optional[str]  # username
+    equipment: Optional[EquipmentRow]
+
+
+def log_rows(values: Iterable[Dict[str, Any]]) -> List[LogRow]:
+    return [LogRow(
+        pk=row["pk"], zone=row["zone"], alarm_code=row["alarm_code"],
+        alarm_name=row["alarm_name"], difficulty=row["difficulty"],
+        lam_checked=row["lam_checked"], step_count=row["step_count"],
+        total_duration_minutes=row["total_duration_minutes"],
+        description_preview=row["description_preview"],
+        created_at=row["created_at"], created_by_id=row["created_by_id"],
+        created_by=row["created_by__username"],
+        equipment=EquipmentRow(
+            pk=row["equipment_id"], name=row["equipment__name"],
+            asset_tag=row["equipment__asset_tag"],
+            log_count=row["equipment__log_count"],
+            last_log_at=row["equipment__last_log_at"],
+        ) if row["equipment_id"] is not None else None,
+    ) for row in values]
+
+
+def log_page(queryset, number, per_page: int = 10) -> Page:
+    """Page ``number`` (clamped like Paginator.get_page) of LogRows."""
+    page = Paginator(queryset.values("pk"), per_page).get_page(number)
+    page.object_list = log_rows(page.object_list.values(*LIST_FIELDS))
+    return page
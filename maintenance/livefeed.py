@@ -0,0 +1,232 @@
+"""Live feed of new and updated logs, as server-sent events (ASGI only).
+
+- summarize: the fields a feed event carries for one log.
+- Subscription: one connected client, its filters (site, zones,
+  difficulties, equipment) and its bounded event queue.
+- Broadcaster: in-process fan-out. Log saves publish to it once committed
+  (maintenance.signals). Other workers' saves never reach this process, so
+  while anyone is subscribed a poller also reads logs updated in the last
+  LIVE_FEED_POLL_SECONDS (plus an overlap for late commits) from each
+  subscribed site's database; events already delivered are dropped by
+  (log id, updated_at). One poll query per site database per interval,
+  however many clients are connected.
+- stream: the SSE body for one subscription. Event ids are updated_at in
+  milliseconds, so a reconnecting client (Last-Event-ID) first gets what it
+  missed. A client that falls LIVE_FEED_QUEUE_SIZE events behind is
+  disconnected and catches up the same way.
+"""
+
+import asyncio
+import json
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Set
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.urls import reverse
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+POLL_OVERLAP = timedelta(seconds=5)
+BACKLOG_LIMIT = 50
+SEEN_LIMIT = 4096
+RETRY_MS = 5000
+
+
+def _setting(name: str, default):
+    return getattr(settings, name, default)
+
+
+def event_id(moment: datetime) -> str:
+    return str(int(moment.timestamp() * 1000))
+
+
+def _updated(event: Dict[str, Any]) -> datetime:
+    return datetime.fromisoformat(event["updated_at"])
+
+
+def parse_event_id(value: str) -> Optional[datetime]:
+    # A client-supplied header: ASCII digits only, and a representable time
+    if not value or not value.isascii() or not value.isdigit():
+        return None
+    try:
+        return datetime.fromtimestamp(int(value) / 1000, tz=dt_timezone.utc)
+    except (OverflowError, OSError, ValueError):
+        return None
+
+
+def summarize(log, created: Optional[bool] = None) -> Dict[str, Any]:
+    if created is None:
+        created = abs(log.updated_at - log.created_at) < timedelta(seconds=1)
+    equipment = log.equipment if log.equipment_id else None
+    return {
+        "event": "created" if created else "updated",
+        "id": log.pk,
+        "site_id": log.site_id,
+        "zone": log.zone,
+        "difficulty": log.difficulty,
+        "alarm_code": log.alarm_code,
+        "alarm_name": log.alarm_name,
+        "equipment_id": log.equipment_id,
+        "equipment": equipment.name if equipment else None,
+        "created_by": log.created_by.get_username() if log.created_by_id else None,
+        "created_at": log.created_at.isoformat(),
+        "updated_at": log.updated_at.isoformat(),
+        "url": reverse("maintenance:log_detail", args=[log.pk]),
+    }
+
+
+def feed_queryset(alias: str, site_id: int, since: datetime):
+    from .models import MaintenanceLog
+    return (MaintenanceLog.objects.using(alias)
+            .filter(site_id=site_id, updated_at__gt=since)
+            .select_related("equipment", "created_by")
+            .order_by("updated_at"))
+
+
+class Subscription:
+    """Created inside the event loop that serves the client."""
+
+    def __init__(self, site, zones: Iterable[str] = (),
+                 difficulties: Iterable[str] = (),
+                 equipment_ids: Iterable[int] = ()):
+        self.site = site
+        self.zones = frozenset(zones)
+        self.difficulties = frozenset(difficulties)
+        self.equipment_ids = frozenset(equipment_ids)
+        self.loop = asyncio.get_running_loop()
+        self.queue: asyncio.Queue = asyncio.Queue(
+            _setting("LIVE_FEED_QUEUE_SIZE", 100))
+
+    @property
+    def alias(self) -> str:
+        return self.site.database or DEFAULT_DB_ALIAS
+
+    def matches(self, event: Dict[str, Any]) -> bool:
+        return (event["site_id"] == self.site.pk
+                and (not self.zones or event["zone"] in self.zones)
+                and (not self.difficulties or event["difficulty"] in self.difficulties)
+                and (not self.equipment_ids
+                     or event["equipment_id"] in self.equipment_ids))
+
+    def push(self, event: Dict[str, Any]) -> None:
+        """Queue ``event``; safe to call from any thread."""
+        try:
+            self.loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            pass  # loop closed: the client is gone
+
+    def _put(self, event) -> None:
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Too far behind: drop the backlog and end the stream; the client
+            # reconnects with Last-Event-ID and reloads what it missed
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(None)
+
+
+class Broadcaster:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions: Set[Subscription] = set()
+        self._seen: "OrderedDict[int, datetime]" = OrderedDict()
+        self._poller: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._subscriptions)
+
+    def subscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            self._subscriptions.add(subscription)
+        if (_setting("LIVE_FEED_POLL_SECONDS", 2) > 0
+                and (self._poller is None or self._poller.done())):
+            self._poller = subscription.loop.create_task(self._poll())
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def publish(self, event: Dict[str, Any]) -> int:
+        """Deliver ``event`` to matching subscribers; returns how many."""
+        updated = _updated(event)
+        with self._lock:
+            seen = self._seen.get(event["id"])
+            if seen is not None and seen >= updated:
+                return 0
+            self._seen[event["id"]] = updated
+            self._seen.move_to_end(event["id"])
+            while len(self._seen) > SEEN_LIMIT:
+                self._seen.popitem(last=False)
+            targets = [s for s in self._subscriptions if s.matches(event)]
+        for subscription in targets:
+            subscription.push(event)
+        return len(targets)
+
+    async def _poll(self) -> None:
+        interval = _setting("LIVE_FEED_POLL_SECONDS", 2)
+        cursor = timezone.now()
+        while self._subscriptions:
+            await asyncio.sleep(interval)
+            since, cursor = cursor - POLL_OVERLAP, timezone.now()
+            with self._lock:
+                sites = {(s.alias, s.site.pk) for s in self._subscriptions}
+            for alias, site_id in sites:
+                try:
+                    async for log in feed_queryset(alias, site_id, since)[:500]:
+                        self.publish(summarize(log))
+                except Exception:
+                    logger.exception("Live feed poll of %s failed", alias)
+
+
+broadcaster = Broadcaster()
+
+
+def format_event(event: Dict[str, Any]) -> str:
+    return (f"id: {event_id(_updated(event))}\nevent: log\n"
+            f"data: {json.dumps(event, separators=(',', ':'))}\n\n")
+
+
+async def backlog(subscription: Subscription,
+                  since: Optional[datetime]) -> List[Dict[str, Any]]:
+    if since is None:
+        return []
+    events = []
+    async for log in feed_queryset(subscription.alias, subscription.site.pk, since):
+        event = summarize(log)
+        if subscription.matches(event):
+            events.append(event)
+            if len(events) >= BACKLOG_LIMIT:
+                break
+    return events
+
+
+async def stream(site, zones, difficulties, equipment_ids,
+                 last_event_id: str = "") -> AsyncIterator[str]:
+    subscription = Subscription(site, zones, difficulties, equipment_ids)
+    heartbeat = _setting("LIVE_FEED_HEARTBEAT_SECONDS", 15)
+    broadcaster.subscribe(subscription)
+    try:
+        yield f"retry: {RETRY_MS}\n\n"
+        sent = {}
+        for event in await backlog(subscription, parse_event_id(last_event_id)):
+            sent[event["id"]] = _updated(event)
+            yield format_event(event)
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.queue.get(), heartbeat)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            if event is None:
+                break
+            if event["id"] in sent and sent[event["id"]] >= _updated(event):
+                continue  # already sent from the backlog
+            yield format_event(event)
+    finally:
+        broadcaster.unsubscribe(subscription)
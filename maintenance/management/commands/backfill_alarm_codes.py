@@ -0,0 +1,109 @@
+"""Build the alarm code catalog from the logs already recorded.
+
+Usage:
+    python manage.py backfill_alarm_codes
+    python manage.py backfill_alarm_codes --site plant-b --rename
+
+For each site, creates an AlarmCode for every alarm code in its logs, named
+with the alarm name logged most often for that code and given the difficulty
+logged most often, links every log to its code's entry and recounts
+occurrences. Existing entries keep their name and difficulty unless they are
+blank or --rename is given. Safe to rerun.
+"""
+
+from collections import Counter, defaultdict
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Trim, Upper
+
+from maintenance.alarms import invalidate_alarms
+from maintenance.counters import alarm_counters
+from maintenance.models import AlarmCode, MaintenanceLog
+from maintenance.routers import pin_to_primary
+from maintenance.sites import all_sites, use_site
+
+
+def _most_common(counts: Counter) -> str:
+    # Ties go to the alphabetically first spelling, so reruns agree
+    return min(counts.items(), key=lambda item: (-item[1], item[0]))[0] if counts else ""
+
+
+class Command(BaseCommand):
+    help = "Create AlarmCode entries from log history and link the logs to them."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--site", action="append", default=None,
+            help="Only this site code (repeatable). Default: every site.",
+        )
+        parser.add_argument(
+            "--rename", action="store_true",
+            help="Also rename existing entries to the most logged name.",
+        )
+
+    def handle(self, *args, **options):
+        sites = all_sites()
+        if options["site"]:
+            unknown = set(options["site"]) - {site.code for site in sites}
+            if unknown:
+                raise CommandError(f"Unknown site {', '.join(sorted(unknown))}.")
+            sites = [site for site in sites if site.code in options["site"]]
+        for site in sites:
+            self.stdout.write(self.style.MIGRATE_HEADING(site.code))
+            with use_site(site), pin_to_primary():
+                self._backfill(site, options["rename"])
+            invalidate_alarms(site.pk)
+
+    def _backfill(self, site, rename: bool) -> None:
+        normalized = Upper(Trim("alarm_code"))
+        names, difficulties = defaultdict(Counter), defaultdict(Counter)
+        for code, name, difficulty, count in (
+                MaintenanceLog.objects.filter(site=site)
+                .annotate(code=normalized).exclude(code="")
+                .values_list("code", "alarm_name", "difficulty")
+                .annotate(count=Count("pk")).order_by()):
+            if name.strip():
+                names[code][name.strip()] += count
+            difficulties[code][difficulty] += count
+
+        with transaction.atomic(using=site.database or DEFAULT_DB_ALIAS):
+            existing = {entry.code: entry
+                        for entry in AlarmCode.objects.filter(site=site)}
+            created, updated = [], []
+            for code in difficulties:
+                name = _most_common(names[code])
+                difficulty = _most_common(difficulties[code])
+                entry = existing.get(code)
+                if entry is None:
+                    created.append(AlarmCode(
+                        site=site, code=code, name=name,
+                        default_difficulty=difficulty))
+                    continue
+                before = (entry.name, entry.default_difficulty)
+                if name and (rename or not entry.name):
+                    entry.name = name
+                entry.default_difficulty = entry.default_difficulty or difficulty
+                if (entry.name, entry.default_difficulty) != before:
+                    updated.append(entry)
+            AlarmCode.objects.bulk_create(created, batch_size=500)
+            AlarmCode.objects.bulk_update(
+                updated, ["name", "default_difficulty"], batch_size=500)
+
+            linked = (MaintenanceLog.objects.filter(site=site)
+                      .exclude(alarm_code="")
+                      .filter(Q(alarm__isnull=True)
+                              | ~Q(alarm__code=Upper(Trim(F("alarm_code")))))
+                      .update(alarm=Subquery(
+                          AlarmCode.objects
+                          .filter(site=site, code=Upper(Trim(OuterRef("alarm_code"))))
+                          .values("pk")[:1])))
+            AlarmCode.objects.filter(site=site).update(
+                **alarm_counters(MaintenanceLog))
+
+        spellings = sum(max(0, len(counts) - 1) for counts in names.values())
+        self.stdout.write(
+            f"  {len(difficulties)} code(s): {len(created)} new, "
+            f"{len(updated)} updated; {linked} log(s) linked; "
+            f"{spellings} extra name spelling(s) folded into one")
@@ -0,0 +1,157 @@
+"""Load test the live feed: how many subscribers one ASGI worker can hold.
+
+Usage:
+    python manage.py bench_live_feed
+    python manage.py bench_live_feed --subscribers 100,1000,3000 --events 40
+
+For each subscriber count, opens that many /logs/feed/ connections against
+the ASGI application in this process (full middleware stack, one event loop,
+as in one uvicorn worker), then publishes ``--events`` log events from a
+worker thread, the way committed saves do, and waits until every client has
+received every event. Reports the time to connect everyone, memory per
+connection (RSS growth) and fan-out latency: from publish until the last
+subscriber has the event. Database polling is off, so only the broadcaster
+is measured. A throwaway user is created and deleted again.
+"""
+
+import asyncio
+import os
+import resource
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.asgi import get_asgi_application
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+from django.utils import timezone
+
+from maintenance.livefeed import broadcaster, event_id
+from maintenance.sites import default_site
+
+
+def _rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class Command(BaseCommand):
+    help = "Measure live feed connections and fan-out latency per worker."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--subscribers", default="100,500,1000",
+                            help="Comma-separated subscriber counts.")
+        parser.add_argument("--events", type=int, default=20)
+        parser.add_argument("--interval-ms", type=int, default=50,
+                            help="Pause between published events.")
+
+    def handle(self, *args, **options):
+        site = default_site()
+        if site is None:
+            raise CommandError("No site exists; run migrate first.")
+        counts = [int(n) for n in options["subscribers"].split(",")]
+        user = get_user_model().objects.create_user("bench-live-feed")
+        try:
+            with override_settings(
+                    SESSION_ENGINE="django.contrib.sessions.backends.signed_cookies",
+                    LIVE_FEED_POLL_SECONDS=0,
+                    LIVE_FEED_MAX_SUBSCRIBERS=max(counts) + 1):
+                client = Client()
+                client.force_login(user)
+                cookie = f"{settings.SESSION_COOKIE_NAME}=" \
+                         f"{client.cookies[settings.SESSION_COOKIE_NAME].value}"
+                self.stdout.write(self.style.MIGRATE_HEADING(
+                    f"{options['events']} events per run, "
+                    f"{options['interval_ms']} ms apart"))
+                self.stdout.write(
+                    f"  {'subscribers':>12}{'connect':>11}{'KiB/conn':>10}"
+                    f"{'fan-out p50':>13}{'p99':>10}{'max':>10}{'deliveries/s':>14}")
+                for count in counts:
+                    row = asyncio.run(self._run(site, cookie, count, options))
+                    self.stdout.write(row)
+        finally:
+            user.delete()
+
+    async def _run(self, site, cookie: str, count: int, options) -> str:
+        app = get_asgi_application()
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+            "method": "GET", "scheme": "https", "path": "/logs/feed/",
+            "raw_path": b"/logs/feed/", "query_string": b"", "root_path": "",
+            "headers": [(b"host", b"localhost"), (b"cookie", cookie.encode())],
+            "client": ("127.0.0.1", 50000), "server": ("localhost", 443),
+        }
+        arrivals = {}  # event id -> arrival times
+        statuses = []
+        ready = asyncio.Semaphore(0)
+
+        def connection():
+            inbox = asyncio.Queue()
+            inbox.put_nowait({"type": "http.request", "body": b"", "more_body": False})
+
+            async def send(message):
+                if message["type"] == "http.response.start":
+                    statuses.append(message["status"])
+                    if message["status"] != 200:
+                        ready.release()
+                elif message["type"] == "http.response.body":
+                    body = message.get("body", b"")
+                    if body.startswith(b"retry:"):
+                        ready.release()
+                    elif body.startswith(b"id: "):
+                        key = body[4:body.index(b"\n")].decode()
+                        arrivals.setdefault(key, []).append(time.perf_counter())
+
+            return asyncio.create_task(app(scope, inbox.get, send)), inbox
+
+        rss_before = _rss_bytes()
+        start = time.perf_counter()
+        connections = [connection() for _ in range(count)]
+        for _ in range(count):
+            await ready.acquire()
+        connect_s = time.perf_counter() - start
+        rss_per_conn = (_rss_bytes() - rss_before) / count
+        if statuses.count(200) != count:
+            raise CommandError(f"Feed answered {sorted(set(statuses))}, "
+                               f"{statuses.count(200)}/{count} connected.")
+
+        loop = asyncio.get_running_loop()
+        published = {}
+        for number in range(options["events"]):
+            now = timezone.now()
+            event = {
+                "event": "created", "id": 10**9 + number, "site_id": site.pk,
+                "zone": "B1", "difficulty": "Easy", "alarm_code": "BENCH",
+                "alarm_name": "", "equipment_id": None, "equipment": None,
+                "created_by": None, "created_at": now.isoformat(),
+                "updated_at": now.isoformat(), "url": "/logs/0/",
+            }
+            published[event_id(now)] = time.perf_counter()
+            await loop.run_in_executor(None, broadcaster.publish, event)
+            await asyncio.sleep(options["interval_ms"] / 1000)
+
+        deadline = time.perf_counter() + 60
+        expected = count * options["events"]
+        while (sum(len(times) for times in arrivals.values()) < expected
+               and time.perf_counter() < deadline):
+            await asyncio.sleep(0.05)
+
+        for task, inbox in connections:
+            inbox.put_nowait({"type": "http.disconnect"})
+        await asyncio.gather(*(task for task, _ in connections),
+                             return_exceptions=True)
+
+        received = sum(len(times) for times in arrivals.values())
+        if received < expected:
+            raise CommandError(f"Only {received}/{expected} deliveries arrived.")
+        latencies = sorted((max(arrivals[key]) - sent) * 1000
+                           for key, sent in published.items())
+        total_s = max(max(t) for t in arrivals.values()) - min(published.values())
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+        return (f"  {count:>12}{connect_s:>10.2f}s{rss_per_conn / 1024:>10.1f}"
+                f"{statistics.median(latencies):>10.1f} ms{p99:>7.1f} ms"
+                f"{latencies[-1]:>7.1f} ms{received / total_s:>14,.0f}")
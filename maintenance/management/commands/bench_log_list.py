@@ -0,0 +1,130 @@
+"""Benchmark a log_list page: full model rows against the lean projection.
+
+Usage:
+    python manage.py bench_log_list
+    python manage.py bench_log_list --logs 5000 --description-kb 50 --pages 10
+
+Creates throwaway logs whose descriptions (and their equipment's) are
+``--description-kb`` KiB long, then for each of the first ``--pages`` pages
+of the list, unfiltered and searched (the search adds DISTINCT), loads the
+page both ways: full MaintenanceLog rows with select_related equipment and
+user, as log_list did, and the LogRows of maintenance.listing.log_page (ids
+counted, only the listed columns loaded). Reports the median time and the
+peak Python memory per page (tracemalloc, measured in a separate pass),
+then the whole view through the test client. The data is rolled back.
+"""
+
+import random
+import statistics
+import time
+import tracemalloc
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.core.paginator import Paginator
+from django.db import transaction
+from django.test import Client
+from django.urls import reverse
+
+from maintenance.listing import log_page, snippet
+from maintenance.models import Equipment, MaintenanceLog
+from maintenance.sites import default_site, use_site
+
+WORDS = ("conveyor belt motor sensor fault reset breaker guard jam overload "
+         "encoder drive alarm inspect replace tighten clean calibrate").split()
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Time and size log_list pages: full rows against the lean projection."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--logs", type=int, default=2000)
+        parser.add_argument("--description-kb", type=int, default=20)
+        parser.add_argument("--pages", type=int, default=5)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        site = default_site()
+        if site is None:
+            raise CommandError("No site exists; run migrate first.")
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"{options['logs']:,} logs, {options['description_kb']} KiB descriptions, "
+            f"{options['pages']} pages of 10"))
+        try:
+            with use_site(site), transaction.atomic(), \
+                    transaction.atomic(using=site.database or "default"):
+                self._run(site, options)
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _run(self, site, options) -> None:
+        rng = random.Random(42)
+        user = get_user_model().objects.create_user("bench-log-list")
+        size = options["description_kb"] * 1024
+
+        def text():
+            words = []
+            while sum(len(w) + 1 for w in words) < size:
+                words.append(rng.choice(WORDS))
+            return " ".join(words)
+
+        equipment = Equipment.objects.bulk_create([
+            Equipment(site=site, name=f"Bench line {n}", asset_tag=f"BENCH-LIST-{n}",
+                      zone=f"Z{n % 10}", description=text()) for n in range(50)])
+        logs = []
+        for n in range(options["logs"]):
+            description = text()
+            logs.append(MaintenanceLog(
+                site=site, zone=f"Z{n % 10}", equipment=rng.choice(equipment),
+                alarm_code=f"ALM-{n % 200}", difficulty=rng.choice(WORDS[:3]),
+                description=description, description_preview=snippet(description),
+                created_by=user))
+        MaintenanceLog.objects.bulk_create(logs, batch_size=200)
+
+        base = MaintenanceLog.objects.filter(site=site).order_by("-created_at")
+        searched = base.filter(alarm_code__icontains="ALM-1").distinct()
+        self.stdout.write(
+            f"  {'page':<26}{'full ms':>10}{'lean ms':>10}{'full KiB':>11}{'lean KiB':>11}")
+        for label, qs in (("list", base), ("search (DISTINCT)", searched)):
+            for number in range(1, options["pages"] + 1):
+                full = self._measure(lambda: list(Paginator(
+                    qs.select_related("equipment", "created_by"), 10
+                ).page(number).object_list), options["repeat"])
+                lean = self._measure(lambda: log_page(qs, number).object_list,
+                                     options["repeat"])
+                self.stdout.write(
+                    f"  {f'{label} {number}':<26}{full[0]:>10.2f}{lean[0]:>10.2f}"
+                    f"{full[1]:>11.0f}{lean[1]:>11.0f}")
+
+        client = Client()
+        client.force_login(user)
+        url = reverse("maintenance:log_list")
+        timings = []
+        for _ in range(options["repeat"]):
+            start = time.perf_counter()
+            response = client.get(url)
+            timings.append((time.perf_counter() - start) * 1000)
+        self.stdout.write(
+            f"  log_list view (lean, rendered): {statistics.median(timings):.1f} ms, "
+            f"{len(response.content) / 1024:.0f} KiB HTML")
+
+    @staticmethod
+    def _measure(load, repeat: int):
+        """Median ms of ``load()``, then its peak traced memory in KiB."""
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            load()
+            timings.append((time.perf_counter() - start) * 1000)
+        tracemalloc.start()
+        try:
+            load()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        return statistics.median(timings), peak / 1024
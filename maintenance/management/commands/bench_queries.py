@@ -0,0 +1,109 @@
+"""Count SQL queries per request on the main views for each session setup.
+
+Usage:
+    python manage.py bench_queries
+    python manage.py bench_queries --requests 5
+
+Logs in a throwaway technician and requests each view through the test
+client, once per combination of SESSION_MODE (db / cached_db /
+signed_cookies) and the authenticated-user cache (off / on). The first
+request warms the caches; the reported figure is the mean of the following
+``--requests`` requests. Everything runs in a transaction that is rolled
+back, so the database is left untouched.
+"""
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from maintenance.models import Equipment, MaintenanceLog, Step
+from maintenance.sites import default_site, use_site
+
+ENGINES = {
+    "db": "django.contrib.sessions.backends.db",
+    "cached_db": "django.contrib.sessions.backends.cached_db",
+    "signed_cookies": "django.contrib.sessions.backends.signed_cookies",
+}
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Measure queries per request across session modes and the user cache."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=3)
+
+    def handle(self, *args, **options):
+        site = default_site()
+        if site is None:
+            raise CommandError("No site exists; run migrate first.")
+        try:
+            # The throwaway technician belongs to no site, so the views
+            # show them the default site
+            with use_site(site), transaction.atomic(), \
+                    transaction.atomic(using=site.database or "default"):
+                self._run(site, max(1, options["requests"]))
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _run(self, site, repeat: int) -> None:
+        user = get_user_model().objects.create_user(
+            "bench-queries", password="unused-password")
+        equipment = Equipment.objects.create(site=site, name="Bench conveyor")
+        log = MaintenanceLog.objects.create(
+            site=site, zone="Z1", equipment=equipment, alarm_code="BENCH",
+            difficulty="Easy", description="Query count benchmark",
+            created_by=user)
+        Step.objects.create(log=log, order=1, action="Inspect", result="OK")
+
+        urls = {
+            "home": reverse("maintenance:home"),
+            "log_list": reverse("maintenance:log_list"),
+            "log_detail": reverse("maintenance:log_detail", args=[log.pk]),
+            "log_create": reverse("maintenance:log_create"),
+            "equipment_list": reverse("maintenance:equipment_list"),
+        }
+        setups = [(mode, ttl) for mode in ENGINES for ttl in (0, 30)]
+        results = {}
+        for mode, ttl in setups:
+            with override_settings(SESSION_ENGINE=ENGINES[mode],
+                                   AUTH_USER_CACHE_TTL=ttl):
+                client = Client(HTTP_HOST="localhost")  # an ALLOWED_HOSTS entry
+                client.force_login(user)
+                results[mode, ttl] = {
+                    name: self._count(client, url, repeat)
+                    for name, url in urls.items()}
+
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"Queries per request (mean of {repeat}, after one warm-up)"))
+        header = "".join(f"{name:>16}" for name in urls)
+        self.stdout.write(f"  {'session / user cache':<28}{header}")
+        for mode, ttl in setups:
+            label = f"{mode} / {'on' if ttl else 'off'}"
+            row = "".join(f"{results[mode, ttl][name]:>16.1f}" for name in urls)
+            self.stdout.write(f"  {label:<28}{row}")
+
+    @staticmethod
+    def _count(client: Client, url: str, repeat: int) -> float:
+        client.get(url)
+        total = 0
+        for _ in range(repeat):
+            contexts = [CaptureQueriesContext(connections[alias])
+                        for alias in connections]
+            for context in contexts:
+                context.__enter__()
+            try:
+                response = client.get(url)
+            finally:
+                for context in contexts:
+                    context.__exit__(None, None, None)
+            assert response.status_code == 200, (url, response.status_code)
+            total += sum(len(context) for context in contexts)
+        return total / repeat
@@ -0,0 +1,92 @@
+"""Benchmark and cross-process check for the shared rate-limit store.
+
+Usage:
+    python manage.py bench_ratelimit
+    python manage.py bench_ratelimit --iterations 5000 --processes 8
+
+1. Per-request overhead: time django-ratelimit's ``is_ratelimited`` (the call
+   the @ratelimit decorator makes) against the shared CounterCache and, for
+   reference, against a per-process LocMem cache.
+2. Consistency: N worker processes hammer one key under a fixed limit; exactly
+   ``limit`` hits must be allowed in total, however the hits interleave.
+"""
+
+import multiprocessing
+import statistics
+import time
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import RequestFactory, override_settings
+from django_ratelimit.core import is_ratelimited
+
+LOCMEM = {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+COUNTER = {"BACKEND": "maintenance.cache.CounterCache"}
+
+
+def _hit(group: str, rate: str) -> bool:
+    request = RequestFactory().post("/", REMOTE_ADDR="10.0.0.1")
+    return is_ratelimited(request, group=group, key="ip", rate=rate,
+                          method="POST", increment=True)
+
+
+def _worker(args):
+    group, rate, hits = args
+    connections.close_all()  # never share the parent's DB connection
+    allowed = sum(1 for _ in range(hits) if not _hit(group, rate))
+    connections.close_all()
+    return allowed
+
+
+class Command(BaseCommand):
+    help = "Measure rate-limit overhead and check limits hold across processes."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=2000)
+        parser.add_argument("--processes", type=int, default=4)
+        parser.add_argument("--hits-per-process", type=int, default=200)
+        parser.add_argument("--limit", type=int, default=150)
+
+    def handle(self, *args, **options):
+        self._overhead(options["iterations"])
+        self._consistency(options["processes"], options["hits_per_process"],
+                          options["limit"])
+
+    def _overhead(self, iterations: int) -> None:
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"Per-request overhead ({iterations} hits)"))
+        for label, backend in (("LocMem (per process)", LOCMEM),
+                               ("CounterCache (shared)", COUNTER)):
+            caches = {"default": LOCMEM, "bench": backend}
+            with override_settings(CACHES=caches, RATELIMIT_USE_CACHE="bench"):
+                group = f"bench-{uuid.uuid4().hex}"
+                samples = []
+                for _ in range(iterations):
+                    start = time.perf_counter()
+                    _hit(group, f"{iterations * 2}/h")
+                    samples.append((time.perf_counter() - start) * 1e6)
+            samples.sort()
+            self.stdout.write(
+                f"  {label:<24} mean {statistics.fmean(samples):8.1f} us   "
+                f"p50 {samples[len(samples) // 2]:8.1f} us   "
+                f"p99 {samples[int(len(samples) * 0.99) - 1]:8.1f} us")
+
+    def _consistency(self, processes: int, hits: int, limit: int) -> None:
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"Cross-process consistency ({processes} processes x {hits} hits, "
+            f"limit {limit}/h)"))
+        group = f"bench-{uuid.uuid4().hex}"
+        connections.close_all()
+        context = multiprocessing.get_context("fork")
+        with context.Pool(processes) as pool:
+            allowed = pool.map(
+                _worker, [(group, f"{limit}/h", hits)] * processes)
+
+        total = sum(allowed)
+        expected = min(limit, processes * hits)
+        self.stdout.write(f"  allowed per process: {allowed}")
+        self.stdout.write(f"  allowed in total:    {total} (expected {expected})")
+        if total != expected:
+            raise CommandError("Rate limit was not enforced consistently.")
+        self.stdout.write(self.style.SUCCESS("  OK"))
@@ -0,0 +1,141 @@
+"""Benchmark reliability metrics: per-equipment queries against one pass.
+
+Usage:
+    python manage.py bench_reliability
+    python manage.py bench_reliability --equipment 500 --logs 50000
+
+Creates throwaway equipment and logs (with steps and repeating alarm codes)
+spread over the reliability window, then times:
+- per equipment: one query for each asset's logs, metrics in a Python loop,
+  the way a page would compute them one asset at a time;
+- maintenance.reliability.compute: one query and the vectorized pass, with
+  NumPy and with the pure-Python fallback (same numbers, checked).
+Reports the median time of each. The data is rolled back.
+"""
+
+import random
+import statistics
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from maintenance import reliability
+from maintenance.models import Equipment, MaintenanceLog
+from maintenance.sites import default_site, use_site
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Time reliability metrics: per-equipment queries against the one-pass compute."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--equipment", type=int, default=200)
+        parser.add_argument("--logs", type=int, default=20000)
+        parser.add_argument("--repeat", type=int, default=3)
+
+    def handle(self, *args, **options):
+        site = default_site()
+        if site is None:
+            raise CommandError("No site exists; run migrate first.")
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"{options['equipment']:,} equipment, {options['logs']:,} logs"))
+        try:
+            with use_site(site), transaction.atomic(), \
+                    transaction.atomic(using=site.database or "default"):
+                self._run(site, options)
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _run(self, site, options) -> None:
+        rng = random.Random(42)
+        now = timezone.now()
+        window = getattr(settings, "RELIABILITY_WINDOW_DAYS", 180)
+        equipment = Equipment.objects.bulk_create([
+            Equipment(site=site, name=f"Bench asset {n}", asset_tag=f"BENCH-REL-{n}",
+                      zone=f"Z{n % 12}") for n in range(options["equipment"])])
+        logs = [
+            MaintenanceLog(
+                site=site, zone=f"Z{n % 12}", equipment=rng.choice(equipment),
+                alarm_code=f"ALM-{rng.randrange(40)}", difficulty="Easy",
+                step_count=rng.randrange(4),
+                total_duration_minutes=rng.randrange(5, 240))
+            for n in range(options["logs"])]
+        MaintenanceLog.objects.bulk_create(logs, batch_size=500)
+        # created_at is auto_now_add; spread the logs over the window
+        for log in logs:
+            log.created_at = now - timedelta(seconds=rng.randrange(window * 86400))
+        MaintenanceLog.objects.bulk_update(logs, ["created_at"], batch_size=500)
+
+        def per_equipment():
+            since = now - timedelta(days=window)
+            result = {}
+            for asset in Equipment.objects.filter(site=site):
+                rows = list(asset.logs.filter(created_at__gte=since)
+                            .order_by("created_at")
+                            .values_list("created_at", "step_count",
+                                         "total_duration_minutes", "alarm_code"))
+                if not rows:
+                    continue
+                gaps = [(b[0] - a[0]).total_seconds() for a, b in zip(rows, rows[1:])]
+                fixed = [row[2] for row in rows if row[1]]
+                codes = [row[3] for row in rows if row[3]]
+                result[asset.pk] = (
+                    len(rows), sum(gaps) / len(gaps) / 3600 if gaps else None,
+                    sum(fixed) / len(fixed) if fixed else None,
+                    (len(codes) - len(set(codes))) / len(rows))
+            return result
+
+        def one_pass(sums):
+            def run():
+                held = reliability._sums
+                reliability._sums = sums
+                try:
+                    return reliability.compute(site, now)
+                finally:
+                    reliability._sums = held
+            return run
+
+        timings = {"per-equipment queries": self._time(per_equipment, options["repeat"])}
+        results = {}
+        passes = [("one pass, pure Python", reliability._sums_python)]
+        if reliability.np is not None:
+            passes.append(("one pass, NumPy", reliability._sums_numpy))
+        else:
+            self.stdout.write("  NumPy is not installed; timing the fallback only.")
+        for label, sums in passes:
+            timings[label] = self._time(one_pass(sums), options["repeat"])
+            results[label] = one_pass(sums)()
+        if len(results) == 2:
+            python, vectorized = results.values()
+            if not all(_close(python[key], vectorized[key])
+                       for key in ("equipment", "zones")):
+                raise CommandError("NumPy and pure-Python metrics differ.")
+        for label, ms in timings.items():
+            self.stdout.write(f"  {label:<26}{ms:>10.1f} ms")
+
+    @staticmethod
+    def _time(run, repeat: int) -> float:
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            run()
+            timings.append((time.perf_counter() - start) * 1000)
+        return statistics.median(timings)
+
+
+def _close(left, right) -> bool:
+    if left.keys() != right.keys():
+        return False
+    for key in left:
+        for a, b in zip(left[key], right[key]):
+            if (a is None) != (b is None) or (a is not None and abs(a - b) > 1e-6 * max(1, abs(a))):
+                return False
+    return True
@@ -0,0 +1,129 @@
+"""Benchmark report regeneration against building reports live from the logs.
+
+Usage:
+    python manage.py bench_reports
+    python manage.py bench_reports --logs 50000 --weeks 12 --zones 20
+
+Creates throwaway logs (with steps) spread over ``--weeks`` weeks and times:
+- live: the current week's report computed on demand from MaintenanceLog
+  and Step with aggregate queries, as a view would without stored reports;
+- a full rebuild of the shift aggregates;
+- an incremental refresh after ``--new`` more logs arrive;
+- writing the week and shift reports from the aggregates;
+- serving the latest stored report (finding and reading the file).
+Reports go to a temporary MEDIA_ROOT; the data is rolled back.
+"""
+
+import random
+import tempfile
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.test import override_settings
+from django.utils import timezone
+
+from maintenance.models import MaintenanceLog, Step
+from maintenance.reports import (
+    refresh_aggregates, report_path, shift_bounds, week_bounds, write_report,
+)
+from maintenance.sites import default_site, use_site
+
+ALARMS = [f"ALM-{n}" for n in range(100, 160)]
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Time offline report regeneration and serving against live queries."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--logs", type=int, default=20000)
+        parser.add_argument("--weeks", type=int, default=8)
+        parser.add_argument("--zones", type=int, default=12)
+        parser.add_argument("--steps", type=int, default=3)
+        parser.add_argument("--new", type=int, default=50)
+
+    def handle(self, *args, **options):
+        site = default_site()
+        if site is None:
+            raise CommandError("No site exists; run migrate first.")
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"{options['logs']:,} logs over {options['weeks']} weeks, "
+            f"{options['zones']} zones, {options['steps']} steps each"))
+        try:
+            with tempfile.TemporaryDirectory() as media, \
+                    override_settings(MEDIA_ROOT=media), use_site(site), \
+                    transaction.atomic(using=site.database or "default"):
+                self._run(site, options)
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _timed(self, label: str, func, *args):
+        start = time.perf_counter()
+        result = func(*args)
+        self.stdout.write(f"  {label:<34}{(time.perf_counter() - start) * 1000:>10.1f} ms")
+        return result
+
+    def _run(self, site, options) -> None:
+        rng = random.Random(42)
+        now = timezone.now()
+        span = options["weeks"] * 7 * 24 * 3600
+        zones = [f"Z{n}" for n in range(1, options["zones"] + 1)]
+        self._seed(site, rng, zones, options["logs"], options["steps"],
+                   lambda: now - timedelta(seconds=rng.uniform(0, span)))
+
+        week_start, week_end = week_bounds(now)
+        shift_start, shift_end = shift_bounds(now)
+        self._timed("live week report (no storage)", self._live,
+                    site, week_start, week_end)
+        self._timed("full aggregate rebuild", refresh_aggregates, site, True)
+        self._seed(site, rng, zones, options["new"], options["steps"], lambda: now)
+        self._timed(f"incremental refresh (+{options['new']} logs)",
+                    refresh_aggregates, site)
+        self._timed("write week report", write_report,
+                    site, "week", week_start, week_end)
+        self._timed("write shift report", write_report,
+                    site, "shift", shift_start, shift_end)
+        self._timed("serve latest week report", lambda: report_path(
+            site, "week", "latest", "html").read_bytes())
+
+    @staticmethod
+    def _seed(site, rng, zones, count: int, steps: int, moment) -> None:
+        logs = MaintenanceLog.objects.bulk_create([
+            MaintenanceLog(site=site, zone=rng.choice(zones),
+                           alarm_code=rng.choice(ALARMS),
+                           difficulty=rng.choice(["Easy", "Medium", "Hard"]),
+                           description="bench")
+            for _ in range(count)], batch_size=1000)
+        rows = []
+        for log in logs:
+            log.created_at = moment()
+            log.step_count = rng.randint(0, steps)
+            minutes = [rng.randint(1, 60) for _ in range(log.step_count)]
+            log.total_duration_minutes = sum(minutes)
+            rows += [Step(log=log, order=order, action="bench", duration_minutes=m)
+                     for order, m in enumerate(minutes, 1)]
+        # bulk_update skips auto_now_add, so the logs keep their spread dates
+        MaintenanceLog.objects.bulk_update(
+            logs, ["created_at", "step_count", "total_duration_minutes"],
+            batch_size=1000)
+        Step.objects.bulk_create(rows, batch_size=1000)
+
+    @staticmethod
+    def _live(site, start, end) -> None:
+        logs = MaintenanceLog.objects.filter(
+            site=site, created_at__gte=start, created_at__lt=end).order_by()
+        list(logs.values("zone").annotate(
+            incidents=Count("pk", distinct=True),
+            hard=Count("pk", filter=Q(difficulty="Hard"), distinct=True),
+            minutes=Sum("steps__duration_minutes")))
+        list(logs.values("zone", "alarm_code").annotate(n=Count("pk")))
+        list(MaintenanceLog.objects.filter(
+            site=site, difficulty="Hard", steps__isnull=True,
+            created_at__lt=end).values("pk", "zone", "alarm_code"))
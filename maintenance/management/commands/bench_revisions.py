@@ -0,0 +1,133 @@
+"""Benchmark revision history storage and reconstruction on heavily edited logs.
+
+Usage:
+    python manage.py bench_revisions
+    python manage.py bench_revisions --logs 10 --edits 200 --steps 8
+
+Creates throwaway logs and applies random edits through the ORM (a field
+change, a step edit, a step added or removed), recording a revision after
+each. For several snapshot intervals it reports the revision bytes stored
+against storing a full uncompressed JSON snapshot per edit, and the time to
+reconstruct random historical versions. Runs in a transaction that is
+rolled back.
+"""
+
+import json
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Max
+from django.test import override_settings
+
+from maintenance.models import LogRevision, MaintenanceLog, Step
+from maintenance.revisions import current_state, reconstruct, record_revision
+from maintenance.sites import default_site, use_site
+
+WORDS = ("motor overload tripped belt reset breaker sensor misaligned photo eye "
+         "cleaned jam cleared carton guide rail adjusted fuse replaced drive "
+         "fault encoder cable checked tension roller worn").split()
+
+
+def _text(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Measure revision storage growth and reconstruction time."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--logs", type=int, default=5)
+        parser.add_argument("--edits", type=int, default=100)
+        parser.add_argument("--steps", type=int, default=6)
+        parser.add_argument("--intervals", default="1,10,25",
+                            help="Comma-separated REVISION_SNAPSHOT_EVERY values.")
+
+    def handle(self, *args, **options):
+        intervals = [int(n) for n in options["intervals"].split(",")]
+        site = default_site()
+        if site is None:
+            raise CommandError("No site exists; run migrate first.")
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"{options['logs']} logs x {options['edits']} edits, "
+            f"{options['steps']} initial steps"))
+        self.stdout.write(
+            f"  {'snapshot every':<16}{'revision bytes':>16}{'full snapshots':>16}"
+            f"{'ratio':>8}{'rebuild p50':>14}{'rebuild max':>14}")
+        for every in intervals:
+            try:
+                with use_site(site), transaction.atomic(), \
+                        transaction.atomic(using=site.database or "default"), \
+                        override_settings(REVISION_SNAPSHOT_EVERY=every):
+                    self._run(site, every, options)
+                    raise _Rollback
+            except _Rollback:
+                pass
+
+    def _run(self, site, every: int, options) -> None:
+        rng = random.Random(42)  # same edit sequence for every interval
+        user = get_user_model().objects.create_user("bench-revisions")
+        full_bytes = 0
+        log_ids = []
+        for _ in range(options["logs"]):
+            log = MaintenanceLog.objects.create(
+                site=site, zone="B1", alarm_code="BENCH", difficulty="Medium",
+                description=_text(rng, 40), created_by=user)
+            for order in range(1, options["steps"] + 1):
+                Step.objects.create(log=log, order=order, action=_text(rng, 12),
+                                    result=_text(rng, 8), duration_minutes=5)
+            record_revision(log.pk, user)
+            full_bytes += self._snapshot_size(log.pk)
+            for _ in range(options["edits"]):
+                self._edit(rng, log)
+                record_revision(log.pk, user)
+                full_bytes += self._snapshot_size(log.pk)
+            log_ids.append(log.pk)
+
+        stored = sum(len(bytes(data)) for data in LogRevision.objects.filter(
+            log_id__in=log_ids).values_list("data", flat=True))
+        timings = []
+        for log_id in log_ids:
+            latest = LogRevision.objects.filter(log_id=log_id).aggregate(
+                n=Max("number"))["n"]
+            for number in rng.sample(range(1, latest + 1), min(20, latest)):
+                start = time.perf_counter()
+                reconstruct(log_id, number)
+                timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        self.stdout.write(
+            f"  {every:<16}{stored:>16,}{full_bytes:>16,}"
+            f"{stored / full_bytes:>8.1%}"
+            f"{timings[len(timings) // 2]:>11.2f} ms{timings[-1]:>11.2f} ms")
+
+    @staticmethod
+    def _snapshot_size(log_id: int) -> int:
+        return len(json.dumps(current_state(log_id), separators=(",", ":")))
+
+    @staticmethod
+    def _edit(rng: random.Random, log: MaintenanceLog) -> None:
+        steps = list(log.steps.all())
+        choice = rng.random()
+        if choice < 0.3:
+            log.description += " " + _text(rng, 4)
+            log.save()
+        elif choice < 0.4:
+            log.difficulty = rng.choice(["Easy", "Medium", "Hard"])
+            log.save()
+        elif choice < 0.8 and steps:
+            step = rng.choice(steps)
+            step.result = _text(rng, 8)
+            step.duration_minutes = rng.randint(1, 60)
+            step.save()
+        elif choice < 0.9 or len(steps) < 2:
+            order = max(s.order for s in steps) + 1 if steps else 1
+            Step.objects.create(log=log, order=order, action=_text(rng, 12),
+                                result=_text(rng, 8), duration_minutes=5)
+        else:
+            rng.choice(steps).delete()
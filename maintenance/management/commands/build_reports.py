@@ -0,0 +1,76 @@
+"""Write the per-zone shift and weekly reports to storage.
+
+Usage:
+    python manage.py build_reports                       # current + previous period
+    python manage.py build_reports --kind week --previous 4
+    python manage.py build_reports --full                # rebuild every aggregate
+
+Brings each site's shift aggregates up to date (only the shifts that
+changed, see maintenance.reports), then writes the current and
+``--previous`` earlier reports of each kind as HTML and CSV, which the
+Reports page serves as-is. Run it from a scheduler at every shift change or
+more often, e.g. ``*/15 * * * * python manage.py build_reports``; run with
+``--full`` after bulk imports or deletions older than REPORT_LOOKBACK_HOURS.
+"""
+
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from maintenance.reports import KINDS, bounds, refresh_aggregates, write_report
+from maintenance.routers import pin_to_primary
+from maintenance.sites import all_sites, use_site
+
+
+class Command(BaseCommand):
+    help = "Refresh shift aggregates and write shift/weekly zone reports."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--site", action="append", default=None,
+            help="Only this site code (repeatable). Default: every site.",
+        )
+        parser.add_argument(
+            "--kind", action="append", choices=KINDS, default=None,
+            help="Only this kind of report (repeatable). Default: both.",
+        )
+        parser.add_argument(
+            "--previous", type=int, default=1,
+            help="Earlier periods to (re)write besides the current one.",
+        )
+        parser.add_argument(
+            "--full", action="store_true",
+            help="Recompute every shift aggregate, not only changed shifts.",
+        )
+
+    def handle(self, *args, **options):
+        sites = all_sites()
+        if options["site"]:
+            unknown = set(options["site"]) - {site.code for site in sites}
+            if unknown:
+                raise CommandError(f"Unknown site {', '.join(sorted(unknown))}.")
+            sites = [site for site in sites if site.code in options["site"]]
+        kinds = options["kind"] or KINDS
+        for site in sites:
+            self.stdout.write(self.style.MIGRATE_HEADING(site.code))
+            with use_site(site), pin_to_primary():
+                start = time.perf_counter()
+                shifts = refresh_aggregates(site, full=options["full"])
+                self.stdout.write(
+                    f"  aggregates: {shifts} shift(s) recomputed in "
+                    f"{(time.perf_counter() - start) * 1000:.0f} ms")
+                for kind in kinds:
+                    self._write(site, kind, options["previous"])
+
+    def _write(self, site, kind: str, previous: int) -> None:
+        moment = timezone.now()
+        for _ in range(previous + 1):
+            period_start, period_end = bounds(kind, moment)
+            start = time.perf_counter()
+            report = write_report(site, kind, period_start, period_end)
+            self.stdout.write(
+                f"  {kind} {report['period']}: {len(report['zones'])} zone(s) in "
+                f"{(time.perf_counter() - start) * 1000:.0f} ms")
+            moment = period_start - timedelta(microseconds=1)
@@ -0,0 +1,138 @@
+"""Check every view's queries and query plans against the stored budgets.
+
+Usage:
+    python manage.py check_query_budgets                 # exits 1 on regressions
+    python manage.py check_query_budgets --case log_list --case log_detail
+    python manage.py check_query_budgets -v 2            # every statement and plan
+    python manage.py check_query_budgets --update        # accept the current numbers
+
+Seeds a fixed dataset, requests every maintenance route and admin
+changelist through the test client and compares the queries each request
+runs, the tables it reads by full scan and the indexes it uses with
+maintenance/query_budgets.json (see maintenance.querybudget). Fails on more
+queries than budgeted (with a diff of the statements and any statement
+repeated, the usual N+1 sign), on a new full table scan (with its plan)
+and on an index no longer used. Run it in CI next to ``manage.py check``;
+after an intended change, rerun with ``--update`` and commit the JSON.
+
+Budgets record the database vendor; against another vendor only query
+counts are compared. Everything runs in transactions that are rolled back
+and files go to a temporary MEDIA_ROOT.
+"""
+
+import json
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import override_settings
+
+from maintenance.querybudget import (
+    budget_entry, cases, compare, measure, seed, uncovered,
+)
+from maintenance.routers import REPLICA
+from maintenance.sites import default_site, use_site
+
+BUDGETS = Path(__file__).resolve().parents[2] / "query_budgets.json"
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Compare queries and query plans of every view with the stored budgets."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--case", action="append", default=None,
+                            help="Only this case (repeatable).")
+        parser.add_argument("--update", action="store_true",
+                            help="Write the measured numbers as the new budgets.")
+        parser.add_argument("--budgets", default=str(BUDGETS),
+                            help="Budget file.")
+
+    def handle(self, *args, **options):
+        if REPLICA in settings.DATABASES:
+            raise CommandError("Budgets are measured on the primary; "
+                               "unset DATABASE_REPLICA_URL.")
+        site = default_site()
+        if site is None:
+            raise CommandError("No site exists; run migrate first.")
+        path = Path(options["budgets"])
+        stored = json.loads(path.read_text()) if path.exists() else {}
+        aliases = sorted({"default", site.database or "default"})
+        try:
+            with tempfile.TemporaryDirectory() as media, \
+                    override_settings(MEDIA_ROOT=media), use_site(site), \
+                    transaction.atomic(), \
+                    transaction.atomic(using=site.database or "default"):
+                results = self._run(site, aliases, stored, options)
+                raise _Rollback
+        except _Rollback:
+            pass
+
+        measured, failed, broken = results
+        if broken:
+            # A budget is only meaningful for the response the case expects
+            raise CommandError(f"Unexpected status for {', '.join(broken)}; "
+                               "fix the case or the view first.")
+        if options["update"]:
+            budgets = stored.get("cases", {}) if options["case"] else {}
+            budgets.update({name: budget_entry(m) for name, m in measured.items()})
+            path.write_text(json.dumps(
+                {"vendor": connection.vendor, "cases": budgets},
+                indent=2, sort_keys=True) + "\n")
+            self.stdout.write(f"Wrote {len(measured)} budget(s) to {path}.")
+        elif failed:
+            raise CommandError(
+                f"{len(failed)} case(s) over budget: {', '.join(failed)}.")
+
+    def _run(self, site, aliases, stored, options):
+        data = seed(site)
+        selected = [case for case in cases(data)
+                    if not options["case"] or case.name in options["case"]]
+        if options["case"] and len(selected) != len(set(options["case"])):
+            known = {case.name for case in cases(data)}
+            raise CommandError(
+                f"Unknown case {', '.join(sorted(set(options['case']) - known))}.")
+        plans = stored.get("vendor", connection.vendor) == connection.vendor
+        budgets = stored.get("cases", {})
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"Query budgets ({connection.vendor}, {len(selected)} cases)"
+            + ("" if plans else f", plans skipped: budgets are for {stored['vendor']}")))
+
+        measured, failed, broken = {}, [], []
+        for case in selected:
+            result = measured[case.name] = measure(case, data, aliases)
+            budget = budgets.get(case.name)
+            verdict = compare(budget, result, plans)
+            if result["status"] != case.status:
+                broken.append(case.name)
+                verdict["failures"].insert(
+                    0, f"status {result['status']}, expected {case.status}")
+            figures = f"{result['queries']}/{budget['queries'] if budget else '?'} queries"
+            if verdict["failures"] and (case.name in broken or not options["update"]):
+                failed.append(case.name)
+                self.stdout.write(self.style.ERROR(f"  FAIL  {case.name:<36}{figures}"))
+                for line in verdict["failures"]:
+                    self.stdout.write(f"          {line}")
+            else:
+                self.stdout.write(f"  ok    {case.name:<36}{figures}")
+            for line in verdict["notes"]:
+                self.stdout.write(self.style.WARNING(f"          {line}"))
+            if options["verbosity"] > 1:
+                for statement in result["details"]:
+                    self.stdout.write(f"          [{statement['alias']}] "
+                                      f"{statement['sql']}")
+                    for line in statement.get("plan", []):
+                        self.stdout.write(f"            plan: {line}")
+
+        if not options["case"]:
+            for name in uncovered(selected):
+                failed.append(name)
+                self.stdout.write(self.style.ERROR(
+                    f"  FAIL  {name:<36}no case requests this route "
+                    "(add one to maintenance.querybudget.cases)"))
+        return measured, failed, broken
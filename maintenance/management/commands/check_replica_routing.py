@@ -0,0 +1,126 @@
+"""Check replica routing and read-your-writes stickiness against a real replica.
+
+Usage (locally, with a second SQLite file as the replica):
+    export DATABASE_REPLICA_URL=sqlite:////abs/path/replica.sqlite3
+    python manage.py migrate --database replica
+    python manage.py check_replica_routing
+
+The two files are not replicated, which is what makes routing visible: a row
+written to the primary is missing on the "replica" until copied over.
+
+1. Router: outside pin_to_primary reads go to ``replica``, inside it to
+   ``default``; writes always go to ``default``.
+2. Middleware: where ReplicaRoutingMiddleware sends the reads of a GET, a
+   POST, a GET carrying the sticky cookie the POST set, and a GET whose
+   cookie has expired.
+3. Data: equipment written on the primary is read back when pinned and is
+   not found on the replica otherwise. The row is rolled back.
+"""
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, router, transaction
+from django.http import HttpResponse
+from django.test import RequestFactory
+
+from maintenance.middleware import STICKY_COOKIE, ReplicaRoutingMiddleware
+from maintenance.models import Equipment, MaintenanceLog
+from maintenance.routers import PRIMARY, REPLICA, pin_to_primary
+from maintenance.sites import all_sites, use_site
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Check that reads use the replica and stick to the primary after writes."
+
+    def handle(self, *args, **options):
+        if REPLICA not in connections.databases:
+            raise CommandError(
+                "No replica configured: set DATABASE_REPLICA_URL (e.g. "
+                "sqlite:////abs/path/replica.sqlite3) and run "
+                "'migrate --database replica' first.")
+        if Equipment._meta.db_table not in connections[REPLICA].introspection.table_names():
+            raise CommandError("The replica has no schema; run "
+                               "'migrate --database replica' first.")
+        site = next((site for site in all_sites() if not site.database), None)
+        if site is None:
+            raise CommandError("Every site has its own database; the replica "
+                               "only serves sites stored in default.")
+
+        failures = []
+
+        def expect(label: str, got, wanted) -> None:
+            ok = got == wanted
+            self.stdout.write(f"  {label:<52}{got!s:>10}  "
+                              + (self.style.SUCCESS("OK") if ok
+                                 else self.style.ERROR(f"expected {wanted}")))
+            if not ok:
+                failures.append(label)
+
+        with use_site(site):
+            self._router(expect)
+            self._middleware(expect)
+            self._data(site, expect)
+        if failures:
+            raise CommandError(f"{len(failures)} routing check(s) failed.")
+        self.stdout.write(self.style.SUCCESS("Replica routing OK"))
+
+    def _router(self, expect) -> None:
+        self.stdout.write(self.style.MIGRATE_HEADING("Router"))
+        with pin_to_primary(False):
+            expect("read", router.db_for_read(MaintenanceLog), REPLICA)
+            expect("write", router.db_for_write(MaintenanceLog), PRIMARY)
+        with pin_to_primary():
+            expect("read, pinned", router.db_for_read(MaintenanceLog), PRIMARY)
+
+    def _middleware(self, expect) -> None:
+        self.stdout.write(self.style.MIGRATE_HEADING("ReplicaRoutingMiddleware"))
+        seen = []
+
+        def view(request):
+            seen.append(router.db_for_read(MaintenanceLog))
+            return HttpResponse()
+
+        middleware = ReplicaRoutingMiddleware(view)
+        factory = RequestFactory()
+
+        middleware(factory.get("/"))
+        expect("GET", seen[-1], REPLICA)
+        response = middleware(factory.post("/"))
+        expect("POST", seen[-1], PRIMARY)
+        cookie = response.cookies.get(STICKY_COOKIE)
+        expect("POST sets the sticky cookie", cookie is not None, True)
+
+        request = factory.get("/")
+        request.COOKIES[STICKY_COOKIE] = cookie.value if cookie else ""
+        middleware(request)
+        expect(f"GET within {middleware.window}s of the POST", seen[-1], PRIMARY)
+
+        request = factory.get("/")
+        request.COOKIES[STICKY_COOKIE] = str(int(time.time() - 1))
+        middleware(request)
+        expect("GET after the window", seen[-1], REPLICA)
+
+    def _data(self, site, expect) -> None:
+        self.stdout.write(self.style.MIGRATE_HEADING("Read-your-writes"))
+        try:
+            with transaction.atomic(using=PRIMARY):
+                with pin_to_primary():
+                    equipment = Equipment.objects.create(
+                        site=site, name="Replica routing check",
+                        asset_tag="CHECK-REPLICA-ROUTING")
+                expect("written to", equipment._state.db, PRIMARY)
+                with pin_to_primary():
+                    expect("found when pinned",
+                           Equipment.objects.filter(pk=equipment.pk).exists(), True)
+                with pin_to_primary(False):
+                    expect("found on the replica (not replicated)",
+                           Equipment.objects.filter(
+                               asset_tag=equipment.asset_tag).exists(), False)
+                raise _Rollback
+        except _Rollback:
+            pass
@@ -0,0 +1,147 @@
+"""Check site partitioning against real site databases.
+
+Usage (locally, with a second SQLite file for one site):
+    export SITE_DATABASE_URLS=plant-b=sqlite:////abs/path/plant-b.sqlite3
+    python manage.py migrate
+    python manage.py migrate --database site_plant-b
+    (admin) add Site "plant-b" with database "site_plant-b"
+    python manage.py sync_site_directory
+    python manage.py check_site_routing
+
+1. Directory: each site database holds copies of its sites' rows and of
+   every user, so its foreign keys resolve.
+2. Routing: inside use_site() the partitioned models read and write the
+   site's database. A log created for every site must land in that site's
+   database only. The logs are rolled back.
+3. Membership: another process adds a user to a site, then removes them.
+   This process's cached site list must follow each change at once. The
+   temporary user is deleted afterwards.
+"""
+
+import multiprocessing
+import uuid
+from contextlib import ExitStack
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections, router, transaction
+
+from maintenance.models import MaintenanceLog, Site
+from maintenance.routers import pin_to_primary
+from maintenance.sites import all_sites, use_site
+
+
+class _Rollback(Exception):
+    pass
+
+
+def _change_membership(site_id: int, user_id: int, add: bool) -> None:
+    connections.close_all()  # never share the parent's DB connection
+    members = Site.objects.get(pk=site_id).members
+    members.add(user_id) if add else members.remove(user_id)
+    connections.close_all()
+
+
+class Command(BaseCommand):
+    help = "Check that each site's data goes to its own database."
+
+    def handle(self, *args, **options):
+        sites = all_sites()
+        own = [site for site in sites
+               if site.database and site.database != DEFAULT_DB_ALIAS]
+        if not own:
+            raise CommandError(
+                "No site has its own database: set SITE_DATABASE_URLS, run "
+                "'migrate --database site_<code>' and point a Site at it "
+                "(see --help).")
+        missing = sorted({site.database for site in own} - set(connections.databases))
+        if missing:
+            raise CommandError(f"Database {', '.join(missing)} is not configured "
+                               "(SITE_DATABASE_URLS).")
+
+        failures = []
+
+        def expect(label: str, got, wanted) -> None:
+            ok = got == wanted
+            self.stdout.write(f"  {label:<52}{got!s:>14}  "
+                              + (self.style.SUCCESS("OK") if ok
+                                 else self.style.ERROR(f"expected {wanted}")))
+            if not ok:
+                failures.append(label)
+
+        self._directory(own, expect)
+        self._routing(sites, expect)
+        self._membership(own[0], expect)
+        if failures:
+            raise CommandError(f"{len(failures)} site check(s) failed.")
+        self.stdout.write(self.style.SUCCESS("Site routing OK"))
+
+    def _directory(self, own, expect) -> None:
+        self.stdout.write(self.style.MIGRATE_HEADING("Directory copies"))
+        users = get_user_model().objects.using(DEFAULT_DB_ALIAS).count()
+        for alias in sorted({site.database for site in own}):
+            site_ids = [site.pk for site in own if site.database == alias]
+            expect(f"{alias}: site rows",
+                   Site.objects.using(alias).filter(pk__in=site_ids).count(),
+                   len(site_ids))
+            expect(f"{alias}: users",
+                   get_user_model().objects.using(alias).count(), users)
+
+    def _routing(self, sites, expect) -> None:
+        self.stdout.write(self.style.MIGRATE_HEADING("Routing"))
+        user = get_user_model().objects.using(DEFAULT_DB_ALIAS).order_by("pk").first()
+        if user is None:
+            raise CommandError("No user exists; create one first.")
+        marker = f"check_site_routing {uuid.uuid4().hex}"
+        stored_in = {site.pk: site.database or DEFAULT_DB_ALIAS for site in sites}
+        try:
+            with ExitStack() as stack:
+                for alias in sorted(set(stored_in.values())):
+                    stack.enter_context(transaction.atomic(using=alias))
+                for site in sites:
+                    with use_site(site), pin_to_primary():
+                        expect(f"{site.code}: reads from",
+                               router.db_for_read(MaintenanceLog), stored_in[site.pk])
+                        log = MaintenanceLog.objects.create(
+                            site=site, zone="CHECK", alarm_code="CHECK",
+                            difficulty=MaintenanceLog.Difficulty.EASY,
+                            description=marker, created_by_id=user.pk)
+                        expect(f"{site.code}: log written to",
+                               log._state.db, stored_in[site.pk])
+                for alias in sorted(set(stored_in.values())):
+                    expect(f"{alias}: holds the logs of", ", ".join(sorted(
+                        site.code for site in sites
+                        if site.pk in set(MaintenanceLog.objects.using(alias)
+                                          .filter(description=marker)
+                                          .values_list("site_id", flat=True)))),
+                        ", ".join(sorted(site.code for site in sites
+                                         if stored_in[site.pk] == alias)))
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _membership(self, site, expect) -> None:
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"Membership of {site.code}, changed by another process"))
+        user = get_user_model().objects.create_user(
+            f"check-site-routing-{uuid.uuid4().hex[:8]}")
+        context = multiprocessing.get_context("fork")
+
+        def member() -> bool:
+            # Through this process's cached site list
+            return user.pk in next(s for s in all_sites() if s.pk == site.pk).member_ids
+
+        try:
+            expect("member before", member(), False)
+            for add in (True, False):
+                connections.close_all()
+                process = context.Process(target=_change_membership,
+                                          args=(site.pk, user.pk, add))
+                process.start()
+                process.join()
+                if process.exitcode:
+                    raise CommandError("The membership change failed.")
+                expect("member after being " + ("added" if add else "removed"),
+                       member(), add)
+        finally:
+            user.delete()
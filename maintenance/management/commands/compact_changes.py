@@ -0,0 +1,54 @@
+"""Compact the change feed of every site (schedule it, e.g. hourly).
+
+Usage:
+    python manage.py compact_changes
+    python manage.py compact_changes --site main --keep-hours 0
+
+Deletes entries superseded by a newer entry for the same object once they
+are ``--keep-hours`` old, and tombstones older than CHANGE_FEED_TOMBSTONE_DAYS
+(cursors from before then get 410 and start over). Each object keeps its
+newest entry, so the table stays about as large as the data it describes.
+"""
+
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from maintenance.changefeed import compact
+from maintenance.routers import pin_to_primary
+from maintenance.sites import all_sites, use_site
+
+
+class Command(BaseCommand):
+    help = "Delete superseded change feed entries and expired tombstones."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--site", action="append", default=None,
+            help="Only this site code (repeatable). Default: every site.",
+        )
+        parser.add_argument(
+            "--keep-hours", type=int, default=1,
+            help="Keep superseded entries younger than this (default 1).",
+        )
+
+    def handle(self, *args, **options):
+        sites = all_sites()
+        if options["site"]:
+            unknown = set(options["site"]) - {site.code for site in sites}
+            if unknown:
+                raise CommandError(f"Unknown site {', '.join(sorted(unknown))}.")
+            sites = [site for site in sites if site.code in options["site"]]
+        before = timezone.now() - timedelta(hours=max(options["keep_hours"], 0))
+        for site in sites:
+            with use_site(site), pin_to_primary(), \
+                    transaction.atomic(using=site.database or "default"):
+                start = time.perf_counter()
+                deleted = compact(site, before)
+            self.stdout.write(
+                f"{site.code}: {deleted['superseded']} superseded and "
+                f"{deleted['tombstones']} tombstone(s) deleted in "
+                f"{(time.perf_counter() - start) * 1000:.0f} ms")
@@ -0,0 +1,119 @@
+"""Database housekeeping: session purge, vacuum, table stats, index health.
+
+Usage:
+    python manage.py db_maintain                       # everything, every database
+    python manage.py db_maintain --stats --indexes     # report only
+    python manage.py db_maintain --purge-sessions --batch-size 5000
+    python manage.py db_maintain --vacuum --database site_plant-b
+    python manage.py db_maintain --indexes -v 2        # list healthy indexes too
+
+With no task flags, every task runs. Databases are default plus every site
+database (the read replica is maintained by its primary). Expired sessions
+only live in default, and only with the db or cached_db session engine.
+VACUUM rewrites the whole SQLite file and blocks writers meanwhile; run it
+off-shift. Run ``--indexes`` after ``--vacuum`` (which also runs ANALYZE) so
+SQLite's selectivity figures are current. See maintenance.dbmaint.
+"""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+from django.template.defaultfilters import filesizeformat
+
+from maintenance.dbmaint import (
+    free_bytes, index_report, purge_sessions, table_stats, vacuum,
+)
+from maintenance.sites import site_databases
+
+DB_SESSION_ENGINES = ("django.contrib.sessions.backends.db",
+                      "django.contrib.sessions.backends.cached_db")
+
+
+def _size(value) -> str:
+    return filesizeformat(value) if value is not None else "?"
+
+
+class Command(BaseCommand):
+    help = "Purge expired sessions, vacuum/analyze, and report table and index health."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--purge-sessions", action="store_true")
+        parser.add_argument("--vacuum", action="store_true")
+        parser.add_argument("--stats", action="store_true")
+        parser.add_argument("--indexes", action="store_true")
+        parser.add_argument(
+            "--database", action="append", default=None,
+            help="Only this alias (repeatable). Default: default and every site database.",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000,
+                            help="Sessions deleted per statement.")
+
+    def handle(self, *args, **options):
+        self.verbosity = options["verbosity"]
+        tasks = {task for task in ("purge_sessions", "vacuum", "stats", "indexes")
+                 if options[task]}
+        tasks = tasks or {"purge_sessions", "vacuum", "stats", "indexes"}
+        aliases = options["database"] or [DEFAULT_DB_ALIAS, *sorted(site_databases())]
+        unknown = set(aliases) - set(settings.DATABASES)
+        if unknown:
+            raise CommandError(f"Unknown database {', '.join(sorted(unknown))}.")
+
+        for alias in aliases:
+            self.stdout.write(self.style.MIGRATE_HEADING(alias))
+            if "purge_sessions" in tasks and alias == DEFAULT_DB_ALIAS:
+                self._purge(options["batch_size"])
+            if "vacuum" in tasks:
+                self._vacuum(alias)
+            if "stats" in tasks:
+                self._stats(alias)
+            if "indexes" in tasks:
+                self._indexes(alias)
+
+    def _purge(self, batch_size: int) -> None:
+        if settings.SESSION_ENGINE not in DB_SESSION_ENGINES:
+            self.stdout.write(f"  sessions: {settings.SESSION_ENGINE} keeps none in "
+                              "the database, nothing to purge")
+            return
+        deleted = purge_sessions(batch_size)
+        self.stdout.write(f"  sessions: {deleted} expired row(s) deleted")
+
+    def _vacuum(self, alias: str) -> None:
+        result = vacuum(alias)
+        if result is None:
+            self.stdout.write("  vacuum: not supported for this database, skipped")
+        elif "before" in result:
+            self.stdout.write(
+                f"  vacuum: ANALYZE + VACUUM, {_size(result['before'])} -> "
+                f"{_size(result['after'])}")
+        else:
+            self.stdout.write("  vacuum: VACUUM (ANALYZE) done")
+
+    def _stats(self, alias: str) -> None:
+        stats = table_stats(alias)
+        self.stdout.write(
+            f"  {'table':<36}{'rows':>10}{'table':>12}{'indexes':>12}{'dead rows':>11}")
+        for row in stats:
+            dead = "" if row["dead_rows"] is None else f"{row['dead_rows']:,}"
+            rows = "?" if row["rows"] is None else f"{row['rows']:,}"
+            self.stdout.write(
+                f"  {row['table']:<36}{rows:>10}{_size(row['bytes']):>12}"
+                f"{_size(row['index_bytes']):>12}{dead:>11}")
+        reclaimable = free_bytes(alias)
+        if reclaimable:
+            self.stdout.write(f"  free pages VACUUM would reclaim: {_size(reclaimable)}")
+
+    def _indexes(self, alias: str) -> None:
+        report = index_report(alias)
+        flagged = [row for row in report if row["problems"]]
+        self.stdout.write(f"  indexes: {len(report)}, flagged: {len(flagged)}")
+        for row in report:
+            usage = (f"{row['scans']:,} scans" if row["scans"] is not None
+                     else f"~{row['rows_per_key']:,} rows/key"
+                     if row["rows_per_key"] is not None else "no usage data")
+            line = (f"  {row['table']}.{row['index']} ({', '.join(row['columns'])})"
+                    f"{' unique' if row['unique'] else ''}: {_size(row['bytes'])}, {usage}")
+            if row["problems"]:
+                self.stdout.write(self.style.WARNING(
+                    f"{line} - {'; '.join(row['problems'])}"))
+            elif self.verbosity > 1:
+                self.stdout.write(line)
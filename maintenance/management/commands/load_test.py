@@ -0,0 +1,435 @@
+"""HTTP load test: concurrent technicians against a running server.
+
+Usage:
+    ./start.sh                                   # or: python manage.py runserver
+    python manage.py load_test
+    python manage.py load_test --users 40 --duration 120 --think-ms 2000
+    python manage.py load_test --url http://127.0.0.1:8000 \\
+        --mix browse=60,detail=25,create=10,equipment=5
+
+Drives the server over real HTTP, so the whole deployment is measured:
+Gunicorn workers (``start.sh`` runs 2 sync workers, recycled every 1000
+requests), middleware, sessions and the database. Each virtual user logs in
+through the login form, then loops over weighted scenarios with a random
+think time (exponential, mean ``--think-ms``) in between:
+- browse: log_list with a random zone, difficulty, search or page;
+- detail: log_detail of a log seen in a list;
+- create: the log form, then a POST with the log and its steps;
+- equipment: the log form, then a quick-add of equipment (the AJAX call
+  from the form, CSRF token in the X-CSRFToken header).
+Reports requests, errors, throughput and p50/p95/p99 per URL name.
+
+The client is plain asyncio (one keep-alive connection per user, opened
+again whenever the server closes it, as sync workers do) with its own
+cookie jar; CSRF tokens are read from the forms. Virtual users are created
+in the database this command is configured with (the server's), and they,
+their logs and their equipment are deleted afterwards unless ``--keep``.
+log_create is rate limited to 10 POSTs a minute per user; 403s on it mean
+the limit was hit, not that the server failed.
+"""
+
+import asyncio
+import random
+import re
+import ssl
+import statistics
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlencode, urlsplit
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+
+from maintenance.models import Equipment, MaintenanceLog
+from maintenance.sites import default_site
+
+SCENARIOS = ("browse", "detail", "create", "equipment")
+DEFAULT_MIX = "browse=55,detail=30,create=10,equipment=5"
+PREFIX = "loadtest"
+PASSWORD = "load-test-password"
+CSRF_INPUT = re.compile(rb'name="csrfmiddlewaretoken" value="([^"]+)"')
+LOG_LINK = re.compile(rb'href="/logs/(\d+)/"')
+
+
+class Response:
+    def __init__(self, status: int, headers: Dict[str, List[str]], body: bytes):
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+    def header(self, name: str) -> str:
+        return self.headers.get(name, [""])[-1]
+
+
+class HttpClient:
+    """One browser: a keep-alive HTTP/1.1 connection and a cookie jar."""
+
+    def __init__(self, base_url: str, timeout: float):
+        parts = urlsplit(base_url)
+        if parts.scheme not in ("http", "https"):
+            raise CommandError(f"Unsupported URL {base_url}.")
+        self.base_url = f"{parts.scheme}://{parts.netloc}"
+        self.host = parts.hostname
+        self.port = parts.port or (443 if parts.scheme == "https" else 80)
+        self.ssl = ssl.create_default_context() if parts.scheme == "https" else None
+        self.timeout = timeout
+        self.cookies: Dict[str, str] = {}
+        self.reader = self.writer = None
+
+    async def request(self, method: str, path: str, data: Optional[dict] = None,
+                      headers: Optional[Dict[str, str]] = None) -> Response:
+        body = urlencode(data, doseq=True).encode() if data is not None else b""
+        lines = [f"{method} {path} HTTP/1.1", f"Host: {urlsplit(self.base_url).netloc}",
+                 "User-Agent: maintenatrack-load-test", "Accept: text/html,*/*",
+                 f"Referer: {self.base_url}{path}"]
+        if self.cookies:
+            lines.append("Cookie: " + "; ".join(f"{k}={v}" for k, v in self.cookies.items()))
+        if method != "GET":
+            lines += [f"Origin: {self.base_url}",
+                      "Content-Type: application/x-www-form-urlencoded",
+                      f"Content-Length: {len(body)}"]
+        lines += [f"{k}: {v}" for k, v in (headers or {}).items()]
+        message = ("\r\n".join(lines) + "\r\n\r\n").encode() + body
+        return await asyncio.wait_for(self._exchange(message, method), self.timeout)
+
+    async def _exchange(self, message: bytes, method: str) -> Response:
+        reused = self.writer is not None
+        if not reused:
+            await self._connect()
+        try:
+            self.writer.write(message)
+            await self.writer.drain()
+            response = await self._read(method)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            self.close()
+            if not reused:
+                raise
+            # The server dropped the idle connection: send it once more
+            await self._connect()
+            self.writer.write(message)
+            await self.writer.drain()
+            response = await self._read(method)
+        for cookie in response.headers.get("set-cookie", []):
+            name, _, value = cookie.split(";", 1)[0].partition("=")
+            if value.strip('"') and "max-age=0" not in cookie.lower():
+                self.cookies[name.strip()] = value
+            else:
+                self.cookies.pop(name.strip(), None)
+        if response.header("connection").lower() == "close":
+            self.close()
+        return response
+
+    async def _connect(self) -> None:
+        self.reader, self.writer = await asyncio.open_connection(
+            self.host, self.port, ssl=self.ssl)
+
+    async def _read(self, method: str) -> Response:
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionResetError("connection closed by server")
+        version, status = status_line.split()[:2]
+        headers: Dict[str, List[str]] = defaultdict(list)
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()].append(value.strip())
+        status = int(status)
+        if version == b"HTTP/1.0":
+            headers["connection"].append("close")
+        if method == "HEAD" or status in (204, 304):
+            body = b""
+        elif "chunked" in ",".join(headers.get("transfer-encoding", [])):
+            chunks = []
+            while True:
+                size = int((await self.reader.readline()).split(b";")[0], 16)
+                if not size:
+                    await self.reader.readline()
+                    break
+                chunks.append(await self.reader.readexactly(size))
+                await self.reader.readline()
+            body = b"".join(chunks)
+        elif "content-length" in headers:
+            body = await self.reader.readexactly(int(headers["content-length"][-1]))
+        else:
+            body = await self.reader.read()
+            headers["connection"].append("close")
+        return Response(status, dict(headers), body)
+
+    def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+
+class Stats:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+
+    def record(self, name: str, seconds: float, status: str, ok: bool) -> None:
+        if ok:
+            self.latencies[name].append(seconds)
+        else:
+            self.statuses[name][status] += 1
+
+
+class VirtualUser:
+    def __init__(self, username: str, options, stats: Stats, pool: dict,
+                 rng: random.Random):
+        self.username = username
+        self.client = HttpClient(options["url"], options["timeout"])
+        self.stats = stats
+        self.pool = pool  # zones, alarm codes, log ids seen so far
+        self.rng = rng
+        self.csrf = ""
+
+    async def fetch(self, name: str, method: str, path: str,
+                    data: Optional[dict] = None, headers=None,
+                    expect: Tuple[int, ...] = (200,)) -> Optional[Response]:
+        label = name if method == "GET" else f"{name} {method}"
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(method, path, data, headers)
+        except asyncio.TimeoutError:
+            self.client.close()
+            self.stats.record(label, 0, "timeout", False)
+            return None
+        except (OSError, ValueError, asyncio.IncompleteReadError) as exc:
+            self.client.close()
+            self.stats.record(label, 0, type(exc).__name__, False)
+            return None
+        seconds = time.perf_counter() - start
+        if response.status == 302 and name != "login" \
+                and response.header("location").startswith(reverse("login")):
+            # Session lost (expired or flushed): counts as a failure, log in again
+            self.stats.record(label, seconds, "302 to login", False)
+            await self.login()
+            return None
+        ok = response.status in expect
+        status = str(response.status)
+        if response.status == 200 and 302 in expect:
+            status = "200 form re-shown"  # validation or save error, see the page
+        self.stats.record(label, seconds, status, ok)
+        match = CSRF_INPUT.search(response.body)
+        if match:
+            self.csrf = match.group(1).decode()
+        return response if ok else None
+
+    async def login(self) -> bool:
+        login_url = reverse("login")
+        if await self.fetch("login", "GET", login_url) is None:
+            return False
+        return await self.fetch("login", "POST", login_url, {
+            "csrfmiddlewaretoken": self.csrf,
+            "username": self.username, "password": PASSWORD,
+        }, expect=(302,)) is not None
+
+    async def browse(self) -> None:
+        query = {}
+        pick = self.rng.random()
+        if pick < 0.3 and self.pool["zones"]:
+            query["zone"] = self.rng.choice(self.pool["zones"])
+        elif pick < 0.45:
+            query["difficulty"] = self.rng.choice(MaintenanceLog.Difficulty.values)
+        elif pick < 0.65 and self.pool["alarms"]:
+            query["q"] = self.rng.choice(self.pool["alarms"])
+        elif pick < 0.8:
+            query["page"] = self.rng.randint(2, 5)
+        url = reverse("maintenance:log_list")
+        response = await self.fetch(
+            "log_list", "GET", f"{url}?{urlencode(query)}" if query else url)
+        if response is not None:
+            ids = self.pool["log_ids"]
+            ids.extend(int(pk) for pk in LOG_LINK.findall(response.body)[:5])
+            del ids[:-500]
+
+    async def detail(self) -> None:
+        if not self.pool["log_ids"]:
+            return await self.browse()
+        pk = self.rng.choice(self.pool["log_ids"])
+        await self.fetch("log_detail", "GET",
+                         reverse("maintenance:log_detail", args=[pk]), expect=(200, 404))
+
+    async def create(self) -> None:
+        url = reverse("maintenance:log_create")
+        if await self.fetch("log_create", "GET", url) is None:
+            return
+        await self.think()
+        steps = self.rng.randint(1, 3)
+        data = {
+            "csrfmiddlewaretoken": self.csrf,
+            "zone": self.rng.choice(self.pool["zones"] or ["LT1"]),
+            "alarm_code": self.rng.choice(self.pool["alarms"] or ["LT-100"]),
+            "alarm_name": "", "difficulty": self.rng.choice(
+                MaintenanceLog.Difficulty.values),
+            # Unique, so the duplicate check lets the log through
+            "description": f"{PREFIX} {self.username} {time.time_ns()}",
+            "confirm_new": "1",
+            "steps-TOTAL_FORMS": steps, "steps-INITIAL_FORMS": 0,
+            "steps-MIN_NUM_FORMS": 0, "steps-MAX_NUM_FORMS": 1000,
+        }
+        for n in range(steps):
+            data.update({f"steps-{n}-order": n + 1,
+                         f"steps-{n}-action": f"Step {n + 1}: reset and check",
+                         f"steps-{n}-result": "OK",
+                         f"steps-{n}-duration_minutes": self.rng.randint(1, 30)})
+        response = await self.fetch("log_create", "POST", url, data, expect=(302,))
+        if response is not None:
+            match = re.search(r"/logs/(\d+)/", response.header("location"))
+            if match:
+                self.pool["log_ids"].append(int(match.group(1)))
+
+    async def equipment(self) -> None:
+        if await self.fetch("log_create", "GET", reverse("maintenance:log_create")) is None:
+            return
+        await self.think()
+        await self.fetch("add_equipment", "POST", reverse("maintenance:add_equipment"), {
+            "name": f"{PREFIX} {self.username} {self.rng.randint(1, 50)}",
+            "zone": self.rng.choice(self.pool["zones"] or ["LT1"]),
+        }, headers={"X-CSRFToken": self.csrf, "X-Requested-With": "XMLHttpRequest"})
+
+    async def think(self) -> None:
+        mean = self.pool["think_s"]
+        if mean:
+            await asyncio.sleep(self.rng.expovariate(1 / mean))
+
+    async def run(self, deadline: float, mix: Dict[str, int]) -> None:
+        try:
+            if not await self.login():
+                return
+            names, weights = list(mix), list(mix.values())
+            while time.monotonic() < deadline:
+                await getattr(self, self.rng.choices(names, weights)[0])()
+                await self.think()
+        finally:
+            self.client.close()
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    if len(values) < 2:
+        return values[0] if values else 0.0
+    return statistics.quantiles(values, n=100, method="inclusive")[pct - 1]
+
+
+class Command(BaseCommand):
+    help = "Replay weighted technician traffic against a running server over HTTP."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", default="http://127.0.0.1:8000",
+                            help="Base URL of the running server.")
+        parser.add_argument("--users", type=int, default=20)
+        parser.add_argument("--duration", type=int, default=60, help="Seconds.")
+        parser.add_argument("--ramp-up", type=int, default=10,
+                            help="Seconds over which the users start.")
+        parser.add_argument("--think-ms", type=int, default=1000,
+                            help="Mean pause between a user's actions (0: none).")
+        parser.add_argument("--mix", default=DEFAULT_MIX,
+                            help="Scenario weights, e.g. browse=60,detail=30,create=10.")
+        parser.add_argument("--timeout", type=float, default=30,
+                            help="Seconds before a request counts as failed.")
+        parser.add_argument("--seed", type=int, default=None)
+        parser.add_argument("--keep", action="store_true",
+                            help="Keep the virtual users and what they created.")
+
+    def handle(self, *args, **options):
+        mix = self._mix(options["mix"])
+        site = default_site()
+        if site is None:
+            raise CommandError("No site exists; run migrate first.")
+        users = self._users(options["users"])
+        alias = site.database or "default"
+        logs = MaintenanceLog.objects.using(alias).filter(site=site)
+        pool = {
+            "zones": list(logs.order_by().values_list("zone", flat=True).distinct()[:50]),
+            "alarms": list(logs.order_by().values_list("alarm_code", flat=True)
+                           .distinct()[:50]),
+            "log_ids": list(logs.order_by("-pk").values_list("pk", flat=True)[:200]),
+            "think_s": options["think_ms"] / 1000,
+        }
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"{len(users)} users for {options['duration']} s against {options['url']}, "
+            f"mix {', '.join(f'{k}={v}' for k, v in mix.items())}"))
+        try:
+            stats, elapsed = asyncio.run(self._run(users, pool, mix, options))
+        finally:
+            if not options["keep"]:
+                MaintenanceLog.objects.using(alias).filter(created_by__in=users).delete()
+                Equipment.objects.using(alias).filter(
+                    site=site, name__startswith=f"{PREFIX} ").delete()
+                get_user_model().objects.filter(pk__in=[u.pk for u in users]).delete()
+        self._report(stats, elapsed)
+
+    @staticmethod
+    def _mix(value: str) -> Dict[str, int]:
+        mix = {}
+        for part in value.split(","):
+            name, _, weight = part.partition("=")
+            if name.strip() not in SCENARIOS or not weight.strip().isdigit():
+                raise CommandError(
+                    f"Bad --mix entry {part!r}; scenarios are {', '.join(SCENARIOS)}.")
+            mix[name.strip()] = int(weight)
+        if not any(mix.values()):
+            raise CommandError("--mix needs at least one non-zero weight.")
+        return mix
+
+    @staticmethod
+    def _users(count: int) -> list:
+        User = get_user_model()
+        users = []
+        for n in range(1, count + 1):
+            user, _ = User.objects.get_or_create(username=f"{PREFIX}-{n}")
+            user.set_password(PASSWORD)
+            user.save()
+            users.append(user)
+        return users
+
+    async def _run(self, users, pool, mix, options):
+        try:
+            probe = HttpClient(options["url"], options["timeout"])
+            await probe.request("GET", reverse("maintenance:health_check"))
+            probe.close()
+        except (OSError, asyncio.TimeoutError) as exc:
+            raise CommandError(f"No server at {options['url']} ({exc}); start it first, "
+                               "e.g. ./start.sh or python manage.py runserver.")
+        stats = Stats()
+        rng = random.Random(options["seed"])
+        start = time.monotonic()
+        deadline = start + options["duration"]
+        tasks = []
+        for n, user in enumerate(users):
+            vu = VirtualUser(user.username, options, stats, pool,
+                             random.Random(rng.random()))
+            delay = options["ramp_up"] * n / len(users)
+            tasks.append(asyncio.create_task(self._later(delay, vu.run(deadline, mix))))
+        await asyncio.gather(*tasks)
+        return stats, time.monotonic() - start
+
+    @staticmethod
+    async def _later(delay: float, coro):
+        await asyncio.sleep(delay)
+        await coro
+
+    def _report(self, stats: Stats, elapsed: float) -> None:
+        self.stdout.write(
+            f"  {'url name':<22}{'requests':>9}{'errors':>8}{'req/s':>8}"
+            f"{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}  failures")
+        total = failed = 0
+        for name in sorted(set(stats.latencies) | set(stats.statuses)):
+            latencies = sorted(stats.latencies[name])
+            errors = sum(stats.statuses[name].values())
+            count = len(latencies) + errors
+            total += count
+            failed += errors
+            ms = [_percentile(latencies, p) * 1000 for p in (50, 95, 99)]
+            line = (f"  {name:<22}{count:>9}{errors:>8}{count / elapsed:>8.1f}"
+                    f"{ms[0]:>9.1f}{ms[1]:>9.1f}{ms[2]:>9.1f}  "
+                    + ", ".join(f"{status} x{n}" for status, n
+                                in sorted(stats.statuses[name].items())))
+            self.stdout.write(self.style.WARNING(line) if errors else line)
+        self.stdout.write(
+            f"  {'total':<22}{total:>9}{failed:>8}{total / elapsed:>8.1f}"
+            f"  over {elapsed:.1f} s")
@@ -0,0 +1,55 @@
+"""Render missing attachment thumbnails and clean up upload leftovers.
+
+Usage:
+    python manage.py make_thumbnails
+    python manage.py make_thumbnails --workers 4
+
+Thumbnails are normally rendered in the web worker's process pool right
+after upload; a restart can drop queued jobs. This renders any image
+attachment still without a thumbnail, and removes abandoned temporary
+upload files older than an hour.
+"""
+
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+
+from maintenance.attachments import blob_path, storage_root, thumbnail_path
+from maintenance.models import Attachment
+from maintenance.sites import site_databases
+from maintenance.thumbnails import make_thumbnail
+
+
+class Command(BaseCommand):
+    help = "Render missing attachment thumbnails."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=2)
+
+    def handle(self, *args, **options):
+        images = set()
+        for alias in [DEFAULT_DB_ALIAS, *site_databases()]:
+            images.update(Attachment.objects.using(alias)
+                          .filter(content_type__startswith="image/")
+                          .values_list("sha256", flat=True).distinct())
+        pending = [
+            (str(blob_path(sha256)), str(thumbnail_path(sha256)))
+            for sha256 in sorted(images)
+            if blob_path(sha256).exists() and not thumbnail_path(sha256).exists()
+        ]
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"{len(pending)} thumbnail(s) to render"))
+        if pending:
+            with ProcessPoolExecutor(max_workers=options["workers"]) as pool:
+                results = list(pool.map(make_thumbnail, *zip(*pending)))
+            self.stdout.write(f"  rendered {sum(results)}, "
+                              f"not renderable {len(results) - sum(results)}")
+
+        cutoff = time.time() - 3600
+        stale = [path for path in (storage_root() / "tmp").glob("*")
+                 if path.stat().st_mtime < cutoff]
+        for path in stale:
+            path.unlink(missing_ok=True)
+        self.stdout.write(f"  removed {len(stale)} abandoned upload(s)")
@@ -0,0 +1,157 @@
+"""Report the bytes each main page ships (HTML + static assets).
+
+Usage:
+    python manage.py page_weight
+    python manage.py page_weight --budget 400000   # exit 1 if any page exceeds it
+
+Sizes are read from STATIC_ROOT after ``collectstatic`` (including the .gz/.br
+variants WhiteNoise pre-builds); assets not collected yet are located with the
+staticfiles finders and compressed in memory.
+"""
+
+import gzip
+import re
+from html.parser import HTMLParser
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+from urllib.parse import urljoin, urlparse
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.staticfiles import finders
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import Client
+from django.urls import reverse
+
+try:
+    import brotli
+except ImportError:  # Brotli is optional; WhiteNoise skips .br without it
+    brotli = None
+
+PAGES = [
+    ("home", "maintenance:home", False),
+    ("about", "maintenance:about", False),
+    ("login", "login", False),
+    ("log_list", "maintenance:log_list", True),
+    ("log_create", "maintenance:log_create", True),
+]
+CSS_URL = re.compile(r"url\(\s*['\"]?([^'\")]+)['\"]?\s*\)")
+
+
+class _AssetCollector(HTMLParser):
+    def __init__(self):
+        super().__init__()
+        self.urls: List[str] = []
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == "link" and attrs.get("rel") in ("stylesheet", "manifest"):
+            self.urls.append(attrs.get("href"))
+        elif tag in ("script", "img") and attrs.get("src"):
+            self.urls.append(attrs["src"])
+
+
+class Command(BaseCommand):
+    help = "Report total bytes (raw/gzip/brotli) shipped per page."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--budget", type=int, default=None,
+            help="Fail if any page's gzip total exceeds this many bytes.",
+        )
+
+    def handle(self, *args, **options):
+        budget = options["budget"]
+        over_budget = []
+
+        # Render as a throwaway user so login-only pages are included
+        with transaction.atomic():
+            user = User.objects.create_user("page-weight-probe")
+            # "localhost" is allowed by both settings modules; secure=True
+            # avoids the SSL redirect in production settings
+            client = Client(HTTP_HOST="localhost")
+            for label, url_name, needs_login in PAGES:
+                if needs_login:
+                    client.force_login(user)
+                else:
+                    client.logout()
+                url = reverse(url_name)
+                response = client.get(url, secure=True)
+                if response.status_code != 200:
+                    raise CommandError(f"{url} returned {response.status_code}")
+
+                html = response.content
+                rows = [("(html)", len(html), len(gzip.compress(html)),
+                         len(brotli.compress(html)) if brotli else None)]
+                for asset in sorted(self._assets(url, html.decode("utf-8"))):
+                    sizes = self._sizes(asset)
+                    if sizes:
+                        rows.append((asset, *sizes))
+                self._report(label, url, rows)
+
+                gzip_total = sum(row[2] for row in rows)
+                if budget is not None and gzip_total > budget:
+                    over_budget.append(f"{label} ({gzip_total} B)")
+            transaction.set_rollback(True)
+
+        if over_budget:
+            raise CommandError(
+                f"Over the {budget} B budget: {', '.join(over_budget)}")
+
+    def _assets(self, page_url: str, html: str) -> Set[str]:
+        collector = _AssetCollector()
+        collector.feed(html)
+        seen: Set[str] = set()
+        queue = [urljoin(page_url, u) for u in collector.urls if u]
+        while queue:
+            url = urlparse(queue.pop()).path
+            if url in seen or not url.startswith(settings.STATIC_URL):
+                continue
+            seen.add(url)
+            if url.endswith(".css"):
+                path = self._path(url)
+                if path:
+                    css = path.read_text(encoding="utf-8", errors="ignore")
+                    queue.extend(urljoin(url, ref) for ref in CSS_URL.findall(css)
+                                 if not ref.startswith("data:"))
+        return seen
+
+    def _path(self, url: str) -> Optional[Path]:
+        name = url[len(settings.STATIC_URL):]
+        collected = Path(settings.STATIC_ROOT) / name
+        if collected.exists():
+            return collected
+        found = finders.find(name)
+        return Path(found) if found else None
+
+    def _sizes(self, url: str):
+        path = self._path(url)
+        if path is None:
+            self.stderr.write(f"  missing asset: {url}")
+            return None
+        data = path.read_bytes()
+        if path.is_relative_to(settings.STATIC_ROOT):
+            # Collected: WhiteNoise ships a variant only when it was worth
+            # building one (images etc. are served as-is)
+            gz = path.with_name(path.name + ".gz")
+            br = path.with_name(path.name + ".br")
+            gz_size = gz.stat().st_size if gz.exists() else len(data)
+            br_size = br.stat().st_size if br.exists() else len(data)
+        else:
+            gz_size = len(gzip.compress(data))
+            br_size = len(brotli.compress(data)) if brotli else None
+        return len(data), gz_size, br_size
+
+    def _report(self, label: str, url: str, rows: List[tuple]) -> None:
+        self.stdout.write(self.style.MIGRATE_HEADING(f"{label}  {url}"))
+        totals: Dict[str, int] = {"raw": 0, "gzip": 0, "br": 0}
+        for name, raw, gz, br in rows:
+            totals["raw"] += raw
+            totals["gzip"] += gz
+            totals["br"] += br or 0
+            self.stdout.write(
+                f"  {raw:>9} {gz:>9} {br if br is not None else '-':>9}  {name}")
+        self.stdout.write(
+            f"  {totals['raw']:>9} {totals['gzip']:>9} "
+            f"{totals['br'] if brotli else '-':>9}  TOTAL (raw / gzip / br bytes)")
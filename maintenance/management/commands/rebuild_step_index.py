@@ -0,0 +1,44 @@
+"""Rebuild the step search index (StepTerm rows) of every site.
+
+Usage:
+    python manage.py rebuild_step_index
+    python manage.py rebuild_step_index --site main
+
+Steps are indexed as they are saved (maintenance.signals); run this after
+writes that skip signals: ``loaddata``, bulk imports, raw SQL.
+"""
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from maintenance.routers import pin_to_primary
+from maintenance.sites import all_sites, use_site
+from maintenance.stepsearch import index_steps
+
+
+class Command(BaseCommand):
+    help = "Rebuild the step search index."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--site", action="append", default=None,
+            help="Only this site code (repeatable). Default: every site.",
+        )
+
+    def handle(self, *args, **options):
+        sites = all_sites()
+        if options["site"]:
+            unknown = set(options["site"]) - {site.code for site in sites}
+            if unknown:
+                raise CommandError(f"Unknown site {', '.join(sorted(unknown))}.")
+            sites = [site for site in sites if site.code in options["site"]]
+        for site in sites:
+            with use_site(site), pin_to_primary(), \
+                    transaction.atomic(using=site.database or "default"):
+                start = time.perf_counter()
+                steps = index_steps(site)
+            self.stdout.write(
+                f"{site.code}: {steps} step(s) indexed in "
+                f"{(time.perf_counter() - start) * 1000:.0f} ms")
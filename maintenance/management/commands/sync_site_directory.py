@@ -0,0 +1,42 @@
+"""Copy users and sites into the site databases.
+
+Usage:
+    python manage.py sync_site_directory
+    python manage.py sync_site_directory --database site_plant-b
+
+Logs and equipment in a site database point at User and Site rows, so each
+site database holds copies of them (unusable passwords; logins always go
+through default). Signals keep the copies current; run this after adding a
+site with its own database (once ``migrate --database <alias>`` has created
+its tables), or after restoring either database from a backup.
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from maintenance.sites import invalidate_sites, site_databases, sync_directory
+
+
+class Command(BaseCommand):
+    help = "Copy users and sites from default into every site database."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--database", action="append", default=None,
+            help="Only this alias (repeatable). Default: every site database.",
+        )
+
+    def handle(self, *args, **options):
+        invalidate_sites()
+        known = site_databases()
+        aliases = options["database"] or sorted(known)
+        unknown = set(aliases) - known
+        if unknown:
+            raise CommandError(
+                f"No site uses database {', '.join(sorted(unknown))}.")
+        if not aliases:
+            self.stdout.write("No site has its own database; nothing to do.")
+            return
+        for alias in aliases:
+            self.stdout.write(self.style.MIGRATE_HEADING(alias))
+            copied = sync_directory(alias)
+            self.stdout.write(f"  {copied} user(s) copied")
@@ -0,0 +1,69 @@
+"""Verify (and optionally repair) the denormalized counters.
+
+Usage:
+    python manage.py verify_counters            # report drift, exit 1 if any
+    python manage.py verify_counters --repair   # rewrite drifted rows
+
+Counters drift only when rows change behind the ORM's back (raw SQL,
+QuerySet.update() of FKs, restored backups); the signal handlers keep them
+exact otherwise. Every site database is checked, as well as default.
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from maintenance.counters import (
+    alarm_counters, drifted, equipment_counters, log_counters,
+)
+from maintenance.models import AlarmCode, Equipment, MaintenanceLog, Step
+from maintenance.routers import pin_to_primary
+from maintenance.sites import site_databases
+
+
+class Command(BaseCommand):
+    help = ("Check Equipment/MaintenanceLog/AlarmCode counters against their "
+            "source rows.")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--repair", action="store_true",
+            help="Rewrite drifted counters instead of only reporting them.",
+        )
+
+    def handle(self, *args, **options):
+        repair = options["repair"]
+        checks = [
+            (Equipment, equipment_counters(MaintenanceLog)),
+            (MaintenanceLog, log_counters(Step)),
+            (AlarmCode, alarm_counters(MaintenanceLog)),
+        ]
+        total = 0
+        aliases = [DEFAULT_DB_ALIAS, *sorted(site_databases())]
+        for alias in aliases:
+            total += self._check(alias, checks, repair,
+                                 prefix=f"{alias}: " if len(aliases) > 1 else "")
+
+        if total and not repair:
+            raise CommandError(
+                f"{total} row(s) with drifted counters; rerun with --repair.")
+
+    def _check(self, alias, checks, repair, prefix="") -> int:
+        total = 0
+        with pin_to_primary(), transaction.atomic(using=alias):
+            for model, expected in checks:
+                pks = drifted(model.objects.using(alias).order_by("pk"), expected)
+                total += len(pks)
+                label = prefix + model._meta.verbose_name_plural
+                if not pks:
+                    self.stdout.write(f"{label}: OK")
+                    continue
+                shown = ", ".join(str(pk) for pk in pks[:20])
+                more = f" (+{len(pks) - 20} more)" if len(pks) > 20 else ""
+                self.stdout.write(
+                    f"{label}: {len(pks)} drifted: {shown}{more}")
+                if repair:
+                    model.objects.using(alias).filter(
+                        pk__in=pks).update(**expected)
+                    self.stdout.write(self.style.SUCCESS(
+                        f"{label}: repaired {len(pks)}"))
+        return total
@@ -0,0 +1,109 @@
+"""A stand-in webhook receiver, to try deliver_webhooks without the real systems.
+
+Usage:
+    python manage.py webhook_receiver
+    python manage.py webhook_receiver --port 8765 --secret s3cret
+    python manage.py webhook_receiver --fail-rate 0.3 --delay-ms 500
+
+Listens on 127.0.0.1 (``--port``) and answers every POST after
+``--delay-ms``: 200, or for a ``--fail-rate`` share of them ``--fail-status``
+with ``Retry-After: 1``. With ``--secret`` the X-MaintenaTrack-Signature of
+each batch is checked (a bad one gets 401). Prints one line per request,
+then on Ctrl-C the totals: requests and failures served, events received,
+duplicates (delivery is at least once), bad signatures and the most
+requests in flight at once (bounded by the endpoint's max_in_flight).
+"""
+
+import hmac
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.core.management.base import BaseCommand, CommandError
+
+from maintenance.outbox import SIGNATURE_HEADER, sign
+
+
+class Command(BaseCommand):
+    help = "Run a local HTTP server standing in for a webhook endpoint."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--port", type=int, default=8765)
+        parser.add_argument("--secret", default="")
+        parser.add_argument("--delay-ms", type=int, default=0)
+        parser.add_argument("--fail-rate", type=float, default=0.0)
+        parser.add_argument("--fail-status", type=int, default=503)
+
+    def handle(self, *args, **options):
+        if not 0 <= options["fail_rate"] <= 1:
+            raise CommandError("--fail-rate must be between 0 and 1.")
+        lock = threading.Lock()
+        totals = {"requests": 0, "failed": 0, "events": 0, "duplicates": 0,
+                  "bad_signatures": 0, "in_flight": 0, "max_in_flight": 0}
+        seen = set()
+        write = self.stdout.write
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                with lock:
+                    totals["in_flight"] += 1
+                    totals["max_in_flight"] = max(totals["max_in_flight"],
+                                                  totals["in_flight"])
+                try:
+                    self._receive()
+                finally:
+                    with lock:
+                        totals["in_flight"] -= 1
+
+            def _receive(self):
+                data = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                time.sleep(options["delay_ms"] / 1000)
+                if options["secret"] and not hmac.compare_digest(
+                        self.headers.get(SIGNATURE_HEADER, ""),
+                        sign(options["secret"], data)):
+                    with lock:
+                        totals["requests"] += 1
+                        totals["bad_signatures"] += 1
+                    write("bad signature")
+                    return self._answer(401)
+                events = json.loads(data)["events"]
+                ids = [event["id"] for event in events]
+                failed = random.random() < options["fail_rate"]
+                with lock:
+                    totals["requests"] += 1
+                    totals["failed"] += failed
+                    if not failed:
+                        totals["events"] += len(ids)
+                        totals["duplicates"] += len(seen.intersection(ids))
+                        seen.update(ids)
+                    in_flight = totals["in_flight"]
+                write(f"{len(ids)} event(s) {ids[0]}..{ids[-1]}, "
+                      f"{', '.join(sorted({event['event'] for event in events}))}, "
+                      f"{in_flight} in flight"
+                      + (f" -> {options['fail_status']}" if failed else ""))
+                self._answer(options["fail_status"] if failed else 200)
+
+            def _answer(self, status):
+                self.send_response(status)
+                if status >= 400:
+                    self.send_header("Retry-After", "1")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, format, *args):
+                pass  # one line per request is printed above
+
+        server = ThreadingHTTPServer(("127.0.0.1", options["port"]), Handler)
+        write(f"Receiving webhooks at http://127.0.0.1:{options['port']}/ (Ctrl-C stops)")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+        write(f"{totals['requests']} request(s), {totals['failed']} failed on purpose, "
+              f"{totals['events']} event(s) received ({totals['duplicates']} duplicate), "
+              f"{totals['bad_signatures']} bad signature(s), "
+              f"at most {totals['max_in_flight']} in flight")
@@ -0,0 +1,216 @@
+"""Middleware for MaintenaTrack.
+
+- ReplicaRoutingMiddleware: read-your-writes stickiness for ReplicaRouter.
+- AccessLogMiddleware: one structured record per request (view, status,
+  latency, DB time, user id) on the ``maintenance.access`` logger.
+- ProfilingMiddleware: staff-only, opt-in cProfile + SQL capture per request.
+- CachedAuthenticationMiddleware: AuthenticationMiddleware whose user lookup
+  goes through maintenance.auth's cache.
+- SiteMiddleware: picks the site a request works for (``request.site``) and
+  routes partitioned models to its database for the request.
+"""
+
+import cProfile
+import logging
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.db import connections
+from django.urls import reverse
+from django.utils.functional import SimpleLazyObject, cached_property
+
+from . import auth, sites
+from .profiling import ProfileStore
+from .routers import pin_to_primary
+
+access_logger = logging.getLogger("maintenance.access")
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS", "TRACE")
+STICKY_COOKIE = "mt_primary_until"
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Pin reads to the primary for unsafe requests (log_create, log_update,
+    add_equipment, ...) and for REPLICA_STICKY_SECONDS afterwards, tracked
+    with a short-lived cookie so it works across workers without shared state.
+    The cookie can only make reads *more* consistent, so it is not signed.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.window = getattr(settings, "REPLICA_STICKY_SECONDS", 5)
+
+    def __call__(self, request):
+        writing = request.method not in SAFE_METHODS
+        with pin_to_primary(writing or self._sticky(request)):
+            response = self.get_response(request)
+
+        if writing:
+            response.set_cookie(
+                STICKY_COOKIE, str(int(time.time() + self.window)),
+                max_age=self.window, httponly=True, samesite="Lax",
+                secure=settings.SESSION_COOKIE_SECURE,
+            )
+        return response
+
+    def _sticky(self, request) -> bool:
+        try:
+            return float(request.COOKIES.get(STICKY_COOKIE, 0)) > time.time()
+        except ValueError:
+            return False
+
+
+class AccessLogMiddleware:
+    """
+    Emit an access record per request. DB time is summed with an execute
+    wrapper on every configured connection, so it costs one perf_counter()
+    pair per query and nothing when the logger is disabled.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not access_logger.isEnabledFor(logging.INFO):
+            return self.get_response(request)
+
+        timer = _QueryTimer()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for alias in settings.DATABASES:
+                stack.enter_context(connections[alias].execute_wrapper(timer))
+            response = self.get_response(request)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        match = getattr(request, "resolver_match", None)
+        user = getattr(request, "user", None)
+        access_logger.info(
+            "%s %s %s", request.method, request.path, response.status_code,
+            extra={
+                "view": match.view_name if match else None,
+                "method": request.method,
+                "path": request.path,
+                "status": response.status_code,
+                "latency_ms": round(elapsed_ms, 2),
+                "db_ms": round(timer.total_ms, 2),
+                "db_queries": timer.count,
+                "user_id": user.pk if user is not None and user.is_authenticated else None,
+            },
+        )
+        return response
+
+
+class ProfilingMiddleware:
+    """
+    Profile a request when a staff user asks for it with ``?_profile=1`` or
+    an ``X-Profile: 1`` header. The cProfile stats and the SQL trace are saved
+    to ProfileStore and browsable at /admin/profiles/; the response carries
+    ``X-Profile-Id``. Without the flag the cost is one dict lookup per request.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.store = ProfileStore()
+
+    def __call__(self, request):
+        if not (request.GET.get("_profile") == "1"
+                or request.headers.get("X-Profile") == "1"):
+            return self.get_response(request)
+        user = getattr(request, "user", None)
+        if user is None or not user.is_staff:
+            return self.get_response(request)
+
+        timer = _QueryTimer(record=True)
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for alias in settings.DATABASES:
+                stack.enter_context(connections[alias].execute_wrapper(timer))
+            try:
+                profiler.enable()
+            except ValueError:
+                # Another profiler is already active on this thread
+                return self.get_response(request)
+            try:
+                response = self.get_response(request)
+            finally:
+                profiler.disable()
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        match = getattr(request, "resolver_match", None)
+        profile_id = self.store.save(profiler, {
+            "url_name": match.view_name if match else None,
+            "method": request.method,
+            "path": request.get_full_path(),
+            "status": response.status_code,
+            "duration_ms": round(elapsed_ms, 2),
+            "db_ms": round(timer.total_ms, 2),
+            "db_queries": timer.count,
+            "user": user.get_username(),
+            "created_at": time.time(),
+            "sql": timer.queries,
+        })
+        response["X-Profile-Id"] = profile_id
+        return response
+
+
+class CachedAuthenticationMiddleware(AuthenticationMiddleware):
+    """Replaces django.contrib.auth's middleware; ``request.auser`` is unchanged."""
+
+    def process_request(self, request):
+        super().process_request(request)
+        request.user = SimpleLazyObject(lambda: self._get_user(request))
+
+    @staticmethod
+    def _get_user(request):
+        if not hasattr(request, "_cached_user"):
+            request._cached_user = auth.get_user(request)
+        return request._cached_user
+
+
+class SiteMiddleware:
+    """
+    Must come after the authentication middleware (sites depend on the user).
+    Health checks get ``request.site = None``: they are polled constantly by
+    the load balancer and resolving a site costs a version-stamp query.
+    """
+
+    SKIP_VIEWS = ("maintenance:health_check", "maintenance:health_ready")
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    @cached_property
+    def skip_paths(self):
+        return frozenset(reverse(name) for name in self.SKIP_VIEWS)
+
+    def __call__(self, request):
+        if request.path in self.skip_paths:
+            request.site = None
+            return self.get_response(request)
+        with sites.request_scope():
+            request.site = sites.resolve_site(request)
+            with sites.use_site(request.site):
+                return self.get_response(request)
+
+
+class _QueryTimer:
+    def __init__(self, record=False):
+        self.total_ms = 0.0
+        self.count = 0
+        self.queries = [] if record else None
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            self.total_ms += elapsed_ms
+            self.count += 1
+            if self.queries is not None:
+                self.queries.append({"sql": sql, "ms": round(elapsed_ms, 3),
+                                     "many": many})
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.6 on 2026-10-19 06:23
+
+from django.db import migrations, models
+
+from maintenance.counters import equipment_counters, log_counters
+
+
+def backfill_counters(apps, schema_editor):
+    Equipment = apps.get_model("maintenance", "Equipment")
+    MaintenanceLog = apps.get_model("maintenance", "MaintenanceLog")
+    Step = apps.get_model("maintenance", "Step")
+    db = schema_editor.connection.alias
+    Equipment.objects.using(db).update(**equipment_counters(MaintenanceLog))
+    MaintenanceLog.objects.using(db).update(**log_counters(Step))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('maintenance', '0005_idempotencykey'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='equipment',
+            name='last_log_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='equipment',
+            name='log_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='maintenancelog',
+            name='step_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='maintenancelog',
+            name='total_duration_minutes',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
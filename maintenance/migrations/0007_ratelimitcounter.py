@@ -0,0 +1,21 @@
+# Generated by Django 5.2.6 on 2026-10-19 06:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('maintenance', '0006_denormalized_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RateLimitCounter',
+            fields=[
+                ('key', models.CharField(max_length=255, primary_key=True, serialize=False)),
+                ('value', models.BigIntegerField(default=0)),
+                ('expires_at', models.FloatField(db_index=True, help_text='Unix timestamp after which the counter is void.')),
+            ],
+        ),
+    ]
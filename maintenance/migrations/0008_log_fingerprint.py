@@ -0,0 +1,47 @@
+# Generated by Django 5.2.6 on 2026-10-19 06:31
+
+from django.conf import settings
+from django.db import migrations, models
+
+from maintenance.dedup import fingerprint, incident_key
+
+
+def backfill_fingerprints(apps, schema_editor):
+    MaintenanceLog = apps.get_model("maintenance", "MaintenanceLog")
+    logs = MaintenanceLog.objects.using(schema_editor.connection.alias)
+    batch = []
+    for log in logs.only(
+            "zone", "alarm_code", "equipment_id", "description").iterator():
+        log.incident_key = incident_key(log.zone, log.alarm_code, log.equipment_id)
+        log.fingerprint = fingerprint(log.incident_key, log.description)
+        batch.append(log)
+        if len(batch) >= 500:
+            logs.bulk_update(batch, ["incident_key", "fingerprint"])
+            batch = []
+    logs.bulk_update(batch, ["incident_key", "fingerprint"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('maintenance', '0007_ratelimitcounter'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='maintenancelog',
+            name='fingerprint',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=40),
+        ),
+        migrations.AddField(
+            model_name='maintenancelog',
+            name='incident_key',
+            field=models.CharField(blank=True, editable=False, max_length=40),
+        ),
+        migrations.AddIndex(
+            model_name='maintenancelog',
+            index=models.Index(fields=['incident_key', 'created_at'], name='maintenance_inciden_a7fa9d_idx'),
+        ),
+        migrations.RunPython(backfill_fingerprints, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.6 on 2026-10-19 06:33
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('maintenance', '0008_log_fingerprint'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LogRevision',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number', models.PositiveIntegerField()),
+                ('is_snapshot', models.BooleanField(default=False)),
+                ('data', models.BinaryField()),
+                ('changed', models.CharField(blank=True, help_text='Summary of what changed, readable without decoding data.', max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('log', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='revisions', to='maintenance.maintenancelog')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='log_revisions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['log', 'number'],
+                'constraints': [models.UniqueConstraint(fields=('log', 'number'), name='unique_revision_number_per_log')],
+            },
+        ),
+    ]
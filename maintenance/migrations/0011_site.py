@@ -0,0 +1,69 @@
+# Generated by Django 5.2.6 on 2026-10-19 06:42
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, migrations, models
+
+
+def assign_default_site(apps, schema_editor):
+    """Put existing equipment and logs in the default site ("main")."""
+    db = schema_editor.connection.alias
+    Site = apps.get_model("maintenance", "Site")
+    Equipment = apps.get_model("maintenance", "Equipment")
+    MaintenanceLog = apps.get_model("maintenance", "MaintenanceLog")
+    has_rows = (Equipment.objects.using(db).exists()
+                or MaintenanceLog.objects.using(db).exists())
+    if db != DEFAULT_DB_ALIAS and not has_rows:
+        return  # a fresh site database; its Site row is copied in later
+    code = getattr(settings, "DEFAULT_SITE_CODE", "main")
+    site, _ = Site.objects.using(db).get_or_create(
+        code=code, defaults={"name": code.replace("-", " ").title()})
+    Equipment.objects.using(db).filter(site__isnull=True).update(site=site)
+    MaintenanceLog.objects.using(db).filter(site__isnull=True).update(site=site)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('maintenance', '0010_attachment'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Site',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('code', models.SlugField(max_length=32, unique=True)),
+                ('name', models.CharField(max_length=120)),
+                ('database', models.CharField(blank=True, help_text="DATABASES alias for this site's data (blank: default).", max_length=64)),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        migrations.RemoveConstraint(
+            model_name='equipment',
+            name='unique_equipment_name_per_zone',
+        ),
+        migrations.RemoveIndex(
+            model_name='equipment',
+            name='maintenance_zone_a04702_idx',
+        ),
+        migrations.AddField(
+            model_name='site',
+            name='members',
+            field=models.ManyToManyField(blank=True, help_text='Users working at this site (staff see every site).', related_name='maintenance_sites', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='equipment',
+            name='site',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='equipment', to='maintenance.site'),
+        ),
+        migrations.AddField(
+            model_name='maintenancelog',
+            name='site',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='logs', to='maintenance.site'),
+        ),
+        migrations.RunPython(assign_default_site, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.6 on 2026-10-19 06:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    """Separate from 0011 so PostgreSQL never alters tables with pending row updates."""
+
+    dependencies = [
+        ('maintenance', '0011_site'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='equipment',
+            name='site',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='equipment', to='maintenance.site'),
+        ),
+        migrations.AlterField(
+            model_name='maintenancelog',
+            name='site',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='logs', to='maintenance.site'),
+        ),
+        migrations.AddIndex(
+            model_name='equipment',
+            index=models.Index(fields=['site', 'zone', 'status'], name='maintenance_site_id_63018b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='maintenancelog',
+            index=models.Index(fields=['site', 'created_at'], name='maintenance_site_id_52555e_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='equipment',
+            constraint=models.UniqueConstraint(fields=('site', 'name', 'zone'), name='unique_equipment_name_per_site_zone'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.6 on 2026-10-19 06:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('maintenance', '0012_site_required'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AlarmCode',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('code', models.CharField(max_length=50)),
+                ('name', models.CharField(blank=True, help_text='Canonical alarm name.', max_length=150)),
+                ('default_difficulty', models.CharField(blank=True, choices=[('Easy', 'Easy'), ('Medium', 'Medium'), ('Hard', 'Hard')], help_text='Suggested difficulty for new logs of this alarm.', max_length=10)),
+                ('occurrence_count', models.PositiveIntegerField(default=0, editable=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('site', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='alarm_codes', to='maintenance.site')),
+            ],
+            options={
+                'ordering': ['code'],
+            },
+        ),
+        migrations.AddField(
+            model_name='maintenancelog',
+            name='alarm',
+            field=models.ForeignKey(blank=True, editable=False, help_text='Catalog entry for alarm_code, linked on save.', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='logs', to='maintenance.alarmcode'),
+        ),
+        migrations.AddConstraint(
+            model_name='alarmcode',
+            constraint=models.UniqueConstraint(fields=('site', 'code'), name='unique_alarm_code_per_site'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.6 on 2026-10-19 06:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('maintenance', '0013_alarmcode'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShiftAggregate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('zone', models.CharField(max_length=10)),
+                ('shift_start', models.DateTimeField()),
+                ('incidents', models.PositiveIntegerField(default=0)),
+                ('hard_incidents', models.PositiveIntegerField(default=0)),
+                ('repair_minutes', models.PositiveIntegerField(default=0)),
+                ('alarm_counts', models.JSONField(default=dict, help_text='Logs per alarm code.')),
+                ('refreshed_at', models.DateTimeField()),
+                ('site', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='shift_aggregates', to='maintenance.site')),
+            ],
+            options={
+                'ordering': ['shift_start', 'zone'],
+                'indexes': [models.Index(fields=['site', 'shift_start'], name='maintenance_site_id_19344e_idx'), models.Index(fields=['site', 'refreshed_at'], name='maintenance_site_id_b8f193_idx')],
+                'constraints': [models.UniqueConstraint(fields=('site', 'zone', 'shift_start'), name='unique_shift_aggregate_per_site_zone')],
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.6 on 2026-10-19 07:09
+
+from django.db import migrations, models
+
+from maintenance.listing import snippet
+
+
+def backfill_previews(apps, schema_editor):
+    MaintenanceLog = apps.get_model("maintenance", "MaintenanceLog")
+    logs = MaintenanceLog.objects.using(schema_editor.connection.alias)
+    batch = []
+    for log in logs.only("description").iterator():
+        log.description_preview = snippet(log.description)
+        batch.append(log)
+        if len(batch) >= 500:
+            logs.bulk_update(batch, ["description_preview"])
+            batch = []
+    logs.bulk_update(batch, ["description_preview"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('maintenance', '0014_shiftaggregate'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='maintenancelog',
+            name='description_preview',
+            field=models.CharField(blank=True, editable=False, max_length=160),
+        ),
+        migrations.RunPython(backfill_previews, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-19 07:26
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('maintenance', '0015_log_description_preview'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='maintenancelog',
+            index=models.Index(fields=['site', 'equipment', 'created_at'], name='maintenance_site_id_cf6ddf_idx'),
+        ),
+    ]
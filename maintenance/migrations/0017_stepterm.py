@@ -0,0 +1,48 @@
+# Generated by Django 5.2.6 on 2026-10-19 07:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from maintenance.stepsearch import terms
+
+
+def index_steps(apps, schema_editor):
+    Step = apps.get_model("maintenance", "Step")
+    StepTerm = apps.get_model("maintenance", "StepTerm")
+    alias = schema_editor.connection.alias
+    batch = []
+    for step_id, site_id, action, result in (
+            Step.objects.using(alias)
+            .values_list("pk", "log__site_id", "action", "result")
+            .iterator(chunk_size=500)):
+        batch.extend(StepTerm(site_id=site_id, step_id=step_id, term=term, weight=weight)
+                     for term, weight in terms(action, result).items())
+        if len(batch) >= 500:
+            StepTerm.objects.using(alias).bulk_create(batch)
+            batch = []
+    StepTerm.objects.using(alias).bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('maintenance', '0016_log_equipment_created_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StepTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64)),
+                ('weight', models.PositiveSmallIntegerField(help_text='2 × occurrences in the action + occurrences in the result.')),
+                ('site', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='step_terms', to='maintenance.site')),
+                ('step', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='terms', to='maintenance.step')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['site', 'term', 'step', 'weight'], name='maintenance_site_id_fcd349_idx')],
+                'constraints': [models.UniqueConstraint(fields=('step', 'term'), name='unique_term_per_step')],
+            },
+        ),
+        migrations.RunPython(index_steps, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.6 on 2026-10-19 07:36
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def record_existing(apps, schema_editor):
+    """One entry per existing object, so reading the feed from the start is a full export."""
+    Change = apps.get_model("maintenance", "Change")
+    alias = schema_editor.connection.alias
+    sources = (
+        ("equipment", apps.get_model("maintenance", "Equipment"), "site_id"),
+        ("log", apps.get_model("maintenance", "MaintenanceLog"), "site_id"),
+        ("step", apps.get_model("maintenance", "Step"), "log__site_id"),
+    )
+    for kind, model, site in sources:
+        batch = []
+        for object_id, site_id in (model.objects.using(alias).order_by("pk")
+                                   .values_list("pk", site).iterator(chunk_size=500)):
+            batch.append(Change(site_id=site_id, kind=kind, object_id=object_id))
+            if len(batch) >= 500:
+                Change.objects.using(alias).bulk_create(batch)
+                batch = []
+        Change.objects.using(alias).bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('maintenance', '0017_stepterm'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Change',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('log', 'Maintenance log'), ('step', 'Step'), ('equipment', 'Equipment')], max_length=16)),
+                ('object_id', models.BigIntegerField()),
+                ('deleted', models.BooleanField(default=False)),
+                ('recorded_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('site', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='changes', to='maintenance.site')),
+            ],
+            options={
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['site', 'id'], name='maintenance_site_id_0e7c33_idx'), models.Index(fields=['site', 'kind', 'object_id', 'id'], name='maintenance_site_id_7e8f4c_idx')],
+            },
+        ),
+        migrations.RunPython(record_existing, migrations.RunPython.noop),
+    ]
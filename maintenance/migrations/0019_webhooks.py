@@ -0,0 +1,74 @@
+# Generated by Django 5.2.6 on 2026-10-19 07:41
+
+import django.core.serializers.json
+import django.core.validators
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('maintenance', '0018_change'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WebhookEndpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=120)),
+                ('url', models.URLField(max_length=500)),
+                ('secret', models.CharField(blank=True, help_text='Signs each batch: X-MaintenaTrack-Signature is sha256=HMAC-SHA256 of the body with this key.', max_length=128)),
+                ('hard_logs', models.BooleanField(default=True, help_text='Send an event when a Hard log is created.')),
+                ('equipment_down', models.BooleanField(default=True, help_text='Send an event when equipment goes DOWN.')),
+                ('is_active', models.BooleanField(default=True, help_text='Inactive endpoints get no new events and are sent none.')),
+                ('batch_size', models.PositiveSmallIntegerField(default=50, help_text='Events per request at most.', validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(500)])),
+                ('max_in_flight', models.PositiveSmallIntegerField(default=2, help_text='Requests sent to this endpoint at the same time at most.', validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(16)])),
+                ('delivered_count', models.PositiveIntegerField(default=0, editable=False)),
+                ('failed_requests', models.PositiveIntegerField(default=0, editable=False)),
+                ('dropped_count', models.PositiveIntegerField(default=0, editable=False, help_text='Events given up after WEBHOOK_MAX_ATTEMPTS.')),
+                ('last_delivered_at', models.DateTimeField(blank=True, editable=False, null=True)),
+                ('last_latency_ms', models.PositiveIntegerField(blank=True, editable=False, null=True)),
+                ('last_error', models.CharField(blank=True, editable=False, max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('site', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='webhook_endpoints', to='maintenance.site')),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='OutboxEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event', models.CharField(choices=[('log.hard_created', 'Hard log created'), ('equipment.down', 'Equipment down')], max_length=32)),
+                ('payload', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('state', models.CharField(choices=[('pending', 'Pending'), ('delivered', 'Delivered'), ('failed', 'Failed')], default='pending', max_length=16)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('last_error', models.CharField(blank=True, max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('delivered_at', models.DateTimeField(blank=True, null=True)),
+                ('site', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='outbox_events', to='maintenance.site')),
+                ('endpoint', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='events', to='maintenance.webhookendpoint')),
+            ],
+            options={
+                'ordering': ['id'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='webhookendpoint',
+            index=models.Index(fields=['site', 'is_active'], name='maintenance_site_id_0d5060_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='outboxevent',
+            index=models.Index(fields=['endpoint', 'state', 'next_attempt_at', 'id'], name='maintenance_endpoin_64f76a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='outboxevent',
+            index=models.Index(fields=['state', 'delivered_at'], name='maintenance_state_68f783_idx'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.6 on 2026-10-19 08:21
+
+from django.db import migrations, models
+
+
+def publish_existing(apps, schema_editor):
+    """Entries so far were served by id: keep it as their sequence, so cursors stay valid."""
+    Change = apps.get_model("maintenance", "Change")
+    Change.objects.using(schema_editor.connection.alias).update(
+        sequence=models.F("id"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('maintenance', '0020_idempotency_key_per_user'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='change',
+            name='sequence',
+            field=models.BigIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(publish_existing, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='change',
+            constraint=models.UniqueConstraint(fields=('site', 'sequence'), name='unique_change_sequence_per_site'),
+        ),
+        migrations.RemoveIndex(
+            model_name='change',
+            name='maintenance_site_id_0e7c33_idx',
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.6 on 2026-10-19 08:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('maintenance', '0021_change_sequence'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='stepterm',
+            name='site',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, related_name='step_terms', to='maintenance.site'),
+        ),
+        migrations.AlterField(
+            model_name='stepterm',
+            name='step',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='terms', to='maintenance.step'),
+        ),
+    ]
@@ -1,14 +1,82 @@
 """Data models for MaintenaTrack.
 
 Contains:
+- Site: a plant; equipment and logs belong to one, users are members of some.
 - Equipment: optional asset grouping for logs.
 - MaintenanceLog: core log per incident (zone, alarm, LAM, difficulty, etc.).
+- AlarmCode: per-site catalog of alarm codes with their canonical names.
 - Step: ordered steps attached to each log.
+- IdempotencyKey: client-generated keys for offline batch submissions.
+- RateLimitCounter: shared counters behind the rate-limit cache backend.
+- LogRevision: compact edit history of a log and its steps.
+- Attachment: photo/file attached to a log or one of its steps.
+- ShiftAggregate: per-zone incident totals of one shift, behind the reports.
+- StepTerm: one word of a step's action or result, behind step search.
+- Change: one save or delete of a log, step or equipment, for the change feed.
+- WebhookEndpoint: a URL notified of a site's events, with delivery metrics.
+- OutboxEvent: one event waiting for (or delivered to) one webhook endpoint.
 """
 
+from django.conf import settings
 from django.db import models
 from django.contrib.auth.models import User
+from django.core.serializers.json import DjangoJSONEncoder
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.utils import timezone
+
+from .dedup import fingerprint, incident_key
+from .listing import PREVIEW_LENGTH, snippet
+
+
+def _protect_counters(instance, save_kwargs) -> None:
+    """Keep a plain save() of a stale instance from overwriting counters.
+
+    Counters are only ever changed with F-expression UPDATEs, so updates of
+    existing rows write every field except them.
+    """
+    if (instance._state.adding or save_kwargs.get("force_insert")
+            or save_kwargs.get("update_fields") is not None):
+        return
+    save_kwargs["update_fields"] = [
+        f.name for f in instance._meta.concrete_fields
+        if not f.primary_key and f.name not in instance.COUNTER_FIELDS
+    ]
+
+
+# ---------- Site ----------
+class Site(models.Model):
+    """A plant. Zones, equipment and logs are all per site.
+
+    ``database`` names the DATABASES alias holding the site's equipment and
+    logs (see maintenance.routers.SiteRouter); blank keeps them in default.
+    """
+
+    code = models.SlugField(max_length=32, unique=True)
+    name = models.CharField(max_length=120)
+    database = models.CharField(
+        max_length=64,
+        blank=True,
+        help_text="DATABASES alias for this site's data (blank: default).",
+    )
+    members = models.ManyToManyField(
+        User,
+        blank=True,
+        related_name="maintenance_sites",
+        help_text="Users working at this site (staff see every site).",
+    )
+
+    class Meta:
+        ordering = ["name"]
+
+    def __str__(self) -> str:
+        return self.name
+
+    def clean(self):
+        from django.core.exceptions import ValidationError
+        super().clean()
+        if self.database and self.database not in settings.DATABASES:
+            raise ValidationError(
+                {"database": f"No database alias '{self.database}' is configured."})
 
 
 # ---------- Equipment ----------
@@ -19,6 +87,11 @@ class Equipment(models.Model):
         DOWN = "down", "Down"
         RETIRED = "retired", "Retired"
 
+    site = models.ForeignKey(
+        Site,
+        on_delete=models.PROTECT,
+        related_name="equipment",
+    )
     name = models.CharField(max_length=120, db_index=True)
     asset_tag = models.CharField(
         max_length=64,
@@ -42,24 +115,47 @@ class Equipment(models.Model):
     )
     description = models.TextField(blank=True)
 
+    # Denormalized counters, maintained by maintenance.signals (F-expressions)
+    log_count = models.PositiveIntegerField(default=0, editable=False)
+    last_log_at = models.DateTimeField(null=True, blank=True, editable=False)
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    COUNTER_FIELDS = ("log_count", "last_log_at")
+
     class Meta:
         ordering = ["zone", "name"]
         constraints = [
             models.UniqueConstraint(
-                fields=["name", "zone"], name="unique_equipment_name_per_zone"
+                fields=["site", "name", "zone"],
+                name="unique_equipment_name_per_site_zone",
             )
         ]
         indexes = [
-            models.Index(fields=["zone", "status"]),
+            models.Index(fields=["site", "zone", "status"]),
             models.Index(fields=["name"]),
         ]
 
     def __str__(self) -> str:
         return f"{self.name} ({self.asset_tag or 'no-tag'})"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Signals announce the equipment going DOWN, not every save while down
+        instance._loaded_status = instance.__dict__.get("status")
+        return instance
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        self._loaded_status = self.__dict__.get("status")
+
+    def save(self, *args, **kwargs):
+        _protect_counters(self, kwargs)
+        super().save(*args, **kwargs)
+        self._loaded_status = self.status
+
 
 # ---------- MaintenanceLog ----------
 class MaintenanceLog(models.Model):
@@ -70,6 +166,11 @@ class MaintenanceLog(models.Model):
         MEDIUM = "Medium", "Medium"
         HARD = "Hard", "Hard"
 
+    site = models.ForeignKey(
+        Site,
+        on_delete=models.PROTECT,
+        related_name="logs",
+    )
     equipment = models.ForeignKey(
         Equipment,
         null=True,
@@ -101,6 +202,15 @@ class MaintenanceLog(models.Model):
         help_text="Alarm code - accepts numbers, letters, or mixed (e.g., '123', 'ALM-456', 'A1B2')."
     )
     alarm_name = models.CharField(max_length=150, blank=True)
+    alarm = models.ForeignKey(
+        "AlarmCode",
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name="logs",
+        editable=False,
+        help_text="Catalog entry for alarm_code, linked on save.",
+    )
     lam_checked = models.BooleanField(
         default=False,
         help_text="Line access / lockout or LAM check completed",
@@ -113,6 +223,25 @@ class MaintenanceLog(models.Model):
     description = models.TextField(
         help_text="Problem statement and high-level approach.",
     )
+    # One-line start of the description for lists (maintenance.listing),
+    # recomputed on every save so lists never load the description itself
+    description_preview = models.CharField(
+        max_length=PREVIEW_LENGTH, blank=True, editable=False)
+
+    # Denormalized counters, maintained by maintenance.signals (F-expressions)
+    step_count = models.PositiveIntegerField(default=0, editable=False)
+    total_duration_minutes = models.PositiveIntegerField(
+        default=0, editable=False)
+
+    COUNTER_FIELDS = ("step_count", "total_duration_minutes")
+
+    # Duplicate detection (maintenance.dedup), recomputed on every save
+    incident_key = models.CharField(max_length=40, blank=True, editable=False)
+    fingerprint = models.CharField(
+        max_length=40, blank=True, editable=False, db_index=True)
+
+    FINGERPRINT_SOURCES = {"zone", "alarm_code", "equipment", "equipment_id",
+                           "description"}
 
     class Meta:
         ordering = ["-created_at"]
@@ -120,12 +249,50 @@ class MaintenanceLog(models.Model):
             models.Index(fields=["zone", "difficulty"]),
             models.Index(fields=["alarm_code"]),
             models.Index(fields=["created_at"]),
+            models.Index(fields=["site", "created_at"]),
+            # Reliability metrics read logs in (equipment, created_at) order
+            models.Index(fields=["site", "equipment", "created_at"]),
+            models.Index(fields=["incident_key", "created_at"]),
         ]
 
     def __str__(self) -> str:
         equip = str(self.equipment) if self.equipment else f"Zone {self.zone}"
         return f"{equip} | {self.alarm_code} [{self.difficulty}]"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored FK so signals can move counters on reassignment
+        instance._loaded_equipment_id = instance.__dict__.get("equipment_id")
+        instance._loaded_alarm_id = instance.__dict__.get("alarm_id")
+        instance._loaded_alarm_code = instance.__dict__.get("alarm_code")
+        return instance
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        self._loaded_equipment_id = self.__dict__.get("equipment_id")
+        self._loaded_alarm_id = self.__dict__.get("alarm_id")
+        self._loaded_alarm_code = self.__dict__.get("alarm_code")
+
+    def save(self, *args, **kwargs):
+        _protect_counters(self, kwargs)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None or "alarm_code" in update_fields:
+            from .alarms import link_alarm
+            if link_alarm(self, kwargs.get("using")) and update_fields is not None:
+                kwargs["update_fields"] = {*update_fields, "alarm", "alarm_name"}
+        self.incident_key = incident_key(
+            self.zone, self.alarm_code, self.equipment_id)
+        self.fingerprint = fingerprint(self.incident_key, self.description)
+        self.description_preview = snippet(self.description)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and self.FINGERPRINT_SOURCES & set(update_fields):
+            kwargs["update_fields"] = {*update_fields, "incident_key", "fingerprint"}
+        if update_fields is not None and "description" in update_fields:
+            kwargs["update_fields"] = {*kwargs["update_fields"], "description_preview"}
+        super().save(*args, **kwargs)
+        self._loaded_alarm_code = self.alarm_code
+
     def clean(self):
         from django.core.exceptions import ValidationError
         super().clean()
@@ -145,6 +312,55 @@ class MaintenanceLog(models.Model):
                 {'zone': 'Zone identifier must be 10 characters or less.'})
 
 
+# ---------- AlarmCode ----------
+class AlarmCode(models.Model):
+    """One alarm code of a site, with the name and difficulty it usually has.
+
+    Logs link to their code's entry when saved (maintenance.alarms); entries
+    for codes logged before the catalog existed come from
+    ``manage.py backfill_alarm_codes``.
+    """
+
+    site = models.ForeignKey(
+        Site,
+        on_delete=models.PROTECT,
+        related_name="alarm_codes",
+    )
+    code = models.CharField(max_length=50)
+    name = models.CharField(
+        max_length=150, blank=True, help_text="Canonical alarm name.")
+    default_difficulty = models.CharField(
+        max_length=10,
+        blank=True,
+        choices=MaintenanceLog.Difficulty.choices,
+        help_text="Suggested difficulty for new logs of this alarm.",
+    )
+
+    # Denormalized counter, maintained by maintenance.signals (F-expressions)
+    occurrence_count = models.PositiveIntegerField(default=0, editable=False)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    COUNTER_FIELDS = ("occurrence_count",)
+
+    class Meta:
+        ordering = ["code"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["site", "code"],
+                name="unique_alarm_code_per_site",
+            )
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.code} {self.name}".strip()
+
+    def save(self, *args, **kwargs):
+        _protect_counters(self, kwargs)
+        super().save(*args, **kwargs)
+
+
 # ---------- Step ----------
 class Step(models.Model):
     log = models.ForeignKey(
@@ -183,3 +399,403 @@ class Step(models.Model):
 
     def __str__(self) -> str:
         return f"Step {self.order} for Log #{self.log_id}"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Stored values let signals apply deltas without re-reading the row
+        instance._loaded_counters = (
+            instance.__dict__.get("log_id"),
+            instance.__dict__.get("duration_minutes"),
+        )
+        return instance
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        self._loaded_counters = (
+            self.__dict__.get("log_id"),
+            self.__dict__.get("duration_minutes"),
+        )
+
+
+# ---------- IdempotencyKey ----------
+class IdempotencyKey(models.Model):
+    """Client-generated key recording that an offline submission was applied.
+
+    The offline queue tags every pending log with a random key; replaying the
+    same key returns the log created the first time instead of a duplicate.
+    """
+
+    key = models.CharField(max_length=64)
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="idempotency_keys",
+    )
+    log = models.ForeignKey(
+        MaintenanceLog,
+        on_delete=models.CASCADE,
+        related_name="idempotency_keys",
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        constraints = [
+            # Keys are random per device, but only a user's own keys matter
+            models.UniqueConstraint(
+                fields=["user", "key"],
+                name="unique_idempotency_key_per_user",
+            )
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.key} -> Log #{self.log_id}"
+
+
+# ---------- RateLimitCounter ----------
+class RateLimitCounter(models.Model):
+    """One counter of maintenance.cache.CounterCache (django-ratelimit's store).
+
+    Lives in the database so every Gunicorn worker shares the same counts.
+    """
+
+    key = models.CharField(max_length=255, primary_key=True)
+    value = models.BigIntegerField(default=0)
+    expires_at = models.FloatField(
+        db_index=True, help_text="Unix timestamp after which the counter is void.")
+
+    def __str__(self) -> str:
+        return f"{self.key}={self.value}"
+
+
+# ---------- LogRevision ----------
+class LogRevision(models.Model):
+    """One entry in a log's edit history (see maintenance.revisions).
+
+    ``data`` is zlib-compressed JSON: the full state of the log and its steps
+    for snapshots, otherwise a patch against the previous revision holding
+    only changed fields and steps.
+    """
+
+    log = models.ForeignKey(
+        MaintenanceLog,
+        on_delete=models.CASCADE,
+        related_name="revisions",
+    )
+    number = models.PositiveIntegerField()
+    is_snapshot = models.BooleanField(default=False)
+    data = models.BinaryField()
+    changed = models.CharField(
+        max_length=255, blank=True,
+        help_text="Summary of what changed, readable without decoding data.",
+    )
+    user = models.ForeignKey(
+        User,
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name="log_revisions",
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["log", "number"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["log", "number"],
+                name="unique_revision_number_per_log",
+            )
+        ]
+
+    def __str__(self) -> str:
+        return f"Revision {self.number} of Log #{self.log_id}"
+
+
+# ---------- Attachment ----------
+class Attachment(models.Model):
+    """A file attached to a log, or to one of its steps.
+
+    Content is stored once per SHA-256 (see maintenance.attachments), so the
+    same photo attached twice takes the disk space of one.
+    """
+
+    log = models.ForeignKey(
+        MaintenanceLog,
+        on_delete=models.CASCADE,
+        related_name="attachments",
+    )
+    step = models.ForeignKey(
+        Step,
+        null=True,
+        blank=True,
+        on_delete=models.CASCADE,
+        related_name="attachments",
+    )
+    sha256 = models.CharField(max_length=64, db_index=True, editable=False)
+    size = models.PositiveBigIntegerField(editable=False)
+    content_type = models.CharField(max_length=100)
+    original_name = models.CharField(max_length=255)
+    uploaded_by = models.ForeignKey(
+        User,
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name="maintenance_attachments",
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["created_at"]
+
+    def __str__(self) -> str:
+        return f"{self.original_name} on Log #{self.log_id}"
+
+    @property
+    def is_image(self) -> bool:
+        return self.content_type.startswith("image/")
+
+    @property
+    def has_thumbnail(self) -> bool:
+        from .attachments import thumbnail_path
+        return thumbnail_path(self.sha256).exists()
+
+
+# ---------- ShiftAggregate ----------
+class ShiftAggregate(models.Model):
+    """Totals of the logs created in one zone during one shift.
+
+    Rebuilt incrementally by maintenance.reports (``manage.py build_reports``);
+    shift and weekly reports add these up instead of scanning the logs.
+    """
+
+    site = models.ForeignKey(
+        Site,
+        on_delete=models.PROTECT,
+        related_name="shift_aggregates",
+    )
+    zone = models.CharField(max_length=10)
+    shift_start = models.DateTimeField()
+    incidents = models.PositiveIntegerField(default=0)
+    hard_incidents = models.PositiveIntegerField(default=0)
+    repair_minutes = models.PositiveIntegerField(default=0)
+    alarm_counts = models.JSONField(
+        default=dict, help_text="Logs per alarm code.")
+    refreshed_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ["shift_start", "zone"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["site", "zone", "shift_start"],
+                name="unique_shift_aggregate_per_site_zone",
+            )
+        ]
+        indexes = [
+            models.Index(fields=["site", "shift_start"]),
+            models.Index(fields=["site", "refreshed_at"]),
+        ]
+
+    def __str__(self) -> str:
+        return f"Zone {self.zone} @ {self.shift_start:%Y-%m-%d %H:%M}"
+
+
+# ---------- StepTerm ----------
+class StepTerm(models.Model):
+    """One distinct word of a step's action and result (an inverted index).
+
+    Written by maintenance.stepsearch whenever the step is saved; step
+    search reads the rows of the words searched for, not the steps.
+    """
+
+    # No indexes of their own: the unique (step, term) constraint and the
+    # (site, term, step, weight) index lead with them
+    site = models.ForeignKey(
+        Site,
+        on_delete=models.PROTECT,
+        related_name="step_terms",
+        db_index=False,
+    )
+    step = models.ForeignKey(
+        Step,
+        on_delete=models.CASCADE,
+        related_name="terms",
+        db_index=False,
+    )
+    term = models.CharField(max_length=64)
+    weight = models.PositiveSmallIntegerField(
+        help_text="2 × occurrences in the action + occurrences in the result.")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["step", "term"],
+                name="unique_term_per_step",
+            )
+        ]
+        # Covers the search: postings are read from the index alone
+        indexes = [models.Index(fields=["site", "term", "step", "weight"])]
+
+    def __str__(self) -> str:
+        return f"{self.term} in step #{self.step_id}"
+
+
+# ---------- Change ----------
+class Change(models.Model):
+    """A log, step or equipment was saved or deleted (a tombstone).
+
+    Written by maintenance.changefeed in the transaction of the change; once
+    committed, maintenance.changefeed.publish gives it its ``sequence`` in
+    the feed. Only the latest entry per object matters: ``manage.py
+    compact_changes`` deletes superseded entries and old tombstones.
+    """
+
+    class Kind(models.TextChoices):
+        LOG = "log", "Maintenance log"
+        STEP = "step", "Step"
+        EQUIPMENT = "equipment", "Equipment"
+
+    site = models.ForeignKey(
+        Site,
+        on_delete=models.PROTECT,
+        related_name="changes",
+    )
+    kind = models.CharField(max_length=16, choices=Kind.choices)
+    object_id = models.BigIntegerField()
+    deleted = models.BooleanField(default=False)
+    recorded_at = models.DateTimeField(default=timezone.now)
+    # Position in the feed, in publishing (commit) order; null until published
+    sequence = models.BigIntegerField(null=True, blank=True, editable=False)
+
+    class Meta:
+        ordering = ["id"]
+        constraints = [
+            # Feed pages, and the entries waiting to be published
+            models.UniqueConstraint(fields=["site", "sequence"],
+                                    name="unique_change_sequence_per_site"),
+        ]
+        indexes = [
+            # Compaction: the newest entry of each object
+            models.Index(fields=["site", "kind", "object_id", "id"]),
+        ]
+
+    def __str__(self) -> str:
+        action = "deleted" if self.deleted else "saved"
+        return f"#{self.pk}: {self.kind} {self.object_id} {action}"
+
+
+# ---------- WebhookEndpoint ----------
+class WebhookEndpoint(models.Model):
+    """A URL another system receives a site's events at.
+
+    maintenance.outbox queues an OutboxEvent per subscribed endpoint in the
+    transaction of the change; ``manage.py deliver_webhooks`` POSTs them in
+    batches and keeps the metrics below.
+    """
+
+    class Event(models.TextChoices):
+        HARD_LOG = "log.hard_created", "Hard log created"
+        EQUIPMENT_DOWN = "equipment.down", "Equipment down"
+
+    site = models.ForeignKey(
+        Site,
+        on_delete=models.PROTECT,
+        related_name="webhook_endpoints",
+    )
+    name = models.CharField(max_length=120)
+    url = models.URLField(max_length=500)
+    secret = models.CharField(
+        max_length=128, blank=True,
+        help_text="Signs each batch: X-MaintenaTrack-Signature is "
+                  "sha256=HMAC-SHA256 of the body with this key.")
+    hard_logs = models.BooleanField(
+        default=True, help_text="Send an event when a Hard log is created.")
+    equipment_down = models.BooleanField(
+        default=True, help_text="Send an event when equipment goes DOWN.")
+    is_active = models.BooleanField(
+        default=True,
+        help_text="Inactive endpoints get no new events and are sent none.")
+    batch_size = models.PositiveSmallIntegerField(
+        default=50, validators=[MinValueValidator(1), MaxValueValidator(500)],
+        help_text="Events per request at most.")
+    max_in_flight = models.PositiveSmallIntegerField(
+        default=2, validators=[MinValueValidator(1), MaxValueValidator(16)],
+        help_text="Requests sent to this endpoint at the same time at most.")
+
+    # Delivery metrics, maintained by maintenance.outbox (F-expressions)
+    delivered_count = models.PositiveIntegerField(default=0, editable=False)
+    failed_requests = models.PositiveIntegerField(default=0, editable=False)
+    dropped_count = models.PositiveIntegerField(
+        default=0, editable=False,
+        help_text="Events given up after WEBHOOK_MAX_ATTEMPTS.")
+    last_delivered_at = models.DateTimeField(null=True, blank=True, editable=False)
+    last_latency_ms = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    last_error = models.CharField(max_length=255, blank=True, editable=False)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    COUNTER_FIELDS = ("delivered_count", "failed_requests", "dropped_count",
+                      "last_delivered_at", "last_latency_ms", "last_error")
+    EVENT_FIELDS = {Event.HARD_LOG: "hard_logs",
+                    Event.EQUIPMENT_DOWN: "equipment_down"}
+
+    class Meta:
+        ordering = ["name"]
+        indexes = [models.Index(fields=["site", "is_active"])]
+
+    def __str__(self) -> str:
+        return self.name
+
+    def save(self, *args, **kwargs):
+        _protect_counters(self, kwargs)
+        super().save(*args, **kwargs)
+
+
+# ---------- OutboxEvent ----------
+class OutboxEvent(models.Model):
+    """One event for one webhook endpoint, written with the change it reports.
+
+    Pending until ``manage.py deliver_webhooks`` gets a 2xx for the batch it
+    is in; failed once WEBHOOK_MAX_ATTEMPTS requests did not. Delivered
+    events are deleted after WEBHOOK_RETENTION_DAYS.
+    """
+
+    class State(models.TextChoices):
+        PENDING = "pending", "Pending"
+        DELIVERED = "delivered", "Delivered"
+        FAILED = "failed", "Failed"
+
+    site = models.ForeignKey(
+        Site,
+        on_delete=models.PROTECT,
+        related_name="outbox_events",
+    )
+    endpoint = models.ForeignKey(
+        WebhookEndpoint,
+        on_delete=models.CASCADE,
+        related_name="events",
+    )
+    event = models.CharField(max_length=32, choices=WebhookEndpoint.Event.choices)
+    payload = models.JSONField(encoder=DjangoJSONEncoder)
+    state = models.CharField(
+        max_length=16, choices=State.choices, default=State.PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    # Also the lease of a batch being sent: a worker that dies mid-request
+    # leaves its events due again once the request would have timed out
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    delivered_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["id"]
+        indexes = [
+            # The next batch of an endpoint
+            models.Index(fields=["endpoint", "state", "next_attempt_at", "id"]),
+            # Purge of delivered events
+            models.Index(fields=["state", "delivered_at"]),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.event} #{self.pk} to {self.endpoint_id} ({self.state})"
@@ -0,0 +1,205 @@
+"""Offline batch submission for MaintenaTrack.
+
+Field devices queue logs (with their steps) in IndexedDB while offline and
+replay them to ``log_batch_sync`` once connectivity returns. Each queued item
+carries an idempotency key so a retried upload never creates a second log.
+
+- apply_batch: validate every item, then write all valid ones in one transaction.
+
+A queued log that exactly repeats a recent incident (same fingerprint, see
+maintenance.dedup) is merged: its steps are appended to the existing log.
+Items sent with ``"on_duplicate": "create"`` are always created.
+"""
+
+from typing import Any, Dict, List
+
+from django.db import IntegrityError, router, transaction
+from django.forms import modelform_factory
+
+from .dedup import append_steps, find_duplicates
+from .forms import EquipmentForm, MaintenanceLogForm, StepForm
+from .models import Equipment, IdempotencyKey, MaintenanceLog, Step
+from .revisions import record_revision
+
+MAX_BATCH_SIZE = 50
+LOG_FIELDS = ["equipment", "zone", "alarm_code", "alarm_name",
+              "lam_checked", "difficulty", "description"]
+
+# What quick add asks for: the rest of the equipment is filled in later
+NewEquipmentForm = modelform_factory(Equipment, form=EquipmentForm,
+                                     fields=["name", "zone"])
+
+
+def _clean_item(item: Dict[str, Any], site) -> Dict[str, Any]:
+    """Validate one queued item with the same forms the web UI uses."""
+    data = {field: item.get(field) for field in LOG_FIELDS}
+    if not data["lam_checked"]:
+        data.pop("lam_checked")  # CheckboxInput treats any present value as True
+
+    errors: Dict[str, Any] = {}
+    new_equipment = item.get("new_equipment") or None
+    if new_equipment is not None and not isinstance(new_equipment, dict):
+        errors["new_equipment"] = [{"message": "Must be an object."}]
+        new_equipment = None
+    if new_equipment:
+        # Equipment is created inside the transaction; zone falls back to it
+        data.pop("equipment")
+        if not data.get("zone"):
+            data["zone"] = new_equipment.get("zone", "")
+
+    form = MaintenanceLogForm(data, site=site)
+    if not form.is_valid():
+        errors.update(form.errors.get_json_data())
+
+    if new_equipment:
+        equipment_data = {"name": new_equipment.get("name") or "",
+                          "zone": data.get("zone") or "1"}
+        if not all(isinstance(value, str) for value in equipment_data.values()):
+            # Forms would turn a list or a number into its repr
+            errors["new_equipment"] = [{"message": "Name and zone must be strings."}]
+        else:
+            equipment_form = NewEquipmentForm(equipment_data)
+            if equipment_form.is_valid():
+                new_equipment = equipment_form.cleaned_data
+            else:
+                errors["new_equipment"] = equipment_form.errors.get_json_data()
+
+    steps = []
+    raw_steps = item.get("steps") or []
+    if not isinstance(raw_steps, list):
+        errors["steps"] = [{"message": "Must be a list of objects."}]
+        raw_steps = []
+    for index, raw_step in enumerate(raw_steps):
+        if not isinstance(raw_step, dict):
+            errors[f"steps.{index}"] = [{"message": "Must be an object."}]
+            continue
+        if not str(raw_step.get("action") or "").strip():
+            continue
+        if not raw_step.get("order"):
+            raw_step = {**raw_step, "order": index + 1}
+        step_form = StepForm(raw_step)
+        if step_form.is_valid():
+            steps.append(step_form.cleaned_data)
+        else:
+            errors[f"steps.{index}"] = step_form.errors.get_json_data()
+
+    orders = [step["order"] for step in steps]
+    if len(orders) != len(set(orders)):
+        errors.setdefault("steps", []).append(
+            {"message": "Step order values must be unique."})
+
+    return {"form": form, "steps": steps, "new_equipment": new_equipment,
+            "force_new": item.get("on_duplicate") == "create", "errors": errors}
+
+
+def _duplicates(cleaned: Dict[str, Any], site) -> List[Dict[str, Any]]:
+    data = cleaned["form"].cleaned_data
+    equipment = data.get("equipment")
+    new_equipment = cleaned["new_equipment"]
+    zone = data.get("zone") or (equipment.zone if equipment else "")
+    if new_equipment:
+        equipment = Equipment.objects.filter(
+            site=site, name=new_equipment["name"],
+            zone=new_equipment["zone"]).first()
+        if equipment is None:
+            return []  # brand-new equipment has no history to repeat
+    return find_duplicates(zone, data.get("alarm_code"),
+                           equipment.pk if equipment else None,
+                           data.get("description"), site=site)
+
+
+def _save_item(user, site, cleaned: Dict[str, Any]) -> MaintenanceLog:
+    log = cleaned["form"].save(commit=False)
+    log.site = site
+
+    new_equipment = cleaned["new_equipment"]
+    if new_equipment:
+        log.equipment, _ = Equipment.objects.get_or_create(
+            site=site, name=new_equipment["name"], zone=new_equipment["zone"],
+            defaults={"status": Equipment.Status.ACTIVE},
+        )
+
+    if not log.zone and log.equipment and log.equipment.zone:
+        log.zone = log.equipment.zone
+    log.created_by = user
+    log.save()
+
+    for position, step_data in enumerate(cleaned["steps"], start=1):
+        Step.objects.create(
+            log=log,
+            order=step_data.get("order") or position,
+            action=step_data["action"],
+            result=step_data.get("result", ""),
+            duration_minutes=step_data.get("duration_minutes"),
+            performed_by=user,
+        )
+    return log
+
+
+def apply_batch(user, items: List[Dict[str, Any]], site) -> List[Dict[str, Any]]:
+    """Apply queued submissions to ``site``; one result per item, in order.
+
+    Results have a ``status`` of ``created``, ``merged`` (same incident as
+    a recent log; steps appended to it), ``duplicate`` (key already applied),
+    ``invalid`` (validation errors, nothing written for it) or ``retry`` (the
+    transaction lost a race; resend later). Created results list near-duplicate
+    log ids under ``similar``. Valid items are written together in a single
+    transaction.
+    """
+    keys = [str(item.get("idempotency_key") or "").strip() for item in items]
+    seen = dict(
+        IdempotencyKey.objects
+        .filter(user=user, key__in=[key for key in keys if key])
+        .values_list("key", "log_id")
+    )
+
+    results: List[Dict[str, Any]] = []
+    pending = []
+    batch_keys = set()
+    for key, item in zip(keys, items):
+        if not key or len(key) > 64:
+            results.append({"key": key, "status": "invalid", "errors": {
+                "idempotency_key": [{"message": "A key of up to 64 characters is required."}]}})
+            continue
+        if key in seen:
+            results.append({"key": key, "status": "duplicate", "log_id": seen[key]})
+            continue
+        if key in batch_keys:
+            results.append({"key": key, "status": "invalid", "errors": {
+                "idempotency_key": [{"message": "Key repeated within this batch."}]}})
+            continue
+        batch_keys.add(key)
+
+        cleaned = _clean_item(item, site)
+        if cleaned["errors"]:
+            results.append({"key": key, "status": "invalid", "errors": cleaned["errors"]})
+            continue
+        result = {"key": key, "status": "created", "log_id": None}
+        results.append(result)
+        pending.append((key, cleaned, result))
+
+    if pending:
+        try:
+            with transaction.atomic(using=router.db_for_write(MaintenanceLog)):
+                for key, cleaned, result in pending:
+                    matches = [] if cleaned["force_new"] else _duplicates(cleaned, site)
+                    if matches and matches[0]["exact"]:
+                        log = matches[0]["log"]
+                        record_revision(log.pk)
+                        append_steps(log, cleaned["steps"], user)
+                        result["status"] = "merged"
+                    else:
+                        log = _save_item(user, site, cleaned)
+                        if matches:
+                            result["similar"] = [m["log"].pk for m in matches]
+                    record_revision(log.pk, user)
+                    IdempotencyKey.objects.create(key=key, user=user, log=log)
+                    result["log_id"] = log.pk
+        except IntegrityError:
+            # A concurrent retry claimed one of the keys first; the whole batch
+            # rolled back, so report it as retryable rather than half-applied.
+            for _, _, result in pending:
+                result.update({"status": "retry", "log_id": None})
+                result.pop("similar", None)
+
+    return results
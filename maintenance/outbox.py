@@ -0,0 +1,364 @@
+"""Transactional outbox: webhooks for Hard logs and equipment going DOWN.
+
+- enqueue: when a Hard log is created or equipment goes DOWN
+  (maintenance.signals), one OutboxEvent per active endpoint of the site
+  subscribed to the event, on the database and in the transaction of the
+  change (writers save inside transaction.atomic): an event exists exactly
+  when its change committed, and the
+  request pays for a SELECT and an INSERT, never for another system's
+  latency.
+- claim: the next due events of an endpoint, oldest first (from the
+  (endpoint, state, next_attempt_at, id) index), leased by moving
+  next_attempt_at past the time a request may take. Where the database
+  has SELECT ... FOR UPDATE SKIP LOCKED, several workers can share the
+  outbox; on SQLite run one.
+- send: one POST of a batch as {"events": [{"id", "event", "created_at",
+  "attempt", "data"}]}, signed with the endpoint's secret (X-MaintenaTrack-
+  Signature: sha256=HMAC-SHA256 of the body). Redirects are not followed.
+  Delivery is at least once and batches can arrive out of order (retries,
+  concurrent requests): receivers dedupe and order by event id.
+- settle: a 2xx delivers the batch. Anything else, or no response, retries
+  its events after WEBHOOK_BACKOFF_SECONDS, doubling per attempt up to
+  WEBHOOK_BACKOFF_MAX_SECONDS, with jitter, and at least the response's
+  Retry-After. An event is given up (failed; the admin can queue it again)
+  when its WEBHOOK_MAX_ATTEMPTS-th request fails. The endpoint's metrics are
+  updated with F-expressions.
+- Deliverer: the loop behind ``manage.py deliver_webhooks``. Database work
+  stays on its thread; requests run in a thread pool, at most
+  max_in_flight at a time per endpoint.
+"""
+
+import hashlib
+import hmac
+import http.client
+import json
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter, defaultdict
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from datetime import timedelta
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections, router, transaction
+from django.db.models import F
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import Equipment, MaintenanceLog, OutboxEvent, WebhookEndpoint
+from .routers import pin_to_primary
+from .sites import all_sites, use_site
+
+Event = WebhookEndpoint.Event
+SIGNATURE_HEADER = "X-MaintenaTrack-Signature"
+USER_AGENT = "MaintenaTrack-Webhooks/1.0"
+PURGE_EVERY = 3600  # seconds between purges of delivered events
+
+
+def _setting(name: str, default: int) -> int:
+    return getattr(settings, name, default)
+
+
+# -- enqueue ---------------------------------------------------------------
+def _site_code(site_id: int) -> str:
+    return next((site.code for site in all_sites() if site.pk == site_id), "")
+
+
+def log_payload(log: MaintenanceLog, using: str) -> dict:
+    equipment = None
+    if log.equipment_id:
+        # Set by the log forms; one query otherwise
+        equipment = (log.equipment if MaintenanceLog.equipment.is_cached(log)
+                     else Equipment.objects.using(using).get(pk=log.equipment_id))
+    return {
+        "id": log.pk,
+        "site": _site_code(log.site_id),
+        "zone": log.zone,
+        "alarm_code": log.alarm_code,
+        "alarm_name": log.alarm_name,
+        "difficulty": log.difficulty,
+        "description": log.description_preview,
+        "equipment": equipment and {
+            "id": equipment.pk, "name": equipment.name,
+            "asset_tag": equipment.asset_tag},
+        "created_by_id": log.created_by_id,
+        "created_at": log.created_at,
+        "url": reverse("maintenance:log_detail", args=[log.pk]),
+    }
+
+
+def equipment_payload(equipment: Equipment, using: str) -> dict:
+    return {
+        "id": equipment.pk,
+        "site": _site_code(equipment.site_id),
+        "name": equipment.name,
+        "asset_tag": equipment.asset_tag,
+        "zone": equipment.zone,
+        "location": equipment.location,
+        "status": equipment.status,
+        "previous_status": getattr(equipment, "_loaded_status", None),
+        "changed_at": equipment.updated_at,
+        "url": reverse("maintenance:equipment_detail", args=[equipment.pk]),
+    }
+
+
+PAYLOADS: Dict[str, Callable[..., dict]] = {
+    Event.HARD_LOG: log_payload,
+    Event.EQUIPMENT_DOWN: equipment_payload,
+}
+
+
+def enqueue(event: str, instance, using: str) -> int:
+    """Queue ``event`` about ``instance`` for the subscribed endpoints."""
+    endpoints = list(WebhookEndpoint.objects.using(using).filter(
+        site_id=instance.site_id, is_active=True,
+        **{WebhookEndpoint.EVENT_FIELDS[event]: True}).values_list("pk", flat=True))
+    if not endpoints:
+        return 0
+    payload = PAYLOADS[event](instance, using)
+    OutboxEvent.objects.using(using).bulk_create([
+        OutboxEvent(site_id=instance.site_id, endpoint_id=endpoint_id,
+                    event=event, payload=payload)
+        for endpoint_id in endpoints])
+    return len(endpoints)
+
+
+# -- delivery --------------------------------------------------------------
+def _lease() -> timedelta:
+    return timedelta(seconds=2 * _setting("WEBHOOK_TIMEOUT_SECONDS", 10) + 60)
+
+
+def claim(endpoint: WebhookEndpoint, now=None) -> List[OutboxEvent]:
+    """Lease the endpoint's next batch of due events."""
+    now = now or timezone.now()
+    using = router.db_for_write(OutboxEvent)
+    with transaction.atomic(using=using):
+        due = (OutboxEvent.objects.using(using)
+               .filter(endpoint=endpoint, state=OutboxEvent.State.PENDING,
+                       next_attempt_at__lte=now)
+               .order_by("next_attempt_at", "id"))
+        if connections[using].features.has_select_for_update_skip_locked:
+            due = due.select_for_update(skip_locked=True)
+        events = list(due[:endpoint.batch_size])
+        if events:
+            OutboxEvent.objects.using(using).filter(
+                pk__in=[event.pk for event in events]).update(
+                attempts=F("attempts") + 1, next_attempt_at=now + _lease())
+    for event in events:
+        event.attempts += 1
+    return events
+
+
+def body(events: List[OutboxEvent]) -> bytes:
+    return json.dumps({"events": [{
+        "id": event.pk, "event": event.event, "created_at": event.created_at,
+        "attempt": event.attempts, "data": event.payload,
+    } for event in events]}, cls=DjangoJSONEncoder).encode()
+
+
+def sign(secret: str, data: bytes) -> str:
+    return "sha256=" + hmac.new(secret.encode(), data, hashlib.sha256).hexdigest()
+
+
+class Attempt(NamedTuple):
+    ok: bool
+    status: Optional[int]  # None: no response
+    error: str
+    seconds: float
+    retry_after: Optional[float] = None
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None  # a 3xx is a failed request, not a GET elsewhere
+
+
+_opener = urllib.request.build_opener(_NoRedirect)
+
+
+def _retry_after(value: Optional[str]) -> Optional[float]:
+    try:
+        return max(float(value), 0.0) if value else None
+    except ValueError:
+        return None  # an HTTP date; the backoff applies
+
+
+def send(url: str, secret: str, data: bytes, timeout: float) -> Attempt:
+    """POST one batch; never raises."""
+    headers = {"Content-Type": "application/json", "User-Agent": USER_AGENT}
+    if secret:
+        headers[SIGNATURE_HEADER] = sign(secret, data)
+    request = urllib.request.Request(url, data=data, headers=headers, method="POST")
+    start = time.perf_counter()
+    try:
+        with _opener.open(request, timeout=timeout) as response:
+            response.read(65536)
+            status = response.status
+        return Attempt(200 <= status < 300, status,
+                       "" if 200 <= status < 300 else f"HTTP {status}",
+                       time.perf_counter() - start)
+    except urllib.error.HTTPError as exc:
+        return Attempt(False, exc.code, f"HTTP {exc.code} {exc.reason}"[:255],
+                       time.perf_counter() - start,
+                       _retry_after(exc.headers.get("Retry-After")))
+    except (OSError, ValueError, http.client.HTTPException) as exc:
+        reason = getattr(exc, "reason", None) or exc
+        return Attempt(False, None, f"{type(exc).__name__}: {reason}"[:255],
+                       time.perf_counter() - start)
+
+
+def backoff(attempts: int, retry_after: Optional[float] = None) -> timedelta:
+    cap = _setting("WEBHOOK_BACKOFF_MAX_SECONDS", 3600)
+    delay = min(cap, _setting("WEBHOOK_BACKOFF_SECONDS", 30) * 2 ** min(attempts - 1, 30))
+    # Jitter: retries of an endpoint that was down do not all land at once
+    delay = random.uniform(delay / 2, delay)
+    return timedelta(seconds=max(delay, min(retry_after or 0, cap)))
+
+
+def settle(endpoint: WebhookEndpoint, events: List[OutboxEvent], attempt: Attempt,
+           now=None) -> Tuple[int, int]:
+    """Record a batch's outcome; returns the events delivered and given up."""
+    now = now or timezone.now()
+    pending = OutboxEvent.objects.filter(
+        pk__in=[event.pk for event in events], state=OutboxEvent.State.PENDING)
+    endpoints = WebhookEndpoint.objects.filter(pk=endpoint.pk)
+    if attempt.ok:
+        delivered = pending.update(state=OutboxEvent.State.DELIVERED,
+                                   delivered_at=now, last_error="")
+        endpoints.update(delivered_count=F("delivered_count") + delivered,
+                         last_delivered_at=now,
+                         last_latency_ms=round(attempt.seconds * 1000))
+        return delivered, 0
+
+    retries: Dict[int, List[int]] = defaultdict(list)
+    given_up = []
+    for event in events:
+        if event.attempts >= _setting("WEBHOOK_MAX_ATTEMPTS", 10):
+            given_up.append(event.pk)
+        else:
+            retries[event.attempts].append(event.pk)
+    dropped = pending.filter(pk__in=given_up).update(
+        state=OutboxEvent.State.FAILED, last_error=attempt.error) if given_up else 0
+    for attempts, ids in retries.items():
+        pending.filter(pk__in=ids).update(
+            next_attempt_at=now + backoff(attempts, attempt.retry_after),
+            last_error=attempt.error)
+    endpoints.update(failed_requests=F("failed_requests") + 1,
+                     dropped_count=F("dropped_count") + dropped,
+                     last_error=attempt.error)
+    return 0, dropped
+
+
+def purge(site, now=None) -> int:
+    """Delete the site's events delivered more than WEBHOOK_RETENTION_DAYS ago."""
+    before = (now or timezone.now()) - timedelta(days=_setting("WEBHOOK_RETENTION_DAYS", 7))
+    deleted, _ = OutboxEvent.objects.filter(
+        site=site, state=OutboxEvent.State.DELIVERED, delivered_at__lt=before).delete()
+    return deleted
+
+
+class EndpointStats:
+    """What one Deliverer did for one endpoint."""
+
+    def __init__(self, label: str):
+        self.label = label
+        self.requests = self.failed = self.delivered = self.dropped = 0
+        self.latencies: List[float] = []
+
+    def percentile(self, share: float) -> Optional[float]:
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(share * len(ordered)))] * 1000
+
+
+class Deliverer:
+    """Sends the outbox of ``sites``: see ``manage.py deliver_webhooks``."""
+
+    def __init__(self, sites, threads: int = 8,
+                 log: Optional[Callable[[str], None]] = None):
+        self.sites = list(sites)
+        self.pool = ThreadPoolExecutor(max_workers=threads,
+                                       thread_name_prefix="webhook")
+        self.log = log or (lambda line: None)
+        self.stats: Dict[Tuple[int, int], EndpointStats] = {}
+        self._in_flight: Counter = Counter()  # by (site, endpoint)
+        self._futures: Dict[Future, Tuple] = {}
+        self._purged_at = 0.0
+
+    def dispatch(self) -> int:
+        """Start the next batch of every endpoint with room; returns how many."""
+        started = 0
+        timeout = _setting("WEBHOOK_TIMEOUT_SECONDS", 10)
+        for site in self.sites:
+            with use_site(site), pin_to_primary():
+                for endpoint in WebhookEndpoint.objects.filter(site=site, is_active=True):
+                    key = (site.pk, endpoint.pk)
+                    while self._in_flight[key] < endpoint.max_in_flight:
+                        events = claim(endpoint)
+                        if not events:
+                            break
+                        future = self.pool.submit(send, endpoint.url, endpoint.secret,
+                                                  body(events), timeout)
+                        self._futures[future] = (site, endpoint, events)
+                        self._in_flight[key] += 1
+                        started += 1
+        return started
+
+    def collect(self, timeout: Optional[float]) -> int:
+        """Settle the requests finished within ``timeout``; returns how many."""
+        done, _ = wait(list(self._futures), timeout=timeout,
+                       return_when=FIRST_COMPLETED)
+        for future in done:
+            site, endpoint, events = self._futures.pop(future)
+            key = (site.pk, endpoint.pk)
+            self._in_flight[key] -= 1
+            attempt = future.result()
+            with use_site(site), pin_to_primary():
+                delivered, dropped = settle(endpoint, events, attempt)
+            stats = self.stats.setdefault(
+                key, EndpointStats(f"{site.code}/{endpoint.name}"))
+            stats.requests += 1
+            stats.failed += not attempt.ok
+            stats.delivered += delivered
+            stats.dropped += dropped
+            stats.latencies.append(attempt.seconds)
+            self.log(f"{stats.label}: {len(events)} event(s), "
+                     f"{attempt.status or attempt.error} in "
+                     f"{attempt.seconds * 1000:.0f} ms"
+                     + (f", {dropped} given up" if dropped else ""))
+        return len(done)
+
+    def purge(self) -> int:
+        if time.monotonic() - self._purged_at < PURGE_EVERY:
+            return 0
+        self._purged_at = time.monotonic()
+        deleted = 0
+        for site in self.sites:
+            with use_site(site), pin_to_primary():
+                deleted += purge(site)
+        return deleted
+
+    def run(self, once: bool = False, poll: float = 1.0,
+            stop: Optional[threading.Event] = None) -> None:
+        """Deliver until ``stop`` is set (``once``: until nothing is due)."""
+        stop = stop or threading.Event()
+        try:
+            while not stop.is_set():
+                self.purge()
+                self.dispatch()
+                if self._futures:
+                    self.collect(poll)
+                elif once:
+                    break
+                else:
+                    stop.wait(poll)
+        finally:
+            # Requests in flight still get their outcome recorded
+            while self._futures:
+                self.collect(None)
+            self.pool.shutdown()
@@ -0,0 +1,137 @@
+"""On-demand request profiling for staff.
+
+- ProfileStore: bounded on-disk store of captured profiles. Each capture is a
+  pstats dump (``<id>.prof``) plus JSON metadata with the SQL trace
+  (``<id>.json``); the oldest captures are evicted past PROFILE_STORE_MAX_ENTRIES
+  or PROFILE_STORE_MAX_BYTES.
+- call_tree / top_functions: summaries rendered by the admin profile browser.
+
+ProfilingMiddleware (maintenance.middleware) does the capturing.
+"""
+
+import json
+import pstats
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from django.conf import settings
+
+MAX_SQL_ENTRIES = 500
+
+
+class ProfileStore:
+    def __init__(self, directory=None, max_entries=None, max_bytes=None):
+        self.directory = Path(directory or getattr(
+            settings, "PROFILE_STORE_DIR", settings.BASE_DIR / "logs" / "profiles"))
+        self.max_entries = max_entries or getattr(
+            settings, "PROFILE_STORE_MAX_ENTRIES", 50)
+        self.max_bytes = max_bytes or getattr(
+            settings, "PROFILE_STORE_MAX_BYTES", 50 * 1024 * 1024)
+
+    def save(self, profiler, meta: Dict[str, Any]) -> str:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # Time-ordered ids: listing and eviction are plain name sorts
+        profile_id = f"{int(time.time() * 1000):013d}-{uuid.uuid4().hex[:8]}"
+        profiler.dump_stats(self.directory / f"{profile_id}.prof")
+        meta = {**meta, "id": profile_id,
+                "sql": meta.get("sql", [])[:MAX_SQL_ENTRIES]}
+        (self.directory / f"{profile_id}.json").write_text(
+            json.dumps(meta, default=str), encoding="utf-8")
+        self.evict()
+        return profile_id
+
+    def _ids(self) -> List[str]:
+        if not self.directory.exists():
+            return []
+        return sorted(p.stem for p in self.directory.glob("*.json"))
+
+    def evict(self) -> None:
+        ids = self._ids()
+        sizes = {i: sum(p.stat().st_size for p in self._files(i) if p.exists())
+                 for i in ids}
+        total = sum(sizes.values())
+        while ids and (len(ids) > self.max_entries or total > self.max_bytes):
+            oldest = ids.pop(0)
+            total -= sizes[oldest]
+            for path in self._files(oldest):
+                path.unlink(missing_ok=True)
+
+    def _files(self, profile_id: str):
+        return (self.directory / f"{profile_id}.json",
+                self.directory / f"{profile_id}.prof")
+
+    def list(self) -> List[Dict[str, Any]]:
+        entries = []
+        for profile_id in reversed(self._ids()):
+            meta = self.meta(profile_id)
+            if meta:
+                meta.pop("sql", None)
+                entries.append(meta)
+        return entries
+
+    def meta(self, profile_id: str) -> Optional[Dict[str, Any]]:
+        path = self.directory / f"{Path(profile_id).name}.json"
+        try:
+            return json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+
+    def stats(self, profile_id: str) -> pstats.Stats:
+        return pstats.Stats(str(self.directory / f"{Path(profile_id).name}.prof"))
+
+
+def _label(func) -> str:
+    filename, line, name = func
+    if filename == "~":
+        return name  # built-in
+    parts = Path(filename).parts
+    for marker in ("site-packages", "maintenance", "maintenatrack"):
+        if marker in parts:
+            parts = parts[parts.index(marker) + (marker == "site-packages"):]
+            break
+    return f"{'/'.join(parts[-3:])}:{line}({name})"
+
+
+def top_functions(stats: pstats.Stats, limit: int = 30) -> List[Dict[str, Any]]:
+    """Functions by cumulative time, like ``pstats`` ``sort_stats("cumulative")``."""
+    rows = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)
+    return [{"function": _label(func), "calls": nc, "tottime_ms": tt * 1000,
+             "cumtime_ms": ct * 1000}
+            for func, (cc, nc, tt, ct, callers) in rows[:limit]]
+
+
+def call_tree(stats: pstats.Stats, max_depth: int = 8,
+              min_fraction: float = 0.01) -> List[Dict[str, Any]]:
+    """Flattened call tree (depth-first) from the most expensive root.
+
+    pstats only records caller -> callee edges with their own timings, so
+    each child shows the time spent in it *when called from its parent*.
+    Branches under ``min_fraction`` of the total are pruned.
+    """
+    children: Dict[Any, List] = {}
+    for func, (cc, nc, tt, ct, callers) in stats.stats.items():
+        for caller, edge in callers.items():
+            children.setdefault(caller, []).append((func, edge))
+    if not stats.stats:
+        return []
+
+    root = max(stats.stats, key=lambda f: stats.stats[f][3])
+    total = stats.stats[root][3] or 1e-9
+    rows: List[Dict[str, Any]] = []
+
+    def walk(func, calls, cumtime, depth, path):
+        rows.append({"function": _label(func), "depth": depth, "calls": calls,
+                     "cumtime_ms": cumtime * 1000,
+                     "percent": 100 * cumtime / total})
+        if depth >= max_depth:
+            return
+        kids = sorted(children.get(func, []), key=lambda c: c[1][3], reverse=True)
+        for child, (cc, nc, tt, ct) in kids:
+            if ct / total >= min_fraction and child not in path:
+                walk(child, nc, ct, depth + 1, path | {child})
+
+    root_stats = stats.stats[root]
+    walk(root, root_stats[1], root_stats[3], 0, {root})
+    return rows
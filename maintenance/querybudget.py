@@ -0,0 +1,370 @@
+"""Query budgets: the SQL every view runs, checked against stored budgets.
+
+- seed: a small fixed dataset (logs with equipment, steps, alarms,
+  revisions, an attachment, a stored report and a webhook endpoint) so
+  every view has rows to show and N+1 patterns show up as extra queries.
+- cases: one request per route in maintenance/urls.py (both methods where
+  a view takes a POST) plus every admin changelist. A route without a case
+  is reported, so new views get a budget too.
+- measure: runs a case twice (a warm-up, then the measured request), each
+  rolled back, and records every statement on every connection. SELECTs,
+  UPDATEs and DELETEs are then EXPLAINed: tables read by a full scan and
+  indexes used are kept (SQLite EXPLAIN QUERY PLAN, PostgreSQL EXPLAIN).
+- compare: a measurement against its budget. More queries than budgeted,
+  a new full table scan or an index no longer used is a regression; fewer
+  queries or fewer scans is only noted, to tighten the budget.
+
+``manage.py check_query_budgets`` runs all of this against the budgets in
+maintenance/query_budgets.json and rewrites them with ``--update``.
+"""
+
+import difflib
+import hashlib
+import json
+import re
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from datetime import timedelta
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import DatabaseError, connections, transaction
+from django.test import Client
+from django.urls import get_resolver, reverse
+from django.utils import timezone
+
+from .alarms import suggest
+from .attachments import blob_path, thumbnail_path
+from .cache import CounterCache
+from .changefeed import publish
+from .heatmap import heatmap
+from .models import (
+    Attachment, Equipment, MaintenanceLog, Step, WebhookEndpoint,
+)
+from .reliability import metrics_for
+from .reports import refresh_aggregates, week_bounds, write_report
+from .revisions import record_revision
+from .sites import all_sites
+
+PASSWORD = "query-budget-password"
+CONTENT = b"query budget attachment"  # served as the attachment and its thumbnail
+EXPLAINED = ("SELECT", "UPDATE", "DELETE", "WITH")
+
+
+class Case(NamedTuple):
+    name: str
+    method: str
+    path: str
+    data: Any = None
+    user: Optional[str] = "technician"  # technician, admin or None
+    status: int = 200
+    content_type: Optional[str] = None
+
+
+class _Rollback(Exception):
+    pass
+
+
+# -- dataset ---------------------------------------------------------------
+def seed(site) -> Dict[str, Any]:
+    """Create the dataset (call inside a transaction that is rolled back)."""
+    User = get_user_model()
+    technician = User.objects.create_user("budget-technician", password=PASSWORD)
+    superuser = User.objects.create_superuser(
+        "budget-admin", "budget-admin@example.com", PASSWORD)
+    equipment = [Equipment.objects.create(
+        site=site, name=f"Budget conveyor {n}", asset_tag=f"BUDGET-{n}",
+        zone=f"Z{n % 4 + 1}") for n in range(8)]
+    spare = Equipment.objects.create(site=site, name="Budget spare", zone="Z1")
+    # Queues an outbox event per Hard log below
+    WebhookEndpoint.objects.create(site=site, name="Budget receiver",
+                                   url="http://127.0.0.1:8765/")
+    logs = []
+    for n in range(40):
+        log = MaintenanceLog.objects.create(
+            site=site, zone=f"Z{n % 4 + 1}", equipment=equipment[n % 8],
+            alarm_code=f"ALM-{100 + n % 8}", alarm_name=f"Budget alarm {n % 8}",
+            difficulty=MaintenanceLog.Difficulty.values[n % 3],
+            description=f"Budget incident {n}", created_by=technician)
+        for order in range(1, 4):
+            Step.objects.create(log=log, order=order, action=f"Step {order}",
+                                result="OK", duration_minutes=5,
+                                performed_by=technician)
+        logs.append(log)
+    for log in logs[:3]:
+        record_revision(log.pk, technician)
+    MaintenanceLog.objects.create(
+        site=site, zone="Z1", equipment=spare, alarm_code="ALM-SPARE",
+        difficulty=MaintenanceLog.Difficulty.EASY, description="Spare in use",
+        created_by=technician)
+
+    sha256 = hashlib.sha256(CONTENT).hexdigest()
+    for path in (blob_path(sha256), thumbnail_path(sha256)):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(CONTENT)
+    attachment = Attachment.objects.create(
+        log=logs[0], sha256=sha256, size=len(CONTENT), content_type="text/plain",
+        original_name="budget.txt", uploaded_by=technician)
+
+    refresh_aggregates(site, full=True)
+    now = timezone.now()
+    # A running site's change feed entries are published as it is read
+    publish(site)
+    write_report(site, "week", *week_bounds(now))
+    write_report(site, "week", *week_bounds(now - timedelta(days=7)))
+    # Cache version stamps are created on first read; read them here, outside
+    # the cases' rollbacks, as a running site already has them
+    all_sites()
+    metrics_for(site)
+    heatmap(site)
+    suggest(site, "")
+    return {"site": site, "technician": technician, "admin": superuser,
+            "log": logs[0], "spare": spare, "attachment": attachment}
+
+
+def cases(data: Dict[str, Any]) -> List[Case]:
+    log, site = data["log"], data["site"]
+
+    def url(name, *args):
+        return reverse(f"maintenance:{name}", args=args)
+
+    log_form = {
+        "zone": "Z2", "alarm_code": "ALM-101", "alarm_name": "",
+        "difficulty": "Medium", "description": "Budget new incident",
+        "confirm_new": "1", "steps-TOTAL_FORMS": 2, "steps-INITIAL_FORMS": 0,
+        "steps-MIN_NUM_FORMS": 0, "steps-MAX_NUM_FORMS": 1000,
+        "steps-0-order": 1, "steps-0-action": "Reset", "steps-0-result": "OK",
+        "steps-1-order": 2, "steps-1-action": "Check", "steps-1-result": "OK",
+    }
+    batch = {"logs": [{
+        "idempotency_key": "budget-1", "zone": "Z3", "alarm_code": "ALM-102",
+        "difficulty": "Easy", "description": "Budget offline incident",
+        "steps": [{"action": "Reset", "result": "OK"}],
+    }]}
+    return [
+        Case("home", "GET", url("home")),
+        Case("about", "GET", url("about")),
+        Case("log_list", "GET", url("log_list")),
+        Case("log_list filtered", "GET",
+             url("log_list") + "?zone=Z2&difficulty=Hard&q=ALM-101&page=1"),
+        Case("log_list my_logs", "GET", url("log_list") + "?my_logs=true"),
+        Case("log_create", "GET", url("log_create")),
+        Case("log_create POST", "POST", url("log_create"), log_form, status=302),
+        Case("log_feed", "GET", url("log_feed"), status=204),
+        Case("step_search", "GET", url("step_search") + "?q=step+ok"),
+        Case("step_search json", "GET", url("step_search") + "?q=ste&format=json&page=2"),
+        Case("log_detail", "GET", url("log_detail", log.pk)),
+        Case("log_update", "GET", url("log_update", log.pk)),
+        Case("log_delete", "GET", url("log_delete", log.pk)),
+        Case("log_batch_sync", "GET", url("log_batch_sync")),
+        Case("log_batch_sync POST", "POST", url("log_batch_sync"),
+             json.dumps(batch), content_type="application/json"),
+        Case("attachment_upload POST", "POST", url("attachment_upload", log.pk),
+             {}, status=302),
+        Case("attachment_file", "GET", url("attachment_file", data["attachment"].pk)),
+        Case("attachment_thumbnail", "GET",
+             url("attachment_thumbnail", data["attachment"].pk)),
+        Case("report_list", "GET", url("report_list")),
+        Case("report_file", "GET", reverse("maintenance:report_file", kwargs={
+            "kind": "week", "period": "latest", "fmt": "html"})),
+        Case("dashboard", "GET", url("dashboard")),
+        Case("heatmap_data", "GET",
+             url("heatmap_data") + "?axis=week&days=30&difficulty=Hard&alarm_code=alm-101"),
+        Case("change_feed", "GET", url("change_feed") + "?limit=100"),
+        Case("alarm_suggest", "GET", url("alarm_suggest") + "?q=ALM-10"),
+        Case("signup", "GET", url("signup"), user=None),
+        Case("site_select POST", "POST", url("site_select"),
+             {"site": site.code}, status=302),
+        Case("equipment_list", "GET", url("equipment_list")),
+        Case("equipment_detail", "GET", url("equipment_detail", log.equipment_id)),
+        Case("add_equipment POST", "POST", url("add_equipment"),
+             {"name": "Budget press", "zone": "Z4"}),
+        Case("equipment_delete POST", "POST", url("equipment_delete", data["spare"].pk),
+             status=302),
+        Case("service_worker", "GET", url("service_worker")),
+        Case("web_manifest", "GET", url("web_manifest")),
+        Case("health_check", "GET", url("health_check"), user=None),
+        Case("health_ready", "GET", url("health_ready"), user=None),
+    ] + [
+        Case(f"admin {model._meta.label_lower}", "GET",
+             reverse(f"admin:{model._meta.app_label}_{model._meta.model_name}_changelist"),
+             user="admin")
+        for model in sorted(admin.site._registry, key=lambda m: m._meta.label_lower)
+    ]
+
+
+def uncovered(all_cases: List[Case]) -> List[str]:
+    """maintenance URL names that no case requests."""
+    covered = {case.name.split()[0] for case in all_cases}
+    names = get_resolver().namespace_dict["maintenance"][1].reverse_dict
+    return sorted(name for name in names if isinstance(name, str)
+                  and name not in covered)
+
+
+# -- measuring -------------------------------------------------------------
+@contextmanager
+def _recording(statements: List[Dict[str, Any]]):
+    def record(alias):
+        def wrapper(execute, sql, params, many, context):
+            if not many:
+                statements.append({"alias": alias, "sql": sql, "params": params})
+            return execute(sql, params, many, context)
+        return wrapper
+
+    with ExitStack() as stack:
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(record(alias)))
+        yield
+
+
+@contextmanager
+def _no_counter_purges():
+    # CounterCache purges expired counters on a random share of add() calls;
+    # a measurement must not depend on the draw
+    counters = [backend for backend in caches.all()
+                if isinstance(backend, CounterCache)]
+    saved = [backend._purge_probability for backend in counters]
+    for backend in counters:
+        backend._purge_probability = 0.0
+    try:
+        yield
+    finally:
+        for backend, probability in zip(counters, saved):
+            backend._purge_probability = probability
+
+
+def _request(client: Client, case: Case):
+    if case.method == "GET":
+        return client.get(case.path)
+    if case.content_type:
+        return client.post(case.path, case.data, content_type=case.content_type)
+    return client.post(case.path, case.data or {})
+
+
+def shape(sql: str) -> str:
+    """The statement without its select list or parameter counts."""
+    sql = re.sub(r"\s+", " ", sql).strip()
+    sql = re.sub(r"^SELECT (DISTINCT )?.*? FROM ", r"SELECT \1... FROM ", sql)
+    sql = re.sub(r"IN \((?:%s, )*%s\)", "IN (...)", sql)
+    return sql if len(sql) <= 240 else sql[:237] + "..."
+
+
+def _aliases(sql: str) -> Dict[str, str]:
+    """Table aliases Django uses in subqueries (``"maintenance_step" U0``)."""
+    found = re.findall(r'"(\w+)" (?:AS )?"?([A-Z]\d+)\b', sql)
+    return {alias: table for table, alias in found}
+
+
+def explain(alias: str, sql: str, params) -> Dict[str, List[str]]:
+    """Tables read by a full scan and indexes used by one statement."""
+    connection = connections[alias]
+    scans, indexes = set(), set()
+    prefix = "EXPLAIN QUERY PLAN " if connection.vendor == "sqlite" else "EXPLAIN "
+    try:
+        with transaction.atomic(using=alias), connection.cursor() as cursor:
+            cursor.execute(prefix + sql, params)
+            rows = cursor.fetchall()
+    except DatabaseError:
+        return {"scans": [], "indexes": [], "plan": []}
+    if connection.vendor == "sqlite":
+        lines = [row[-1] for row in rows]
+        tables = _aliases(sql)
+        known = set(connection.introspection.table_names())
+        for line in lines:
+            match = re.match(r"(?:SCAN|SEARCH) (\w+)(?: AS \w+)?(.*)$", line)
+            if not match:
+                continue
+            table = tables.get(match.group(1), match.group(1))
+            rest = match.group(2)
+            index = re.search(r"USING (?:COVERING )?INDEX (\w+)", rest)
+            if index:
+                indexes.add(index.group(1))
+            elif "PRIMARY KEY" in rest:
+                indexes.add(f"{table} (primary key)")
+            elif line.startswith("SCAN") and table in known:
+                scans.add(table)
+    else:
+        lines = [row[0] for row in rows]
+        for line in lines:
+            scans.update(re.findall(r"Seq Scan on (\w+)", line))
+            indexes.update(re.findall(r"Index (?:Only )?Scan(?: Backward)? using (\w+)", line))
+            indexes.update(re.findall(r"Bitmap Index Scan on (\w+)", line))
+    return {"scans": sorted(scans), "indexes": sorted(indexes), "plan": lines}
+
+
+def measure(case: Case, data: Dict[str, Any], aliases: List[str]) -> Dict[str, Any]:
+    """Statements, full scans and indexes of one request (after a warm-up)."""
+    client = Client(HTTP_HOST="localhost")  # an ALLOWED_HOSTS entry
+    if case.user:
+        client.force_login(data[case.user])
+    result: Dict[str, Any] = {}
+    for attempt in ("warm-up", "measured"):
+        statements: List[Dict[str, Any]] = []
+        try:
+            with ExitStack() as stack:
+                for alias in aliases:
+                    stack.enter_context(transaction.atomic(using=alias))
+                with _no_counter_purges(), _recording(statements):
+                    response = _request(client, case)
+                # EXPLAIN before the rollback, while the rows still exist
+                for statement in statements:
+                    if statement["sql"].lstrip().upper().startswith(EXPLAINED):
+                        statement.update(explain(
+                            statement["alias"], statement["sql"], statement["params"]))
+                raise _Rollback
+        except _Rollback:
+            pass
+        result = {"status": response.status_code, "statements": statements}
+    statements = [s for s in result["statements"]
+                  if not re.match(r"\s*(SAVEPOINT|RELEASE|ROLLBACK)", s["sql"])]
+    return {
+        "status": result["status"],
+        "queries": len(statements),
+        "statements": [shape(s["sql"]) for s in statements],
+        "scans": sorted({t for s in statements for t in s.get("scans", [])}),
+        "indexes": sorted({i for s in statements for i in s.get("indexes", [])}),
+        "details": statements,
+    }
+
+
+# -- comparing -------------------------------------------------------------
+def budget_entry(measured: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: measured[key] for key in ("queries", "statements", "scans", "indexes")}
+
+
+def compare(budget: Optional[Dict[str, Any]], measured: Dict[str, Any],
+            plans: bool = True) -> Dict[str, List[str]]:
+    """Regressions (``failures``) and improvements (``notes``), readable."""
+    failures: List[str] = []
+    notes: List[str] = []
+    if budget is None:
+        return {"failures": ["no budget recorded (run with --update)"], "notes": []}
+    if measured["queries"] > budget["queries"]:
+        failures.append(f"{measured['queries']} queries, budget {budget['queries']} "
+                        f"(+{measured['queries'] - budget['queries']})")
+        failures += [f"  {line}" for line in difflib.unified_diff(
+            budget["statements"], measured["statements"],
+            "budget", "measured", lineterm="", n=1)]
+        failures += [f"  repeated {count}x: {sql}" for sql, count
+                     in Counter(measured["statements"]).most_common() if count > 1]
+    elif measured["queries"] < budget["queries"]:
+        notes.append(f"{measured['queries']} queries, budget {budget['queries']}: "
+                     "tighten with --update")
+    if not plans:
+        return {"failures": failures, "notes": notes}
+
+    for table in sorted(set(measured["scans"]) - set(budget["scans"])):
+        failures.append(f"new full scan of {table}")
+        for statement in measured["details"]:
+            if table in statement.get("scans", []):
+                failures.append(f"  {shape(statement['sql'])}")
+                failures += [f"    plan: {line}" for line in statement["plan"]]
+                break
+    for index in sorted(set(budget["indexes"]) - set(measured["indexes"])):
+        failures.append(f"index {index} no longer used")
+    for table in sorted(set(budget["scans"]) - set(measured["scans"])):
+        notes.append(f"no longer scans {table}: tighten with --update")
+    return {"failures": failures, "notes": notes}
+
@@ -0,0 +1,226 @@
+"""Equipment and zone reliability metrics.
+
+- compute: every log of a site within RELIABILITY_WINDOW_DAYS, read in one
+  query ordered by (equipment, created_at) into columns (times as Unix
+  seconds computed by the database, see Epoch). Group boundaries,
+  the gaps between consecutive failures and the per-group sums come from
+  vectorized differences and bincounts over those columns (NumPy when
+  installed, otherwise one pure-Python pass over the same columns); zones
+  are the same pass over the columns re-sorted by (zone, created_at).
+- Reliability: per equipment or zone, over the window:
+  - mtbf_hours: mean hours between consecutive failures (logs);
+  - failures_per_1000h: failures per 1,000 hours since the window start, or
+    since the equipment (the zone's first equipment) was added if later;
+  - mean_repair_minutes: mean summed Step duration of logs with steps;
+  - repeat_alarm_ratio: share of failures whose alarm code already occurred.
+- describe: one line of a Reliability, for the admin.
+- metrics_for: a site's metrics from the default cache, computed on a miss
+  (from the primary) and kept RELIABILITY_CACHE_TTL seconds. maintenance.signals bumps the
+  site's version stamp (shared by every worker, see maintenance.cache) when
+  a log is saved or deleted, so new logs show at once; Step edits made
+  without saving their log show after the TTL.
+
+``manage.py bench_reliability`` compares this with per-equipment queries.
+"""
+
+from datetime import datetime, timedelta
+from itertools import groupby
+from typing import Any, Dict, NamedTuple, Optional, Sequence
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import FloatField, Func
+from django.utils import timezone
+
+from .cache import bump_version, versioned_key
+from .models import Equipment, MaintenanceLog
+from .routers import pin_to_primary
+
+try:
+    import numpy as np
+except ImportError:  # the pure-Python pass gives the same numbers
+    np = None
+
+
+class Epoch(Func):
+    """A datetime column as Unix seconds, so rows need no datetime parsing."""
+    template = "EXTRACT(EPOCH FROM %(expressions)s)"
+    output_field = FloatField()
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        # Stored as UTC text; julianday() keeps the microseconds
+        return self.as_sql(compiler, connection,
+                           template="((julianday(%(expressions)s) - 2440587.5) * 86400.0)",
+                           **extra_context)
+
+
+class Reliability(NamedTuple):
+    failures: int
+    mtbf_hours: Optional[float]
+    failures_per_1000h: float
+    mean_repair_minutes: Optional[float]
+    repeat_alarm_ratio: Optional[float]
+
+    @property
+    def repeat_alarm_percent(self) -> Optional[float]:
+        return None if self.repeat_alarm_ratio is None else self.repeat_alarm_ratio * 100
+
+
+NO_FAILURES = Reliability(0, None, 0.0, None, None)
+
+
+def describe(metrics: Reliability) -> str:
+    """One line, e.g. for the admin."""
+    parts = [f"{metrics.failures} failure{'s' if metrics.failures != 1 else ''}",
+             f"{metrics.failures_per_1000h:.2f} per 1,000 h"]
+    if metrics.mtbf_hours is not None:
+        parts.append(f"MTBF {metrics.mtbf_hours:.1f} h")
+    if metrics.mean_repair_minutes is not None:
+        parts.append(f"mean repair {metrics.mean_repair_minutes:.0f} min")
+    if metrics.repeat_alarm_percent is not None:
+        parts.append(f"{metrics.repeat_alarm_percent:.0f}% repeat alarms")
+    return ", ".join(parts)
+
+
+class _Sums(NamedTuple):
+    failures: int
+    first: float  # epoch seconds of the first failure
+    gap_seconds: float  # between consecutive failures
+    repairs: int  # failures with steps
+    repair_minutes: float
+    coded: int  # failures with an alarm code
+    codes: int  # distinct alarm codes
+
+
+def _sums_numpy(keys: Sequence, seconds: Sequence[float], steps: Sequence[int],
+                minutes: Sequence[int], alarms: Sequence[str],
+                sort: bool) -> Dict[Any, _Sums]:
+    keys, seconds = np.asarray(keys), np.asarray(seconds, dtype=np.float64)
+    steps, minutes = np.asarray(steps), np.asarray(minutes, dtype=np.float64)
+    alarms = np.asarray(alarms)
+    if sort:
+        order = np.lexsort((seconds, keys))
+        keys, seconds = keys[order], seconds[order]
+        steps, minutes, alarms = steps[order], minutes[order], alarms[order]
+
+    starts = np.empty(len(keys), dtype=bool)
+    starts[0] = True
+    starts[1:] = keys[1:] != keys[:-1]
+    group = np.cumsum(starts) - 1
+    size = int(group[-1]) + 1
+    follows = ~starts[1:]  # row i + 1 is a later failure of row i's group
+    gaps = np.bincount(group[1:][follows], weights=np.diff(seconds)[follows],
+                       minlength=size)
+    repaired = steps > 0
+    repairs = np.bincount(group, weights=repaired, minlength=size)
+    repair_minutes = np.bincount(group, weights=np.where(repaired, minutes, 0),
+                                 minlength=size)
+    coded = alarms != ""
+    _, code = np.unique(alarms, return_inverse=True)
+    width = int(code.max()) + 1
+    pairs = np.unique(group[coded] * width + code[coded])
+    codes = np.bincount(pairs // width, minlength=size)
+    first = seconds[starts]
+    return {
+        key: _Sums(*row) for key, *row in zip(
+            keys[starts].tolist(), np.bincount(group).tolist(), first.tolist(),
+            gaps.tolist(), repairs.astype(int).tolist(), repair_minutes.tolist(),
+            np.bincount(group, weights=coded, minlength=size).astype(int).tolist(),
+            codes.tolist())
+    }
+
+
+def _sums_python(keys: Sequence, seconds: Sequence[float], steps: Sequence[int],
+                 minutes: Sequence[int], alarms: Sequence[str],
+                 sort: bool) -> Dict[Any, _Sums]:
+    rows = range(len(keys))
+    if sort:
+        rows = sorted(rows, key=lambda i: (keys[i], seconds[i]))
+    sums = {}
+    for key, group in groupby(rows, key=keys.__getitem__):
+        group = list(group)
+        fixed = [i for i in group if steps[i] > 0]
+        coded = [alarms[i] for i in group if alarms[i]]
+        sums[key] = _Sums(
+            failures=len(group), first=seconds[group[0]],
+            gap_seconds=seconds[group[-1]] - seconds[group[0]],
+            repairs=len(fixed),
+            repair_minutes=float(sum(minutes[i] for i in fixed)),
+            coded=len(coded), codes=len(set(coded)))
+    return sums
+
+
+_sums = _sums_numpy if np is not None else _sums_python
+
+
+def _reliability(sums: _Sums, since: float, now: float) -> Reliability:
+    n = sums.failures
+    hours = max(now - min(since, sums.first), 3600) / 3600
+    return Reliability(
+        failures=n,
+        mtbf_hours=sums.gap_seconds / 3600 / (n - 1) if n > 1 else None,
+        failures_per_1000h=n * 1000 / hours,
+        mean_repair_minutes=(sums.repair_minutes / sums.repairs
+                             if sums.repairs else None),
+        repeat_alarm_ratio=(sums.coded - sums.codes) / n,
+    )
+
+
+def compute(site, now: Optional[datetime] = None) -> Dict[str, Any]:
+    """Metrics of every equipment and zone of ``site`` with a log in the window."""
+    now = now or timezone.now()
+    since = now - timedelta(days=getattr(settings, "RELIABILITY_WINDOW_DAYS", 180))
+    rows = list(MaintenanceLog.objects
+                .filter(site=site, created_at__gte=since)
+                .order_by("equipment_id", "created_at")
+                .values_list("equipment_id", "zone", Epoch("created_at"),
+                             "step_count", "total_duration_minutes", "alarm_code"))
+    result = {"since": since, "computed_at": now, "equipment": {}, "zones": {}}
+    if not rows:
+        return result
+    equipment_ids, zones, seconds, steps, minutes, alarms = (list(c) for c in zip(*rows))
+    alarms = [code.strip().upper() for code in alarms]
+
+    added, zone_added = {}, {}
+    for pk, zone, created_at in (Equipment.objects.filter(site=site)
+                                 .values_list("pk", "zone", "created_at")):
+        added[pk] = max(since, created_at).timestamp()
+        zone_added[zone] = min(zone_added.get(zone, added[pk]), added[pk])
+
+    # Logs without equipment share key 0 (NULLs sort together on every
+    # backend), so the equipment pass needs no re-sort
+    keys = [pk or 0 for pk in equipment_ids]
+    end = now.timestamp()
+    result["equipment"] = {
+        pk: _reliability(sums, added.get(pk, since.timestamp()), end)
+        for pk, sums in _sums(keys, seconds, steps, minutes, alarms, False).items()
+        if pk
+    }
+    result["zones"] = {
+        zone: _reliability(sums, zone_added.get(zone, since.timestamp()), end)
+        for zone, sums in _sums(zones, seconds, steps, minutes, alarms, True).items()
+    }
+    return result
+
+
+def _stamp(site_id: int) -> str:
+    return f"maintenance:reliability:{site_id}"
+
+
+def invalidate_reliability(site_id: int) -> None:
+    bump_version(_stamp(site_id))
+
+
+def metrics_for(site) -> Dict[str, Any]:
+    """The site's metrics, cached; the site must be the current one."""
+    # A result computed before a bump is stored under the old version
+    key = versioned_key(_stamp(site.pk))
+    metrics = cache.get(key)
+    if metrics is None:
+        # From the primary: a replica may not have the write behind the bump
+        # yet, and what it returns would stay cached under the new version
+        with pin_to_primary():
+            metrics = compute(site)
+        cache.set(key, metrics, getattr(settings, "RELIABILITY_CACHE_TTL", 900))
+    return metrics
+
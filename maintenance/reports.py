@@ -0,0 +1,279 @@
+"""Per-zone shift and weekly reports, built offline and served from storage.
+
+- shift_bounds / week_bounds: the shift (REPORT_SHIFT_STARTS, local times)
+  or the Monday-to-Monday week holding a moment. A week holds the shifts
+  that start in it.
+- refresh_aggregates: brings the site's ShiftAggregate rows up to date.
+  Only dirty shifts are recomputed: those in the last REPORT_LOOKBACK_HOURS
+  (step edits and deletions leave no trace on the log), plus the shifts of
+  logs saved and steps added since the previous refresh. ``full=True``
+  rebuilds everything.
+- build_report: adds a period's aggregates up per zone: incidents, top
+  alarms (named from the AlarmCode catalog), repair minutes, plus the hard
+  issues still open (hard logs with no step recorded yet).
+- write_report: renders a report to HTML and CSV under
+  MEDIA_ROOT/reports/<site>/<kind>/<period>.{html,csv}, atomically, so
+  serve_report can hand out the latest file without touching the logs.
+
+``manage.py build_reports`` runs all of this; schedule it (cron, a
+platform scheduler) every shift change or more often.
+"""
+
+import csv
+import io
+import os
+import re
+import uuid
+from bisect import bisect_right
+from collections import Counter
+from datetime import datetime, time as dt_time, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import router, transaction
+from django.db.models import Max
+from django.http import FileResponse, Http404, HttpResponse
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from .models import AlarmCode, MaintenanceLog, ShiftAggregate, Step
+
+KINDS = ("shift", "week")
+FORMATS = {"html": "text/html; charset=utf-8", "csv": "text/csv; charset=utf-8"}
+PERIOD = re.compile(r"^[0-9]{4}-[0-9A-Z-]+$")
+
+Bounds = Tuple[datetime, datetime]
+
+
+# -- periods ---------------------------------------------------------------
+def shift_starts() -> List[dt_time]:
+    starts = getattr(settings, "REPORT_SHIFT_STARTS", ["06:00", "14:00", "22:00"])
+    return sorted(dt_time.fromisoformat(value) for value in starts)
+
+
+def shift_bounds(moment: datetime) -> Bounds:
+    local = timezone.localtime(moment)
+    tz = local.tzinfo
+    starts = [datetime.combine(local.date() + timedelta(days=offset), start, tz)
+              for offset in (-1, 0, 1) for start in shift_starts()]
+    index = bisect_right(starts, local)
+    return starts[index - 1], starts[index]
+
+
+def week_bounds(moment: datetime) -> Bounds:
+    local = timezone.localtime(moment)
+    monday = local.date() - timedelta(days=local.weekday())
+    start = datetime.combine(monday, dt_time(), local.tzinfo)
+    return start, datetime.combine(monday + timedelta(days=7), dt_time(), local.tzinfo)
+
+
+def bounds(kind: str, moment: datetime) -> Bounds:
+    return shift_bounds(moment) if kind == "shift" else week_bounds(moment)
+
+
+def period_name(kind: str, start: datetime) -> str:
+    if kind == "shift":
+        return f"{start:%Y-%m-%dT%H%M}"
+    year, week, _ = start.isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+def shifts_between(start: datetime, end: datetime) -> List[Bounds]:
+    """Every shift overlapping [start, end)."""
+    shifts = []
+    moment = start
+    while moment < end:
+        shift = shift_bounds(moment)
+        shifts.append(shift)
+        moment = shift[1]
+    return shifts
+
+
+# -- aggregates ------------------------------------------------------------
+def _dirty_shifts(site, full: bool, now: datetime) -> List[datetime]:
+    aggregates = ShiftAggregate.objects.filter(site=site)
+    logs = MaintenanceLog.objects.filter(site=site)
+    watermark = aggregates.aggregate(last=Max("refreshed_at"))["last"]
+    if full or watermark is None:
+        first = logs.order_by("created_at").values_list("created_at", flat=True).first()
+        starts = {start for start, _ in shifts_between(first, now)} if first else set()
+        # Shifts aggregated before whose logs are all gone
+        return sorted(starts | set(aggregates.values_list("shift_start", flat=True)))
+
+    lookback = timedelta(hours=getattr(settings, "REPORT_LOOKBACK_HOURS", 48))
+    starts = {start for start, _ in shifts_between(watermark - lookback, now)}
+    changed = set(logs.filter(updated_at__gte=watermark)
+                  .values_list("created_at", flat=True))
+    changed.update(Step.objects.filter(log__site=site, created_at__gte=watermark)
+                   .values_list("log__created_at", flat=True))
+    starts.update(shift_bounds(moment)[0] for moment in changed)
+    return sorted(starts)
+
+
+def _runs(starts: List[datetime]) -> Iterable[List[Bounds]]:
+    """Group shift starts into runs of back-to-back shifts."""
+    run: List[Bounds] = []
+    for start in starts:
+        shift = shift_bounds(start)
+        if run and run[-1][1] != shift[0]:
+            yield run
+            run = []
+        run.append(shift)
+    if run:
+        yield run
+
+
+def _aggregate_run(site, run: List[Bounds], now: datetime) -> List[ShiftAggregate]:
+    boundaries = [start for start, _ in run]
+    totals: Dict[Tuple[datetime, str], ShiftAggregate] = {}
+    rows = (MaintenanceLog.objects
+            .filter(site=site, created_at__gte=run[0][0], created_at__lt=run[-1][1])
+            .values_list("zone", "alarm_code", "difficulty",
+                         "total_duration_minutes", "created_at")
+            .order_by()
+            .iterator(chunk_size=2000))
+    for zone, alarm_code, difficulty, minutes, created_at in rows:
+        start = boundaries[bisect_right(boundaries, created_at) - 1]
+        row = totals.get((start, zone))
+        if row is None:
+            row = totals[start, zone] = ShiftAggregate(
+                site=site, zone=zone, shift_start=start, alarm_counts={},
+                refreshed_at=now)
+        row.incidents += 1
+        row.hard_incidents += difficulty == MaintenanceLog.Difficulty.HARD
+        row.repair_minutes += minutes
+        row.alarm_counts[alarm_code] = row.alarm_counts.get(alarm_code, 0) + 1
+    return list(totals.values())
+
+
+def refresh_aggregates(site, full: bool = False) -> int:
+    """Recompute the site's dirty shifts; returns how many were recomputed."""
+    now = timezone.now()
+    starts = _dirty_shifts(site, full, now)
+    with transaction.atomic(using=router.db_for_write(ShiftAggregate)):
+        for run in _runs(starts):
+            ShiftAggregate.objects.filter(
+                site=site, shift_start__in=[start for start, _ in run]).delete()
+            ShiftAggregate.objects.bulk_create(
+                _aggregate_run(site, run, now), batch_size=500)
+    return len(starts)
+
+
+# -- reports ---------------------------------------------------------------
+def _zone(zones: Dict[str, Dict[str, Any]], zone: str) -> Dict[str, Any]:
+    return zones.setdefault(zone, {
+        "zone": zone, "incidents": 0, "hard_incidents": 0,
+        "repair_minutes": 0, "alarms": Counter(), "open_hard": []})
+
+
+def build_report(site, kind: str, start: datetime, end: datetime) -> Dict[str, Any]:
+    top = getattr(settings, "REPORT_TOP_ALARMS", 5)
+    zones: Dict[str, Dict[str, Any]] = {}
+    for zone, incidents, hard, minutes, alarms in (
+            ShiftAggregate.objects
+            .filter(site=site, shift_start__gte=start, shift_start__lt=end)
+            .values_list("zone", "incidents", "hard_incidents",
+                         "repair_minutes", "alarm_counts")):
+        totals = _zone(zones, zone)
+        totals["incidents"] += incidents
+        totals["hard_incidents"] += hard
+        totals["repair_minutes"] += minutes
+        totals["alarms"].update(alarms)
+
+    open_hard = (MaintenanceLog.objects
+                 .filter(site=site, difficulty=MaintenanceLog.Difficulty.HARD,
+                         step_count=0, created_at__lt=end)
+                 .order_by("zone", "-created_at")
+                 .values("pk", "zone", "alarm_code", "alarm_name", "created_at"))
+    for log in open_hard[:500]:
+        _zone(zones, log["zone"])["open_hard"].append(log)
+
+    codes = {code for totals in zones.values()
+             for code, _ in totals["alarms"].most_common(top)}
+    names = dict(AlarmCode.objects.filter(site=site, code__in=codes)
+                 .values_list("code", "name"))
+    for totals in zones.values():
+        totals["top_alarms"] = [
+            {"code": code, "name": names.get(code, ""), "count": count}
+            for code, count in totals["alarms"].most_common(top)]
+        del totals["alarms"]
+    return {
+        "site": site, "kind": kind, "period": period_name(kind, start),
+        "start": start, "end": end, "complete": end <= timezone.now(),
+        "generated_at": timezone.now(),
+        "zones": [zones[zone] for zone in sorted(zones)],
+    }
+
+
+def render_csv(report: Dict[str, Any]) -> str:
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(["zone", "incidents", "hard_incidents", "repair_minutes",
+                     "open_hard_issues", "top_alarms"])
+    for zone in report["zones"]:
+        writer.writerow([
+            zone["zone"], zone["incidents"], zone["hard_incidents"],
+            zone["repair_minutes"], len(zone["open_hard"]),
+            "; ".join(f"{a['code']} ({a['count']})" for a in zone["top_alarms"]),
+        ])
+    return out.getvalue()
+
+
+# -- storage ---------------------------------------------------------------
+def report_dir(site, kind: str) -> Path:
+    return Path(settings.MEDIA_ROOT) / "reports" / site.code / kind
+
+
+def _write(path: Path, content: str) -> None:
+    tmp = path.with_name(f".{path.name}.{uuid.uuid4().hex}")
+    tmp.write_text(content, encoding="utf-8")
+    os.replace(tmp, path)  # readers never see a half-written report
+
+
+def write_report(site, kind: str, start: datetime, end: datetime) -> Dict[str, Any]:
+    report = build_report(site, kind, start, end)
+    directory = report_dir(site, kind)
+    directory.mkdir(parents=True, exist_ok=True)
+    _write(directory / f"{report['period']}.html",
+           render_to_string("maintenance/report.html", {"report": report}))
+    _write(directory / f"{report['period']}.csv", render_csv(report))
+    return report
+
+
+def list_reports(site, kind: str) -> List[str]:
+    """Periods with a stored report, newest first."""
+    directory = report_dir(site, kind)
+    if not directory.is_dir():
+        return []
+    return sorted((path.stem for path in directory.glob("*.html")), reverse=True)
+
+
+def report_path(site, kind: str, period: str, fmt: str) -> Optional[Path]:
+    if kind not in KINDS or fmt not in FORMATS:
+        return None
+    if period == "latest":
+        periods = list_reports(site, kind)
+        period = periods[0] if periods else ""
+    if not PERIOD.match(period):
+        return None
+    path = report_dir(site, kind) / f"{period}.{fmt}"
+    return path if path.is_file() else None
+
+
+def serve_report(request, path: Path, fmt: str) -> HttpResponse:
+    """The stored file; revalidated by ETag since reports are rewritten."""
+    stat = path.stat()
+    etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+    if request.headers.get("If-None-Match") == etag:
+        response = HttpResponse(status=304)
+    else:
+        try:
+            response = FileResponse(open(path, "rb"), content_type=FORMATS[fmt])
+        except FileNotFoundError:
+            raise Http404("Report not found.")
+        if fmt == "csv":
+            response["Content-Disposition"] = f'attachment; filename="{path.name}"'
+    response["ETag"] = etag
+    response["Cache-Control"] = "private, no-cache"
+    return response
@@ -0,0 +1,164 @@
+"""Compact edit history for maintenance logs.
+
+A log's state is its editable fields plus its steps keyed by step id.
+record_revision() compares the current database state with the latest
+recorded one and, if anything changed, stores a LogRevision holding either
+- a patch: only the changed fields, and per step only the changed fields
+  (a full entry for added steps, ``null`` for removed ones), or
+- a full snapshot, for the first revision and then every
+  REVISION_SNAPSHOT_EVERY revisions,
+as zlib-compressed JSON. reconstruct() rebuilds any version from the nearest
+snapshot at or before it plus at most REVISION_SNAPSHOT_EVERY - 1 patches.
+
+Edits made outside the views (admin, shell) are picked up as their own
+revision, without a user, the next time a view records one.
+"""
+
+import json
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import router, transaction
+from django.db.models import Max
+
+from .models import LogRevision, MaintenanceLog, Step
+
+LOG_FIELDS = ["equipment_id", "zone", "alarm_code", "alarm_name",
+              "lam_checked", "difficulty", "description"]
+STEP_FIELDS = ["order", "action", "result", "duration_minutes", "performed_by_id"]
+
+State = Dict[str, Dict[str, Any]]
+
+
+def encode(payload: Dict[str, Any]) -> bytes:
+    return zlib.compress(
+        json.dumps(payload, separators=(",", ":"), sort_keys=True).encode(), 6)
+
+
+def decode(data) -> Dict[str, Any]:
+    return json.loads(zlib.decompress(bytes(data)))
+
+
+def current_state(log_id: int) -> State:
+    fields = MaintenanceLog.objects.filter(pk=log_id).values(*LOG_FIELDS).get()
+    steps = {str(step.pop("id")): step
+             for step in Step.objects.filter(log_id=log_id)
+             .values("id", *STEP_FIELDS)}
+    return {"fields": fields, "steps": steps}
+
+
+def diff_states(old: State, new: State) -> Optional[Dict[str, Any]]:
+    """Patch turning ``old`` into ``new``, or None when they are equal."""
+    fields = {name: value for name, value in new["fields"].items()
+              if old["fields"].get(name) != value}
+    steps: Dict[str, Any] = {}
+    for key, step in new["steps"].items():
+        before = old["steps"].get(key)
+        if before is None:
+            steps[key] = step
+        else:
+            changes = {name: value for name, value in step.items()
+                       if before.get(name) != value}
+            if changes:
+                steps[key] = changes
+    for key in old["steps"].keys() - new["steps"].keys():
+        steps[key] = None
+    if not fields and not steps:
+        return None
+    return {"fields": fields, "steps": steps}
+
+
+def apply_patch(state: State, patch: Dict[str, Any]) -> State:
+    fields = {**state["fields"], **patch.get("fields", {})}
+    steps = dict(state["steps"])
+    for key, changes in patch.get("steps", {}).items():
+        if changes is None:
+            steps.pop(key, None)
+        else:
+            steps[key] = {**steps.get(key, {}), **changes}
+    return {"fields": fields, "steps": steps}
+
+
+def reconstruct(log_id: int, number: int) -> Optional[State]:
+    """State of the log as of revision ``number`` (None if there is none)."""
+    base = (LogRevision.objects
+            .filter(log_id=log_id, number__lte=number, is_snapshot=True)
+            .aggregate(base=Max("number"))["base"])
+    if base is None:
+        return None
+    state = None
+    for is_snapshot, data in (LogRevision.objects
+                              .filter(log_id=log_id, number__range=(base, number))
+                              .order_by("number")
+                              .values_list("is_snapshot", "data")):
+        payload = decode(data)
+        state = payload if is_snapshot else apply_patch(state, payload)
+    return state
+
+
+def _summary(previous: Optional[State], patch: Dict[str, Any]) -> str:
+    if previous is None:
+        return "created"
+    steps = patch.get("steps", {})
+    parts = [", ".join(sorted(patch.get("fields", {})))]
+    if steps:
+        added = sum(1 for key in steps if key not in previous["steps"])
+        removed = sum(1 for value in steps.values() if value is None)
+        parts.append(f"steps +{added} -{removed} ~{len(steps) - added - removed}")
+    return "; ".join(p for p in parts if p)[:255]
+
+
+def record_revision(log_id: int, user=None) -> Optional[LogRevision]:
+    """Store the log's current state if it differs from the latest revision."""
+    every = max(1, getattr(settings, "REVISION_SNAPSHOT_EVERY", 10))
+    with transaction.atomic(using=router.db_for_write(LogRevision)):
+        # Serializes concurrent editors of one log (no-op on SQLite, which
+        # serializes writers anyway)
+        MaintenanceLog.objects.select_for_update().filter(pk=log_id).exists()
+        latest = (LogRevision.objects.filter(log_id=log_id)
+                  .aggregate(latest=Max("number"))["latest"]) or 0
+        state = current_state(log_id)
+        previous = reconstruct(log_id, latest) if latest else None
+        patch = diff_states(previous, state) if previous else state
+        if patch is None:
+            return None
+
+        number = latest + 1
+        is_snapshot = (number - 1) % every == 0
+        return LogRevision.objects.create(
+            log_id=log_id, number=number, is_snapshot=is_snapshot,
+            data=encode(state if is_snapshot else patch),
+            changed=_summary(previous, patch), user=user,
+        )
+
+
+def _label(name: str) -> str:
+    return name.removesuffix("_id").replace("_", " ")
+
+
+def compare(log_id: int, number: int) -> Dict[str, List[Tuple]]:
+    """Rows for the diff view: what revision ``number`` changed."""
+    empty: State = {"fields": {}, "steps": {}}
+    old = (reconstruct(log_id, number - 1) if number > 1 else None) or empty
+    row = (LogRevision.objects.filter(log_id=log_id, number=number)
+           .values_list("is_snapshot", "data").first())
+    if row is None:
+        return {"fields": [], "steps": []}
+    payload = decode(row[1])
+    new = payload if row[0] else apply_patch(old, payload)
+    fields = [(_label(name), old["fields"].get(name), value)
+              for name, value in new["fields"].items()
+              if old["fields"].get(name) != value]
+    steps = []
+    for key in sorted(old["steps"].keys() | new["steps"].keys(), key=int):
+        before, after = old["steps"].get(key), new["steps"].get(key)
+        if before == after:
+            continue
+        label = (after or before).get("order")
+        kind = "added" if before is None else "removed" if after is None else "changed"
+        changes = [(_label(name), (before or {}).get(name), (after or {}).get(name))
+                   for name in STEP_FIELDS
+                   if (before or {}).get(name) != (after or {}).get(name)]
+        steps.append((label, kind, changes))
+    return {"fields": fields, "steps": steps}
@@ -0,0 +1,121 @@
+"""Database routing for MaintenaTrack.
+
+- ReplicaRouter: reads go to the ``replica`` alias when one is configured
+  (``DATABASE_REPLICA_URL``), writes always go to ``default``.
+- pin_to_primary: force reads in a block of code onto the primary, e.g. right
+  after a write or in commands that verify data they just wrote.
+
+- SiteRouter: equipment, logs and everything hanging off them live in the
+  database of the site being worked on (Site.database); sites without one
+  share ``default`` and fall through to ReplicaRouter.
+- use_site_database: set that database for a block of code; SiteMiddleware
+  does it per request, maintenance.sites.use_site wraps it for commands.
+
+ReplicaRoutingMiddleware (maintenance.middleware) pins every unsafe request,
+and every request for a short window after one, so users read their writes.
+Site databases have no replica: reads and writes both go to the site's alias.
+``manage.py check_replica_routing`` checks the routing against a replica (two
+SQLite files locally).
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from django.conf import settings
+
+PRIMARY = "default"
+REPLICA = "replica"
+
+# Models stored per site; users, sites and everything else stay in default
+PARTITIONED_MODELS = {"equipment", "maintenancelog", "alarmcode", "step",
+                      "logrevision", "attachment", "idempotencykey",
+                      "shiftaggregate", "stepterm", "change",
+                      "webhookendpoint", "outboxevent"}
+
+_use_primary: ContextVar[bool] = ContextVar("use_primary", default=False)
+_site_database: ContextVar[Optional[str]] = ContextVar(
+    "site_database", default=None)
+
+
+@contextmanager
+def pin_to_primary(pinned: bool = True):
+    """Route reads inside the block to the primary (``pinned=False`` undoes it)."""
+    token = _use_primary.set(pinned)
+    try:
+        yield
+    finally:
+        _use_primary.reset(token)
+
+
+def reads_pinned() -> bool:
+    return _use_primary.get()
+
+
+@contextmanager
+def use_site_database(alias: Optional[str]):
+    """Route partitioned models inside the block to ``alias`` (None: default)."""
+    token = _site_database.set(alias or None)
+    try:
+        yield
+    finally:
+        _site_database.reset(token)
+
+
+def site_database() -> Optional[str]:
+    return _site_database.get()
+
+
+def is_partitioned(model) -> bool:
+    return (model._meta.app_label == "maintenance"
+            and model._meta.model_name in PARTITIONED_MODELS)
+
+
+class SiteRouter:
+    """Must come before ReplicaRouter in DATABASE_ROUTERS."""
+
+    def _route(self, model, **hints):
+        if not is_partitioned(model):
+            return None
+        instance = hints.get("instance")
+        if instance is not None:
+            if instance._meta.label_lower == "maintenance.site":
+                # site.logs.all() and friends: that site's database
+                return instance.database or None
+            if is_partitioned(instance) and instance._state.db:
+                # Related rows live next to the object they hang off
+                db = instance._state.db
+                return None if db in (PRIMARY, REPLICA) else db
+        return _site_database.get()
+
+    db_for_read = _route
+    db_for_write = _route
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Site databases hold the full schema, so users and sites can be
+        # copied in and foreign keys stay enforceable (maintenance.sites)
+        return None
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if _use_primary.get() or REPLICA not in settings.DATABASES:
+            return PRIMARY
+        instance = hints.get("instance")
+        if instance is not None and instance._state.db == PRIMARY:
+            # Related lookups from an object just written stay consistent
+            return PRIMARY
+        return REPLICA
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data, so cross-alias relations are fine
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return None
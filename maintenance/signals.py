@@ -0,0 +1,261 @@
+"""Signal handlers for MaintenaTrack.
+
+Denormalized counters are kept in step with every write through the ORM:
+- Equipment.log_count / last_log_at follow MaintenanceLog saves and deletes.
+- AlarmCode.occurrence_count follows the logs linked to each code.
+- MaintenanceLog.step_count / total_duration_minutes follow Step saves and deletes.
+
+Each change is a single atomic ``UPDATE ... SET col = col + n`` so concurrent
+writers never lose increments. Bulk ``QuerySet.update()`` calls bypass signals;
+``manage.py verify_counters --repair`` fixes any drift.
+
+Counter updates run on the database the triggering row was written to, so
+they follow it into its site's database (maintenance.routers.SiteRouter).
+
+User saves and deletes also drop the cached authenticated user
+(maintenance.auth) and, once committed, refresh the user's copies in the site
+databases, as Site saves do for the site's own copy (maintenance.sites).
+Deleting the last Attachment referencing some content removes the stored file.
+Step saves rewrite the step's search terms (maintenance.stepsearch).
+AlarmCode saves and deletes refresh the alarm type-ahead (maintenance.alarms).
+
+Committed log saves are published to the live feed (maintenance.livefeed)
+when this process has subscribers, and committed log saves and deletes drop
+the site's cached reliability metrics (maintenance.reliability) and
+heatmaps (maintenance.heatmap).
+
+Log, Step and Equipment saves and deletes are recorded in the change feed
+(maintenance.changefeed), as are the logs and steps a deleted equipment or
+user is cleared from, and so are the webhook events (maintenance.outbox)
+of a Hard log being created or equipment going DOWN. post_save runs after the
+INSERT or UPDATE, so they only commit with the change when the writer wraps
+it in transaction.atomic (the views, the admin and offline sync do).
+"""
+
+from django.db.models import F, Max, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .alarms import invalidate_alarms
+from .attachments import delete_unreferenced
+from .auth import invalidate_user
+from .changefeed import record_change, record_cleared
+from .heatmap import invalidate_heatmap
+from .livefeed import broadcaster, summarize
+from .models import (
+    AlarmCode, Attachment, Equipment, MaintenanceLog, Site, Step, WebhookEndpoint,
+)
+from .outbox import enqueue
+from .reliability import invalidate_reliability
+from .sites import invalidate_sites, sync_site, sync_user
+from .stepsearch import index_step
+
+
+def _bump_log(using, log_id, steps: int, minutes: int) -> None:
+    if not log_id or (not steps and not minutes):
+        return
+    MaintenanceLog.objects.using(using).filter(pk=log_id).update(
+        step_count=Greatest(F("step_count") + steps, Value(0)),
+        total_duration_minutes=Greatest(
+            F("total_duration_minutes") + minutes, Value(0)),
+    )
+
+
+def _equipment_logged(using, equipment_id, created_at) -> None:
+    Equipment.objects.using(using).filter(pk=equipment_id).update(
+        log_count=F("log_count") + 1,
+        last_log_at=Greatest(Coalesce(F("last_log_at"), Value(created_at)),
+                             Value(created_at)),
+    )
+
+
+def _equipment_unlogged(using, equipment_id) -> None:
+    # The newest remaining log may be older, so last_log_at is re-derived
+    latest = (
+        MaintenanceLog.objects
+        .filter(equipment=OuterRef("pk"))
+        .values("equipment")
+        .annotate(latest=Max("created_at"))
+        .values("latest")
+    )
+    Equipment.objects.using(using).filter(pk=equipment_id).update(
+        log_count=Greatest(F("log_count") - 1, Value(0)),
+        last_log_at=Subquery(latest),
+    )
+
+
+def _alarm_counted(using, alarm_id, delta: int) -> None:
+    if alarm_id:
+        AlarmCode.objects.using(using).filter(pk=alarm_id).update(
+            occurrence_count=Greatest(F("occurrence_count") + delta, Value(0)))
+
+
+@receiver(post_save, sender=MaintenanceLog)
+def log_saved(sender, instance, created, raw=False, using=None, **kwargs):
+    if raw:  # loaddata: counters come from the fixture
+        return
+    previous = None if created else getattr(
+        instance, "_loaded_equipment_id", instance.equipment_id)
+    if previous != instance.equipment_id:
+        if previous:
+            _equipment_unlogged(using, previous)
+        if instance.equipment_id:
+            _equipment_logged(using, instance.equipment_id, instance.created_at)
+    instance._loaded_equipment_id = instance.equipment_id
+
+    previous = None if created else getattr(
+        instance, "_loaded_alarm_id", instance.alarm_id)
+    if previous != instance.alarm_id:
+        _alarm_counted(using, previous, -1)
+        _alarm_counted(using, instance.alarm_id, 1)
+    instance._loaded_alarm_id = instance.alarm_id
+
+
+@receiver(post_save, sender=MaintenanceLog)
+def log_published(sender, instance, created, raw=False, using=None, **kwargs):
+    if raw or not len(broadcaster):
+        return
+    event = summarize(instance, created)
+    transaction.on_commit(lambda: broadcaster.publish(event), using=using)
+
+
+@receiver(post_save, sender=MaintenanceLog)
+@receiver(post_delete, sender=MaintenanceLog)
+def log_statistics_changed(sender, instance, using=None, **kwargs):
+    site_id = instance.site_id
+    transaction.on_commit(
+        lambda: (invalidate_reliability(site_id), invalidate_heatmap(site_id)),
+        using=using)
+
+
+@receiver(post_delete, sender=MaintenanceLog)
+def log_deleted(sender, instance, using=None, **kwargs):
+    equipment_id = getattr(instance, "_loaded_equipment_id",
+                           instance.equipment_id)
+    if equipment_id:
+        _equipment_unlogged(using, equipment_id)
+    _alarm_counted(using, getattr(instance, "_loaded_alarm_id", instance.alarm_id), -1)
+
+
+@receiver(post_save, sender=Step)
+def step_saved(sender, instance, created, raw=False, using=None, **kwargs):
+    if raw:
+        return
+    minutes = instance.duration_minutes or 0
+    if created:
+        _bump_log(using, instance.log_id, 1, minutes)
+    else:
+        old_log_id, old_minutes = getattr(
+            instance, "_loaded_counters", (instance.log_id, minutes))
+        old_minutes = old_minutes or 0
+        if old_log_id != instance.log_id:
+            _bump_log(using, old_log_id, -1, -old_minutes)
+            _bump_log(using, instance.log_id, 1, minutes)
+        else:
+            _bump_log(using, instance.log_id, 0, minutes - old_minutes)
+    instance._loaded_counters = (instance.log_id, instance.duration_minutes)
+
+
+@receiver(post_save, sender=Step)
+def step_indexed(sender, instance, created, raw=False, using=None,
+                 update_fields=None, **kwargs):
+    if raw or (update_fields is not None
+               and not {"action", "result"} & set(update_fields)):
+        return  # loaddata: run rebuild_step_index afterwards
+    index_step(instance, using, created)
+
+
+@receiver(post_delete, sender=Step)
+def step_deleted(sender, instance, using=None, **kwargs):
+    log_id, minutes = getattr(instance, "_loaded_counters",
+                              (instance.log_id, instance.duration_minutes))
+    _bump_log(using, log_id, -1, -(minutes or 0))
+
+
+@receiver(post_save, sender=MaintenanceLog)
+@receiver(post_save, sender=Step)
+@receiver(post_save, sender=Equipment)
+def change_recorded(sender, instance, raw=False, using=None, **kwargs):
+    if raw:  # loaddata: a full dump carries its Change rows
+        return
+    record_change(instance, using)
+
+
+@receiver(post_delete, sender=MaintenanceLog)
+@receiver(post_delete, sender=Step)
+@receiver(post_delete, sender=Equipment)
+def deletion_recorded(sender, instance, using=None, **kwargs):
+    record_change(instance, using, deleted=True)
+
+
+# The deletion clears these foreign keys with update() (on_delete=SET_NULL),
+# which sends no post_save: record the rows while they still point at it
+@receiver(pre_delete, sender=Equipment)
+def equipment_unlinked(sender, instance, using=None, **kwargs):
+    record_cleared(MaintenanceLog.objects.filter(equipment=instance), using)
+
+
+@receiver(pre_delete, sender=settings.AUTH_USER_MODEL)
+def user_unlinked(sender, instance, using=None, **kwargs):
+    record_cleared(MaintenanceLog.objects.filter(created_by=instance), using)
+    record_cleared(Step.objects.filter(performed_by=instance), using)
+
+
+@receiver(post_save, sender=MaintenanceLog)
+def hard_log_announced(sender, instance, created, raw=False, using=None, **kwargs):
+    if raw or not created or instance.difficulty != MaintenanceLog.Difficulty.HARD:
+        return
+    enqueue(WebhookEndpoint.Event.HARD_LOG, instance, using)
+
+
+@receiver(post_save, sender=Equipment)
+def equipment_down_announced(sender, instance, created, raw=False, using=None,
+                             **kwargs):
+    if raw or instance.status != Equipment.Status.DOWN:
+        return
+    previous = None if created else getattr(instance, "_loaded_status", instance.status)
+    if previous != Equipment.Status.DOWN:
+        enqueue(WebhookEndpoint.Event.EQUIPMENT_DOWN, instance, using)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def user_changed(sender, instance, using=None, **kwargs):
+    if using != DEFAULT_DB_ALIAS:
+        return  # a copy in a site database, written by sync_user
+    user_id = instance.pk
+    invalidate_user(user_id)
+    # Again after commit, in case a concurrent request re-cached the old row
+    transaction.on_commit(lambda: (invalidate_user(user_id), sync_user(user_id)))
+
+
+@receiver(post_save, sender=Site)
+@receiver(post_delete, sender=Site)
+def site_changed(sender, instance, using=None, **kwargs):
+    if using != DEFAULT_DB_ALIAS:
+        return
+    invalidate_sites()
+    if kwargs.get("signal") is post_save:
+        transaction.on_commit(lambda: sync_site(instance))
+
+
+@receiver(m2m_changed, sender=Site.members.through)
+def site_members_changed(sender, using=None, **kwargs):
+    if using == DEFAULT_DB_ALIAS:
+        invalidate_sites()
+
+
+@receiver(post_save, sender=AlarmCode)
+@receiver(post_delete, sender=AlarmCode)
+def alarm_code_changed(sender, instance, using=None, **kwargs):
+    site_id = instance.site_id
+    transaction.on_commit(lambda: invalidate_alarms(site_id), using=using)
+
+
+@receiver(post_delete, sender=Attachment)
+def attachment_deleted(sender, instance, using=None, **kwargs):
+    sha256 = instance.sha256
+    transaction.on_commit(lambda: delete_unreferenced(sha256), using=using)
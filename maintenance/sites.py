@@ -0,0 +1,190 @@
+"""Sites: per-plant partitioning of equipment and logs.
+
+- use_site / current_site: the site code is working for. SiteMiddleware sets
+  it per request (``request.site``); commands wrap their work in use_site().
+  While it is set, maintenance.routers.SiteRouter sends the partitioned
+  models to the site's database.
+- all_sites / sites_for / resolve_site: the sites and their members,
+  cached in the default cache for SITE_CACHE_TTL seconds under a version
+  stamp shared by every worker (maintenance.cache), so a site or membership
+  change reaches all of them at once; which ones a user may work at (staff:
+  all; others: the sites they are members of, or the default site when they
+  belong to none, as for anonymous visitors); and which one a request is for
+  (the one picked with the site switcher, else DEFAULT_SITE_CODE). Inside
+  request_scope (opened by SiteMiddleware) the stamp is read once.
+- sync_user / sync_site / sync_directory: a site database keeps copies of
+  the User and Site rows its logs point at, so foreign keys resolve inside
+  it. Copies have unusable passwords; signals refresh them on every save and
+  ``manage.py sync_site_directory`` rebuilds them.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import List, Optional, Set
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS
+
+from .cache import bump_version, versioned_key
+from .models import Site
+from .routers import use_site_database
+
+SESSION_KEY = "maintenance_site_id"
+CACHE_KEY = "maintenance:sites"
+USER_COPY_FIELDS = ["username", "first_name", "last_name", "email",
+                    "is_active", "is_staff", "is_superuser", "date_joined"]
+
+_current: ContextVar[Optional[Site]] = ContextVar("current_site", default=None)
+_scope: ContextVar[Optional[dict]] = ContextVar("site_list_scope", default=None)
+
+
+# -- current site ----------------------------------------------------------
+@contextmanager
+def use_site(site: Optional[Site]):
+    """Work for ``site`` inside the block (None: no site, default database)."""
+    token = _current.set(site)
+    try:
+        with use_site_database(site.database if site is not None else None):
+            yield site
+    finally:
+        _current.reset(token)
+
+
+def current_site() -> Optional[Site]:
+    return _current.get()
+
+
+# -- directory -------------------------------------------------------------
+def _cache():
+    return caches[getattr(settings, "SITE_CACHE", "default")]
+
+
+@contextmanager
+def request_scope():
+    """Inside the block all_sites() checks the shared version stamp only once."""
+    token = _scope.set({})
+    try:
+        yield
+    finally:
+        _scope.reset(token)
+
+
+def all_sites() -> List[Site]:
+    """Every site, each with ``member_ids``."""
+    scope = _scope.get()
+    if scope is not None and "sites" in scope:
+        return scope["sites"]
+    # Membership is authorization data: invalidate_sites() must reach every
+    # worker at once, not after a per-process cache expires
+    key = versioned_key(CACHE_KEY)
+    sites = _cache().get(key)
+    if sites is None:
+        sites = list(Site.objects.using(DEFAULT_DB_ALIAS).order_by("name"))
+        members = {}
+        for site_id, user_id in (Site.members.through.objects
+                                 .using(DEFAULT_DB_ALIAS)
+                                 .values_list("site_id", "user_id")):
+            members.setdefault(site_id, set()).add(user_id)
+        for site in sites:
+            site.member_ids = frozenset(members.get(site.pk, ()))
+        _cache().set(key, sites, getattr(settings, "SITE_CACHE_TTL", 300))
+    if scope is not None:
+        scope["sites"] = sites
+    return sites
+
+
+def invalidate_sites() -> None:
+    bump_version(CACHE_KEY)
+    scope = _scope.get()
+    if scope is not None:
+        scope.clear()
+
+
+def default_site() -> Optional[Site]:
+    code = getattr(settings, "DEFAULT_SITE_CODE", "main")
+    sites = all_sites()
+    return next((site for site in sites if site.code == code),
+                sites[0] if sites else None)
+
+
+def sites_for(user) -> List[Site]:
+    sites = all_sites()
+    if user.is_staff:
+        return sites
+    # Anonymous visitors (pk None) are members of nothing: they only get the
+    # read-only pages of the default site
+    member_of = [site for site in sites if user.pk in site.member_ids]
+    if member_of:
+        return member_of
+    site = default_site()
+    return [site] if site is not None else []
+
+
+def resolve_site(request) -> Optional[Site]:
+    allowed = sites_for(request.user)
+    if not allowed:
+        return None
+    wanted = request.session.get(SESSION_KEY)
+    for site in allowed:
+        if site.pk == wanted:
+            return site
+    default = default_site()
+    return default if default in allowed else allowed[0]
+
+
+def select_site(request, code: str) -> Optional[Site]:
+    """Switch the session to the site ``code``, if the user may work there."""
+    site = next((s for s in sites_for(request.user) if s.code == code), None)
+    if site is not None:
+        request.session[SESSION_KEY] = site.pk
+    return site
+
+
+# -- copies in site databases ----------------------------------------------
+def site_databases() -> Set[str]:
+    """Aliases holding some site's data, besides default."""
+    return {site.database for site in all_sites()
+            if site.database and site.database != DEFAULT_DB_ALIAS
+            and site.database in settings.DATABASES}
+
+
+def sync_user(user_id: int, aliases: Optional[Set[str]] = None) -> None:
+    """Copy a user into the site databases, or drop the copies if it is gone."""
+    User = get_user_model()
+    user = (User.objects.using(DEFAULT_DB_ALIAS)
+            .filter(pk=user_id).values(*USER_COPY_FIELDS).first())
+    for alias in site_databases() if aliases is None else aliases:
+        if user is None:
+            # Deleting through the ORM applies SET_NULL/CASCADE to the site's rows
+            User.objects.using(alias).filter(pk=user_id).delete()
+            continue
+        # A stale copy under another id would block the username
+        User.objects.using(alias).filter(
+            username=user["username"]).exclude(pk=user_id).delete()
+        User.objects.using(alias).update_or_create(
+            pk=user_id, defaults={**user, "password": "!"})
+
+
+def sync_site(site: Site) -> None:
+    """Copy a site's row into its own database."""
+    if (not site.database or site.database == DEFAULT_DB_ALIAS
+            or site.database not in settings.DATABASES):
+        return
+    Site.objects.using(site.database).update_or_create(
+        pk=site.pk, defaults={"code": site.code, "name": site.name,
+                              "database": site.database})
+
+
+def sync_directory(alias: str) -> int:
+    """Copy every site using ``alias`` and every user into it; returns users copied."""
+    for site in Site.objects.using(DEFAULT_DB_ALIAS).filter(database=alias):
+        sync_site(site)
+    User = get_user_model()
+    user_ids = list(User.objects.using(DEFAULT_DB_ALIAS)
+                    .values_list("pk", flat=True))
+    for user_id in user_ids:
+        sync_user(user_id, {alias})
+    User.objects.using(alias).exclude(pk__in=user_ids).delete()
+    return len(user_ids)
@@ -0,0 +1,82 @@
+/* Dashboard: zone × time incident heatmap.
+ *
+ * Fetches the matrix from the URL in #heatmap's data-url with the filter
+ * form's values and draws it as a CSS grid, one cell per zone and column,
+ * shaded by its share of the busiest cell. The filters are kept in the page
+ * URL so a view can be bookmarked or shared.
+ */
+(function () {
+  const grid = document.getElementById("heatmap");
+  const form = document.getElementById("heatmap-filters");
+  const summary = document.getElementById("heatmap-summary");
+  if (!grid || !form) return;
+
+  const cell = (text, className) => {
+    const div = document.createElement("div");
+    div.className = className;
+    div.textContent = text;
+    return div;
+  };
+
+  function draw(data) {
+    const fragment = document.createDocumentFragment();
+    fragment.appendChild(cell("", "heatmap-corner"));
+    data.columns.forEach((label, n) => {
+      // Day-and-hour columns are labelled on the day's first hour only
+      const shown = data.axis !== "week" || n % 24 === 0 ? label.split(" ")[0] : "";
+      fragment.appendChild(cell(shown, "heatmap-column"));
+    });
+    data.zones.forEach((zone, row) => {
+      const link = document.createElement("a");
+      link.className = "heatmap-zone";
+      link.href = `${grid.dataset.zoneUrl}?zone=${encodeURIComponent(zone)}`;
+      link.textContent = `Zone ${zone}`;
+      fragment.appendChild(link);
+      data.counts[row].forEach((count, column) => {
+        const div = cell(data.axis === "week" || !count ? "" : count, "heatmap-cell");
+        div.style.backgroundColor = count
+          ? `rgba(228, 0, 43, ${(0.12 + 0.88 * (count / data.max)).toFixed(3)})`
+          : "";
+        if (count / data.max > 0.6) div.style.color = "#fff";
+        div.title = `Zone ${zone} · ${data.columns[column]}: ${count} log${count === 1 ? "" : "s"}`;
+        fragment.appendChild(div);
+      });
+    });
+    grid.style.gridTemplateColumns =
+      `auto repeat(${data.columns.length}, minmax(${data.axis === "week" ? 4 : 24}px, 1fr))`;
+    grid.replaceChildren(fragment);
+    summary.textContent = data.zones.length
+      ? `${data.total} log${data.total === 1 ? "" : "s"} in the last ${data.days} days` +
+        (data.difficulty ? ` · ${data.difficulty}` : "") +
+        (data.alarm_code ? ` · alarm ${data.alarm_code}` : "")
+      : "No logs match these filters.";
+  }
+
+  async function load() {
+    const params = new URLSearchParams(new FormData(form));
+    summary.textContent = "Loading…";
+    try {
+      const response = await fetch(`${grid.dataset.url}?${params}`, {
+        headers: { Accept: "application/json" },
+      });
+      const data = await response.json();
+      if (!response.ok) throw new Error(data.error || response.statusText);
+      draw(data);
+      history.replaceState(null, "", `?${params}`);
+    } catch (error) {
+      summary.textContent = `Could not load the heatmap: ${error.message}`;
+    }
+  }
+
+  // Start from the filters in the page URL, if any
+  new URLSearchParams(location.search).forEach((value, name) => {
+    if (form.elements[name]) form.elements[name].value = value;
+  });
+  form.addEventListener("submit", (event) => {
+    event.preventDefault();
+    load();
+  });
+  form.querySelectorAll("select").forEach((select) =>
+    select.addEventListener("change", load));
+  load();
+})();
@@ -0,0 +1,31 @@
+/* Log list: "new logs" banner fed by the live feed (server-sent events).
+ *
+ * Subscribes to the URL in the banner's data-feed-url attribute (with the
+ * page's zone/difficulty filters) instead of polling or reloading. When the
+ * server runs without ASGI the feed answers 204 and EventSource gives up
+ * quietly; the page works as before.
+ */
+(function () {
+  const banner = document.getElementById("live-feed-banner");
+  if (!banner || !window.EventSource) return;
+
+  const counts = { created: new Set(), updated: new Set() };
+  const source = new EventSource(banner.dataset.feedUrl);
+
+  source.addEventListener("log", (message) => {
+    const log = JSON.parse(message.data);
+    if (log.event === "created") {
+      counts.created.add(log.id);
+    } else if (!counts.created.has(log.id)) {
+      counts.updated.add(log.id);
+    }
+    const parts = [];
+    if (counts.created.size) parts.push(`${counts.created.size} new`);
+    if (counts.updated.size) parts.push(`${counts.updated.size} updated`);
+    banner.querySelector("span").textContent =
+      `${parts.join(", ")} log${counts.created.size + counts.updated.size === 1 ? "" : "s"}`;
+    banner.style.display = "block";
+  });
+
+  window.addEventListener("pagehide", () => source.close());
+})();
@@ -0,0 +1,150 @@
+/* New/edit log form: quick-add equipment panel (extracted from log_form.html)
+ * and the alarm code/name type-ahead.
+ *
+ * Endpoint URLs are read from the form's data-add-equipment-url and
+ * data-alarm-suggest-url attributes.
+ */
+function logForm() {
+  return document.getElementById("log-form");
+}
+
+function toggleEquipmentForm() {
+  const form = document.getElementById("quick-equipment-form");
+  form.style.display = form.style.display === "none" ? "block" : "none";
+}
+
+async function saveQuickEquipment() {
+  const name = document.getElementById("new-equipment-name").value.trim();
+  const zone = document.getElementById("new-equipment-zone").value;
+
+  if (!name) {
+    alert("Please enter equipment name");
+    return;
+  }
+
+  try {
+    const formData = new FormData();
+    formData.append("name", name);
+    formData.append("zone", zone);
+
+    const csrfToken = document.querySelector(
+      "[name=csrfmiddlewaretoken]"
+    ).value;
+
+    const response = await fetch(logForm().dataset.addEquipmentUrl, {
+      method: "POST",
+      headers: {
+        "X-CSRFToken": csrfToken,
+      },
+      body: formData,
+    });
+
+    if (response.ok) {
+      const equipment = await response.json();
+
+      // Add new option to select
+      const select = logForm().querySelector("select[name=equipment]");
+      const option = new Option(equipment.name, equipment.id);
+      select.add(option);
+      select.value = equipment.id;
+
+      // Clear form and hide it
+      document.getElementById("new-equipment-name").value = "";
+      document.getElementById("new-equipment-zone").value = "1";
+      toggleEquipmentForm();
+
+      alert("Equipment added successfully!");
+    } else {
+      const error = await response.json();
+      alert("Error: " + (error.error || "Failed to add equipment"));
+    }
+  } catch (error) {
+    if (!navigator.onLine && window.MaintenaTrackOffline) {
+      // Offline: create the equipment together with the queued log
+      const select = logForm().querySelector("select[name=equipment]");
+      select.add(new Option(name + " (pending sync)", "", true, true));
+      window.MaintenaTrackOffline.queueEquipment(logForm(), name, zone);
+      toggleEquipmentForm();
+      return;
+    }
+    console.error("Error:", error);
+    alert("Error adding equipment. Please try again.");
+  }
+}
+
+/* Alarm type-ahead: suggestions from the site's alarm catalog become
+ * <datalist> options of the alarm code and name inputs. Picking a code fills
+ * in its name and usual difficulty when those are still empty. */
+(function () {
+  const form = logForm();
+  if (!form || !form.dataset.alarmSuggestUrl) return;
+  const code = form.querySelector("input[name=alarm_code]");
+  const name = form.querySelector("input[name=alarm_name]");
+  const difficulty = form.querySelector("select[name=difficulty]");
+  const known = new Map(); // code -> suggestion
+  let timer = null;
+  let pending = null;
+
+  function fill(list, options) {
+    list.replaceChildren(
+      ...options.map(([value, label]) => {
+        const option = document.createElement("option");
+        option.value = value;
+        option.label = label;
+        return option;
+      })
+    );
+  }
+
+  async function lookup(input) {
+    const q = input.value.trim();
+    if (!q) return;
+    if (pending) pending.abort();
+    pending = new AbortController();
+    try {
+      const response = await fetch(
+        form.dataset.alarmSuggestUrl + "?q=" + encodeURIComponent(q),
+        { signal: pending.signal }
+      );
+      if (!response.ok) return;
+      const { suggestions } = await response.json();
+      suggestions.forEach((s) => known.set(s.code, s));
+      fill(code.list, suggestions.map((s) => [s.code, s.name]));
+      fill(
+        name.list,
+        suggestions.filter((s) => s.name).map((s) => [s.name, s.code])
+      );
+    } catch (error) {
+      // Offline or superseded by a newer keystroke: no suggestions
+    }
+  }
+
+  function schedule(event) {
+    clearTimeout(timer);
+    timer = setTimeout(() => lookup(event.target), 150);
+  }
+
+  function apply(suggestion) {
+    if (!name.value.trim()) name.value = suggestion.name;
+    if (difficulty && !difficulty.value && suggestion.difficulty) {
+      difficulty.value = suggestion.difficulty;
+    }
+  }
+
+  code.addEventListener("input", schedule);
+  name.addEventListener("input", schedule);
+  code.addEventListener("change", () => {
+    const suggestion = known.get(code.value.trim().toUpperCase());
+    if (suggestion) apply(suggestion);
+  });
+  name.addEventListener("change", () => {
+    if (code.value.trim()) return;
+    for (const suggestion of known.values()) {
+      if (suggestion.name === name.value) {
+        code.value = suggestion.code;
+        apply(suggestion);
+        break;
+      }
+    }
+  });
+})();
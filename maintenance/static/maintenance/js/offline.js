@@ -0,0 +1,175 @@
+/* MaintenaTrack offline support.
+ *
+ * - Registers the service worker.
+ * - While offline, new-log submissions (and quick-added equipment) are queued
+ *   in IndexedDB instead of being lost.
+ * - When the browser is back online, queued logs are replayed in batches
+ *   through the sync endpoint. Every item carries an idempotency key, so a
+ *   retry after a dropped response never creates a duplicate log. A repeat
+ *   of a recent incident comes back "merged" into the existing log.
+ */
+(function () {
+  "use strict";
+
+  const script = document.currentScript;
+  const SYNC_URL = script.dataset.syncUrl;
+  const SW_URL = script.dataset.swUrl;
+  const DB_NAME = "maintenatrack";
+  const STORE = "pending-logs";
+  const LOG_FIELDS = [
+    "equipment",
+    "zone",
+    "alarm_code",
+    "alarm_name",
+    "difficulty",
+    "description",
+  ];
+  const STEP_FIELD = /^steps-(\d+)-(order|action|result|duration_minutes)$/;
+
+  let syncing = false;
+
+  function openDb() {
+    return new Promise((resolve, reject) => {
+      const req = indexedDB.open(DB_NAME, 1);
+      req.onupgradeneeded = () => {
+        req.result.createObjectStore(STORE, { keyPath: "idempotency_key" });
+      };
+      req.onsuccess = () => resolve(req.result);
+      req.onerror = () => reject(req.error);
+    });
+  }
+
+  async function withStore(mode, fn) {
+    const db = await openDb();
+    return new Promise((resolve, reject) => {
+      const tx = db.transaction(STORE, mode);
+      const result = fn(tx.objectStore(STORE));
+      tx.oncomplete = () => resolve(result.result ?? result);
+      tx.onerror = () => reject(tx.error);
+    });
+  }
+
+  const queue = {
+    add: (item) => withStore("readwrite", (s) => s.put(item)),
+    all: () => withStore("readonly", (s) => s.getAll()),
+    remove: (key) => withStore("readwrite", (s) => s.delete(key)),
+  };
+
+  function newKey() {
+    if (window.crypto && crypto.randomUUID) return crypto.randomUUID();
+    return Date.now().toString(36) + Math.random().toString(36).slice(2);
+  }
+
+  function serializeLogForm(form) {
+    const data = new FormData(form);
+    const item = { idempotency_key: newKey(), queued_at: Date.now() };
+    LOG_FIELDS.forEach((name) => (item[name] = data.get(name) || ""));
+    item.lam_checked = data.has("lam_checked");
+
+    const steps = {};
+    for (const [name, value] of data.entries()) {
+      const match = STEP_FIELD.exec(name);
+      if (!match) continue;
+      steps[match[1]] = steps[match[1]] || {};
+      steps[match[1]][match[2]] = value;
+    }
+    item.steps = Object.keys(steps)
+      .sort((a, b) => a - b)
+      .map((i) => steps[i])
+      .filter((step) => (step.action || "").trim());
+
+    if (form.dataset.newEquipment) {
+      item.new_equipment = JSON.parse(form.dataset.newEquipment);
+      item.equipment = "";
+    }
+    return item;
+  }
+
+  async function updateBadge() {
+    const badge = document.getElementById("offline-queue-badge");
+    if (!badge) return;
+    const pending = await queue.all();
+    badge.textContent = pending.length
+      ? `${pending.length} log${pending.length === 1 ? "" : "s"} waiting to sync`
+      : "";
+    badge.style.display = pending.length ? "inline-block" : "none";
+  }
+
+  async function sync() {
+    if (syncing || !navigator.onLine) return;
+    syncing = true;
+    try {
+      const pending = (await queue.all()).filter((item) => !item.errors);
+      if (!pending.length) return;
+
+      const hello = await fetch(SYNC_URL, { credentials: "same-origin" });
+      if (!hello.ok) return; // logged out or offline again; retry later
+      const { csrfToken, maxBatchSize } = await hello.json();
+
+      for (let i = 0; i < pending.length; i += maxBatchSize) {
+        const batch = pending.slice(i, i + maxBatchSize);
+        const response = await fetch(SYNC_URL, {
+          method: "POST",
+          credentials: "same-origin",
+          headers: {
+            "Content-Type": "application/json",
+            "X-CSRFToken": csrfToken,
+          },
+          body: JSON.stringify({ logs: batch }),
+        });
+        if (!response.ok) return;
+
+        const { results } = await response.json();
+        for (const result of results) {
+          if (["created", "merged", "duplicate"].includes(result.status)) {
+            await queue.remove(result.key);
+          } else if (result.status === "invalid") {
+            const item = batch.find((b) => b.idempotency_key === result.key);
+            if (item) await queue.add({ ...item, errors: result.errors });
+          }
+        }
+      }
+    } catch (err) {
+      console.warn("Offline sync deferred:", err);
+    } finally {
+      syncing = false;
+      updateBadge();
+    }
+  }
+
+  function bindLogForm() {
+    const form = document.querySelector("form[data-offline-queue]");
+    if (!form) return;
+    form.addEventListener("submit", async (event) => {
+      if (navigator.onLine) return;
+      event.preventDefault();
+      await queue.add(serializeLogForm(form));
+      form.reset();
+      delete form.dataset.newEquipment;
+      await updateBadge();
+      alert("You are offline. The log was saved on this device and will sync automatically.");
+    });
+  }
+
+  window.MaintenaTrackOffline = {
+    sync,
+    // Remember equipment quick-added while offline; it is created with the log
+    queueEquipment(form, name, zone) {
+      form.dataset.newEquipment = JSON.stringify({ name, zone });
+    },
+  };
+
+  if ("serviceWorker" in navigator && SW_URL) {
+    navigator.serviceWorker.register(SW_URL, { scope: "/" }).catch((err) => {
+      console.warn("Service worker registration failed:", err);
+    });
+  }
+  if ("indexedDB" in window) {
+    window.addEventListener("online", sync);
+    document.addEventListener("DOMContentLoaded", () => {
+      bindLogForm();
+      updateBadge();
+      sync();
+    });
+  }
+})();
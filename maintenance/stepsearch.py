@@ -0,0 +1,240 @@
+"""Step search: single steps ranked by how well their action and result match.
+
+- terms: the words of a step (lower-cased ``\\w+`` runs, cut to TERM_LENGTH
+  characters) with their weight: 2 × occurrences in the action + occurrences
+  in the result.
+- index_step / index_steps: (re)write the StepTerm rows of one step or of
+  every step of a site. maintenance.signals indexes a step whenever it is
+  saved; deleting it deletes its rows. ``manage.py rebuild_step_index``
+  reindexes after bulk writes that skip signals.
+- search: reads the StepTerm postings of the query's words only (from the
+  covering (site, term, step, weight) index; the last word, from 3
+  characters, also matches as a prefix, expanded to its MAX_PREFIX_TERMS
+  most frequent completions), at most MAX_POSTINGS per term, the heaviest
+  first, so a common word costs the same as a rare one. It scores steps
+  BM25-style (idf from each term's full document frequency × saturated
+  weight, no length normalization) times the share of the query's words
+  they contain, and loads steps with their log and equipment for the
+  requested page only.
+- highlight: an escaped excerpt of a text around its first match, with the
+  matching words in <mark>.
+"""
+
+import math
+import re
+from collections import Counter
+from typing import Any, Dict, List, NamedTuple, Optional, Set
+
+from django.core.cache import cache
+from django.db import router
+from django.db.models import Case, Count, F, Q, Sum, Value, When, Window
+from django.db.models.functions import RowNumber
+from django.utils.html import escape
+from django.utils.safestring import SafeString, mark_safe
+
+from .models import MaintenanceLog, Step, StepTerm
+
+TERM_LENGTH = 64
+PREFIX_LENGTH = 3
+MAX_PREFIX_TERMS = 20
+MAX_POSTINGS = 2000
+PAGE_SIZE = 20
+EXCERPT_LENGTH = 200
+K1 = 1.2
+TOTAL_TTL = 600  # the step count behind idf only needs to be roughly right
+_WORD = re.compile(r"\w+")
+
+
+def words(text: str) -> List[str]:
+    return [word[:TERM_LENGTH] for word in _WORD.findall((text or "").lower())]
+
+
+def terms(action: str, result: str) -> Dict[str, int]:
+    weights = Counter()
+    for word in words(action):
+        weights[word] += 2
+    for word in words(result):
+        weights[word] += 1
+    return {term: min(weight, 32767) for term, weight in weights.items()}
+
+
+def _rows(step_id: int, site_id: int, action: str, result: str) -> List[StepTerm]:
+    return [StepTerm(site_id=site_id, step_id=step_id, term=term, weight=weight)
+            for term, weight in terms(action, result).items()]
+
+
+def index_step(step: Step, using: Optional[str] = None, created: bool = False) -> None:
+    using = using or router.db_for_write(StepTerm, instance=step)
+    if Step.log.is_cached(step):
+        site_id = step.log.site_id
+    else:
+        site_id = (MaintenanceLog.objects.using(using)
+                   .values_list("site_id", flat=True).get(pk=step.log_id))
+    if not created:
+        StepTerm.objects.using(using).filter(step=step).delete()
+    StepTerm.objects.using(using).bulk_create(
+        _rows(step.pk, site_id, step.action, step.result))
+
+
+def index_steps(site, using: Optional[str] = None) -> int:
+    """Rebuild the site's index; returns the number of steps indexed."""
+    using = using or router.db_for_write(StepTerm)
+    StepTerm.objects.using(using).filter(site=site).delete()
+    count, batch = 0, []
+    for step_id, action, result in (Step.objects.using(using)
+                                    .filter(log__site=site)
+                                    .values_list("pk", "action", "result")
+                                    .iterator(chunk_size=500)):
+        batch.extend(_rows(step_id, site.pk, action, result))
+        count += 1
+        if len(batch) >= 2000:
+            StepTerm.objects.using(using).bulk_create(batch)
+            batch = []
+    StepTerm.objects.using(using).bulk_create(batch)
+    return count
+
+
+def _total_steps(site) -> int:
+    key = f"maintenance:stepsearch:total:{site.pk}"
+    total = cache.get(key)
+    if total is None:
+        total = (MaintenanceLog.objects.filter(site=site)
+                 .aggregate(total=Sum("step_count"))["total"] or 0)
+        cache.set(key, total, TOTAL_TTL)
+    return total
+
+
+def highlight(text: str, matched: Set[str], prefix: str = "",
+              length: int = EXCERPT_LENGTH) -> SafeString:
+    def hit(word: str) -> bool:
+        word = word.lower()[:TERM_LENGTH]
+        return word in matched or bool(prefix and word.startswith(prefix))
+
+    text = text or ""
+    first = next((m.start() for m in _WORD.finditer(text) if hit(m.group())), 0)
+    start = 0
+    if len(text) > length and first > length // 3:
+        # Open a third of the excerpt before the first match, on a space
+        start = first - length // 3
+        space = text.find(" ", start, first)
+        start = space + 1 if space != -1 else start
+    end = min(len(text), start + length)
+    if end < len(text):
+        space = text.rfind(" ", start, end)
+        end = space if space > start else end
+    excerpt, out, position = text[start:end], [], 0
+    for match in _WORD.finditer(excerpt):
+        if hit(match.group()):
+            out.append(escape(excerpt[position:match.start()]))
+            out.append(f"<mark>{escape(match.group())}</mark>")
+            position = match.end()
+    out.append(escape(excerpt[position:]))
+    return mark_safe(("…" if start else "") + "".join(out)
+                     + ("…" if end < len(text) else ""))
+
+
+class StepHit(NamedTuple):
+    step_id: int
+    order: int
+    action: SafeString  # highlighted excerpt
+    result: SafeString
+    duration_minutes: Optional[int]
+    score: float
+    log_id: int
+    zone: str
+    alarm_code: str
+    alarm_name: str
+    created_at: Any
+    equipment: Optional[str]  # name
+
+
+class StepResults(NamedTuple):
+    query: str
+    hits: List[StepHit]
+    total: int
+    page: int
+    has_next: bool
+
+    def as_json(self) -> Dict[str, Any]:
+        return {
+            "query": self.query, "total": self.total, "page": self.page,
+            "has_next": self.has_next,
+            "results": [{
+                **hit._asdict(), "score": round(hit.score, 4),
+                "action": str(hit.action), "result": str(hit.result),
+                "created_at": hit.created_at.isoformat(),
+            } for hit in self.hits],
+        }
+
+
+def _postings(site, exact: List[str], prefix: str):
+    """The postings to rank, and the document frequency of their terms."""
+    matching = Q(term__in=exact)
+    if prefix:
+        matching |= Q(term__gte=prefix, term__lt=prefix + "\U0010ffff")
+    # The exact words first, then the prefix's most frequent completions
+    frequencies = dict(StepTerm.objects.filter(matching, site=site)
+                       .values("term").annotate(df=Count("*"))
+                       .order_by(Case(When(term__in=exact, then=Value(0)),
+                                      default=Value(1)), "-df", "term")
+                       .values_list("term", "df")[:len(exact) + MAX_PREFIX_TERMS])
+    if not frequencies:
+        return [], frequencies
+    rows = list(StepTerm.objects.filter(site=site, term__in=list(frequencies))
+                .annotate(rank=Window(RowNumber(), partition_by=F("term"),
+                                      order_by=[F("weight").desc(), F("step")]))
+                .filter(rank__lte=MAX_POSTINGS)
+                .values_list("step_id", "term", "weight"))
+    return rows, frequencies
+
+
+def search(site, query: str, page: int = 1, per_page: int = PAGE_SIZE) -> StepResults:
+    """Page ``page`` of the site's steps matching ``query``, best first."""
+    query_words = list(dict.fromkeys(words(query)))
+    if not query_words:
+        return StepResults(query, [], 0, 1, False)
+    prefix = query_words[-1] if len(query_words[-1]) >= PREFIX_LENGTH else ""
+    postings, documents = _postings(site, query_words, prefix)
+
+    total = max(_total_steps(site), max(documents.values(), default=0))
+    # Per step and query word, the best matching term's score
+    best: Dict[int, Dict[str, float]] = {}
+    found: Dict[int, Set[str]] = {}
+    for step_id, term, weight in postings:
+        df = documents[term]
+        idf = math.log(1 + (total - df + 0.5) / (df + 0.5))
+        value = idf * weight * (K1 + 1) / (weight + K1)
+        word = term if term in query_words else query_words[-1]
+        scores = best.setdefault(step_id, {})
+        scores[word] = max(scores.get(word, 0.0), value)
+        found.setdefault(step_id, set()).add(term)
+    ranked = sorted(
+        ((sum(scores.values()) * len(scores) / len(query_words), step_id)
+         for step_id, scores in best.items()),
+        reverse=True)
+
+    page = max(1, min(page, math.ceil(len(ranked) / per_page) or 1))
+    window = ranked[(page - 1) * per_page:page * per_page]
+    # Context for this page's steps only
+    rows = {row["pk"]: row for row in Step.objects.filter(
+        pk__in=[step_id for _, step_id in window]).order_by().values(
+        "pk", "order", "action", "result", "duration_minutes", "log_id",
+        "log__zone", "log__alarm_code", "log__alarm_name", "log__created_at",
+        "log__equipment__name")}
+    hits = []
+    for score, step_id in window:
+        row = rows.get(step_id)
+        if row is None:  # deleted since the postings were read
+            continue
+        matched = found[step_id]
+        hits.append(StepHit(
+            step_id=step_id, order=row["order"],
+            action=highlight(row["action"], matched, prefix),
+            result=highlight(row["result"], matched, prefix),
+            duration_minutes=row["duration_minutes"], score=score,
+            log_id=row["log_id"], zone=row["log__zone"],
+            alarm_code=row["log__alarm_code"], alarm_name=row["log__alarm_name"],
+            created_at=row["log__created_at"],
+            equipment=row["log__equipment__name"]))
+    return StepResults(query, hits, len(ranked), page,
+                       page * per_page < len(ranked))
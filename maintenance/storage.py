@@ -0,0 +1,68 @@
+"""Static file storage for MaintenaTrack.
+
+- MinifiedManifestStaticFilesStorage: WhiteNoise's hashed + pre-compressed
+  (gzip, and Brotli when the ``Brotli`` package is installed) storage that
+  also minifies the app's own CSS/JS during ``collectstatic``.
+"""
+
+import re
+
+from django.core.files.base import ContentFile
+from whitenoise.storage import CompressedManifestStaticFilesStorage
+
+# Only our own bundles are minified; vendored files (admin, etc.) ship as-is
+MINIFY_PREFIXES = ("maintenance/",)
+
+
+def minify_css(text: str) -> str:
+    """Drop comments and insignificant whitespace from a stylesheet."""
+    text = re.sub(r"/\*.*?\*/", "", text, flags=re.S)
+    text = re.sub(r"\s+", " ", text)
+    text = re.sub(r"\s*([{};,>])\s*", r"\1", text)
+    text = re.sub(r":\s+", ":", text)
+    return text.replace(";}", "}").strip()
+
+
+def minify_js(text: str) -> str:
+    """Conservative JS minification: whole-line comments and indentation only.
+
+    Anything that could sit inside a string (trailing ``//``, operators) is
+    left untouched, so this never changes behaviour. Multi-line template
+    literals are not supported and must not be used in app scripts.
+    """
+    text = re.sub(r"^[ \t]*/\*[^*]*\*+(?:[^/*][^*]*\*+)*/[ \t]*$", "", text,
+                  flags=re.M)
+    lines = []
+    for line in text.splitlines():
+        line = line.strip()
+        if line and not line.startswith("//"):
+            lines.append(line)
+    return "\n".join(lines) + "\n"
+
+
+class MinifiedManifestStaticFilesStorage(CompressedManifestStaticFilesStorage):
+    """Hashed names, gzip/Brotli variants and minified app CSS/JS."""
+
+    def _save(self, name, content):
+        minify = None
+        if name.startswith(MINIFY_PREFIXES) and ".min." not in name:
+            minify = {".css": minify_css, ".js": minify_js}.get(
+                name[name.rfind("."):])
+        if minify:
+            # Hashing may already have consumed the file; read from the start
+            content.seek(0)
+            text = content.read()
+            if isinstance(text, bytes):
+                text = text.decode("utf-8")
+            content = ContentFile(minify(text).encode("utf-8"))
+        return super()._save(name, content)
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            # collectstatic hasn't run (local dev with DEBUG off): serve the
+            # unhashed name rather than failing every page render
+            if self.manifest_strict:
+                raise
+            return name
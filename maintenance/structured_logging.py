@@ -0,0 +1,175 @@
+"""Non-blocking, structured logging for MaintenaTrack.
+
+- JsonFormatter: one JSON object per line; ``extra={...}`` fields become keys.
+- QueuedFileHandler: a QueueHandler whose background QueueListener thread
+  formats and writes to a size- or time-rotated file, so a slow disk never
+  stalls the request thread. When the queue is full records are dropped
+  (and counted) instead of blocking. Rotation renames files, which is only
+  safe with one writer, so each process writes its own file: it claims the
+  lowest free slot, held by a lock on logs/django.<slot>.lock, and writes
+  logs/django.<slot>.log. A slot frees when its process exits, so recycled
+  workers and management commands reuse the same few files (and their
+  rotation) instead of leaving one per pid behind. A forked child claims
+  its own.
+
+Both are referenced from the LOGGING dict in the settings modules.
+"""
+
+import atexit
+import itertools
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import weakref
+from datetime import datetime, timezone
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, one file per pid
+    fcntl = None
+
+# Attributes every LogRecord has; anything else was passed via ``extra``
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {
+    "message", "asctime", "taskName"}
+
+# Live QueuedFileHandlers, reopened in forked children (gunicorn --preload)
+_handlers: "weakref.WeakSet[QueuedFileHandler]" = weakref.WeakSet()
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc)
+            .isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class QueuedFileHandler(logging.handlers.QueueHandler):
+    """
+    Enqueue records on the calling thread; write them from a listener thread.
+    Rotation is by size (``maxBytes``/``backupCount``) or, when ``when`` is
+    given, by time (TimedRotatingFileHandler semantics). With ``per_process``
+    (the default) ``filename`` gets the slot the writing process holds.
+    """
+
+    def __init__(self, filename, maxBytes=10 * 1024 * 1024, backupCount=5,
+                 when=None, interval=1, queue_size=10000, encoding="utf-8",
+                 per_process=True):
+        super().__init__(queue.Queue(maxsize=queue_size))
+        self.filename = os.fspath(filename)
+        os.makedirs(os.path.dirname(self.filename), exist_ok=True)
+        self.rotation = {"maxBytes": maxBytes, "backupCount": backupCount,
+                         "when": when, "interval": interval,
+                         "encoding": encoding}
+        self.per_process = per_process
+        self.dropped = 0
+        self.slot_lock = None
+        self.target = None
+        self.listener = None
+        self._open()
+        _handlers.add(self)
+        atexit.register(self.close)
+
+    def _open(self) -> None:
+        """Start a listener writing to this process's file."""
+        filename = self.filename
+        if self.per_process:
+            base, ext = os.path.splitext(filename)
+            filename = f"{base}.{self._claim_slot(base)}{ext}"
+        rotation = self.rotation
+        if rotation["when"]:
+            target = logging.handlers.TimedRotatingFileHandler(
+                filename, when=rotation["when"], interval=rotation["interval"],
+                backupCount=rotation["backupCount"],
+                encoding=rotation["encoding"], delay=True)
+        else:
+            target = logging.handlers.RotatingFileHandler(
+                filename, maxBytes=rotation["maxBytes"],
+                backupCount=rotation["backupCount"],
+                encoding=rotation["encoding"], delay=True)
+        if self.target is not None:
+            target.setFormatter(self.target.formatter)
+            target.setLevel(self.target.level)
+        self.target = target
+        self.listener = logging.handlers.QueueListener(
+            self.queue, self.target, respect_handler_level=True)
+        self.listener.start()
+
+    def _claim_slot(self, base: str):
+        """Lock the lowest slot no live process holds; the lock lasts as long as we do."""
+        if fcntl is None:
+            return os.getpid()
+        for slot in itertools.count():
+            lock = open(f"{base}.{slot}.lock", "a")
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                lock.close()
+                continue
+            self.slot_lock = lock
+            return slot
+
+    def _reopen_after_fork(self) -> None:
+        # The parent's listener thread does not exist here, and its queue
+        # may have been mid-operation: start over on this process's file
+        if self.listener is None:
+            return
+        self.target.close()
+        if self.slot_lock is not None:
+            # Shared with the parent, which keeps holding the slot
+            self.slot_lock.close()
+            self.slot_lock = None
+        self.queue = queue.Queue(maxsize=self.queue.maxsize)
+        self._open()
+
+    def setFormatter(self, fmt):
+        # Formatting happens on the listener thread, not the request thread
+        self.target.setFormatter(fmt)
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Cheap snapshot: merge args now (they may be mutated later) and
+        # render tracebacks while the frames are still alive
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self):
+        if self.listener is not None:
+            self.listener.stop()  # drains what is already queued
+            self.listener = None
+            self.target.close()
+        if self.slot_lock is not None:
+            self.slot_lock.close()
+            self.slot_lock = None
+        super().close()
+
+
+def _after_fork() -> None:
+    for handler in list(_handlers):
+        handler._reopen_after_fork()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork)
@@ -0,0 +1,100 @@
+/* MaintenaTrack service worker.
+ *
+ * - App shell (home, log list, new-log form, offline script) is precached.
+ * - log_detail pages are network-first and the most recent ones are kept
+ *   for offline reading.
+ * - The equipment list is network-first with a cached fallback.
+ * - Non-GET requests are never intercepted; queued logs are replayed by
+ *   static/maintenance/js/offline.js through the batch sync endpoint.
+ */
+const SHELL_CACHE = "maintenatrack-shell-v1";
+const PAGE_CACHE = "maintenatrack-pages-v1";
+const MAX_CACHED_LOGS = 30;
+const SHELL_URLS = [{% for url in shell_urls %}"{{ url|escapejs }}", {% endfor %}];
+const EQUIPMENT_URL = "{{ equipment_url|escapejs }}";
+const LOG_DETAIL = /\/logs\/\d+\/$/;
+
+self.addEventListener("install", (event) => {
+  event.waitUntil(
+    caches
+      .open(SHELL_CACHE)
+      .then((cache) => cache.addAll(SHELL_URLS))
+      .then(() => self.skipWaiting())
+  );
+});
+
+self.addEventListener("activate", (event) => {
+  const keep = [SHELL_CACHE, PAGE_CACHE];
+  event.waitUntil(
+    caches
+      .keys()
+      .then((names) =>
+        Promise.all(
+          names.filter((n) => !keep.includes(n)).map((n) => caches.delete(n))
+        )
+      )
+      .then(() => self.clients.claim())
+  );
+});
+
+async function trimCache(name, max) {
+  const cache = await caches.open(name);
+  const keys = await cache.keys();
+  // Cache.keys() is insertion ordered, so the oldest entries go first
+  for (let i = 0; i < keys.length - max; i++) {
+    await cache.delete(keys[i]);
+  }
+}
+
+async function networkFirst(request, cacheName, limit) {
+  const cache = await caches.open(cacheName);
+  try {
+    const response = await fetch(request);
+    if (response.ok) {
+      await cache.delete(request);
+      await cache.put(request, response.clone());
+      if (limit) trimCache(cacheName, limit);
+    }
+    return response;
+  } catch (err) {
+    const cached =
+      (await cache.match(request)) || (await caches.match(request));
+    if (cached) return cached;
+    if (request.mode === "navigate") {
+      return (
+        (await caches.match(SHELL_URLS[1])) ||
+        new Response("Offline", { status: 503 })
+      );
+    }
+    throw err;
+  }
+}
+
+async function cacheFirst(request) {
+  const cached = await caches.match(request);
+  if (cached) return cached;
+  const response = await fetch(request);
+  if (response.ok) {
+    const cache = await caches.open(SHELL_CACHE);
+    cache.put(request, response.clone());
+  }
+  return response;
+}
+
+self.addEventListener("fetch", (event) => {
+  const request = event.request;
+  if (request.method !== "GET") return;
+
+  const url = new URL(request.url);
+  if (url.origin !== self.location.origin) return;
+
+  if (LOG_DETAIL.test(url.pathname)) {
+    event.respondWith(networkFirst(request, PAGE_CACHE, MAX_CACHED_LOGS));
+  } else if (url.pathname === EQUIPMENT_URL) {
+    event.respondWith(networkFirst(request, SHELL_CACHE));
+  } else if (SHELL_URLS.includes(url.pathname) && request.mode === "navigate") {
+    event.respondWith(networkFirst(request, SHELL_CACHE));
+  } else if (url.pathname.startsWith("{{ static_prefix|escapejs }}")) {
+    event.respondWith(cacheFirst(request));
+  }
+});
@@ -0,0 +1,54 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import TestCase
+
+from maintenance.changefeed import feed
+from maintenance.models import Change, Equipment, MaintenanceLog
+from maintenance.sites import default_site
+
+
+class ChangeFeedTests(TestCase):
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+        self.site = default_site()
+        self.equipment = Equipment.objects.create(site=self.site, name="Press", zone="1")
+        self.log = MaintenanceLog.objects.create(
+            site=self.site, zone="1", equipment=self.equipment, alarm_code="E1",
+            description="Jam")
+
+    def read_all(self, cursor=""):
+        page = feed(self.site, cursor)
+        return page["changes"], page["cursor"]
+
+    def test_late_commit_is_served_after_the_cursor(self):
+        _, cursor = self.read_all()
+        # An entry whose id was taken before the cursor's entries but which
+        # committed after the cursor was handed out
+        late = MaintenanceLog.objects.create(
+            site=self.site, zone="2", alarm_code="E2", description="Late")
+        entry = Change.objects.get(kind="log", object_id=late.pk)
+        Change.objects.filter(pk=entry.pk).update(id=Change.objects.order_by("pk")[0].pk - 1)
+
+        changes, _ = self.read_all(cursor)
+        self.assertEqual([(c["type"], c["id"]) for c in changes], [("log", late.pk)])
+
+    def test_deleted_equipment_reports_the_logs_it_is_cleared_from(self):
+        _, cursor = self.read_all()
+        equipment_id = self.equipment.pk
+        self.equipment.delete()
+
+        changes, _ = self.read_all(cursor)
+        by_id = {(c["type"], c["id"]): c for c in changes}
+        self.assertEqual(by_id[("equipment", equipment_id)]["op"], "delete")
+        self.assertIsNone(by_id[("log", self.log.pk)]["data"]["equipment_id"])
+
+    def test_deleted_user_reports_the_logs_they_are_cleared_from(self):
+        user = get_user_model().objects.create_user("tech")
+        MaintenanceLog.objects.filter(pk=self.log.pk).update(created_by=user)
+        _, cursor = self.read_all()
+        user.delete()
+
+        changes, _ = self.read_all(cursor)
+        self.assertEqual([(c["type"], c["id"], c["data"]["created_by_id"]) for c in changes],
+                         [("log", self.log.pk, None)])
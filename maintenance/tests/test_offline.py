@@ -0,0 +1,35 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import TestCase
+
+from maintenance.models import Equipment, MaintenanceLog
+from maintenance.offline import apply_batch
+from maintenance.sites import default_site
+
+
+class NewEquipmentTests(TestCase):
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+        self.site = default_site()
+        self.user = get_user_model().objects.create_user("tech", password="pw")
+
+    def item(self, key, new_equipment):
+        return {"idempotency_key": key, "zone": "2", "alarm_code": "E1",
+                "alarm_name": "Jam", "difficulty": "Easy", "description": "Jam",
+                "new_equipment": new_equipment,
+                "steps": [{"action": "Clear the jam", "result": "OK"}]}
+
+    def test_malformed_names_are_invalid_items(self):
+        results = apply_batch(self.user, [
+            self.item("list", {"name": ["x"]}),
+            self.item("long", {"name": "x" * 121}),
+            self.item("ok", {"name": " Fan "}),
+        ], self.site)
+
+        self.assertEqual([r["status"] for r in results], ["invalid", "invalid", "created"])
+        self.assertIn("new_equipment", results[0]["errors"])
+        self.assertIn("name", results[1]["errors"]["new_equipment"])
+        self.assertEqual(MaintenanceLog.objects.count(), 1)
+        equipment = Equipment.objects.get()
+        self.assertEqual((equipment.name, equipment.zone), ("Fan", "2"))
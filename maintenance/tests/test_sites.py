@@ -0,0 +1,38 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import TestCase
+
+from maintenance.models import MaintenanceLog, Site
+from maintenance.sites import SESSION_KEY, default_site
+
+
+class AnonymousSiteTests(TestCase):
+    def setUp(self):
+        # Version stamps roll back with each test; cached site lists must not
+        for cache in caches.all():
+            cache.clear()
+        self.main = default_site()
+        self.plant_b = Site.objects.create(code="plantb", name="Plant B")
+        self.member = get_user_model().objects.create_user("tech", password="pw")
+        self.main.members.add(self.member)
+        self.log = MaintenanceLog.objects.create(
+            site=self.plant_b, zone="1", alarm_code="E1", description="Jam")
+
+    def test_member_cannot_read_another_site(self):
+        self.client.force_login(self.member)
+        self.client.post("/site/", {"site": "plantb"})
+        self.assertEqual(self.client.get(f"/logs/{self.log.pk}/").status_code, 404)
+
+    def test_anonymous_cannot_switch_site(self):
+        response = self.client.post("/site/", {"site": "plantb"})
+        self.assertEqual(response.status_code, 302)
+        self.assertIn("/login/", response["Location"])
+        self.assertNotIn(SESSION_KEY, self.client.session)
+        self.assertEqual(self.client.get(f"/logs/{self.log.pk}/").status_code, 404)
+        self.assertNotContains(self.client.get("/logs/"), "E1")
+
+    def test_anonymous_session_pointing_at_another_site_gets_the_default(self):
+        session = self.client.session
+        session[SESSION_KEY] = self.plant_b.pk
+        session.save()
+        self.assertEqual(self.client.get(f"/logs/{self.log.pk}/").status_code, 404)
@@ -0,0 +1,28 @@
+"""Thumbnail rendering, run in worker processes.
+
+Kept free of Django imports so a spawned worker only has to import Pillow.
+maintenance.attachments submits ``make_thumbnail`` to its process pool.
+"""
+
+import os
+
+from PIL import Image, ImageOps
+
+THUMBNAIL_SIZE = (320, 320)
+
+
+def make_thumbnail(source: str, target: str) -> bool:
+    """Write a JPEG thumbnail of ``source`` to ``target``; False if not an image."""
+    try:
+        with Image.open(source) as image:
+            image = ImageOps.exif_transpose(image)
+            image.thumbnail(THUMBNAIL_SIZE)
+            if image.mode not in ("RGB", "L"):
+                image = image.convert("RGB")
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            partial = f"{target}.{os.getpid()}.tmp"
+            image.save(partial, "JPEG", quality=80, optimize=True)
+    except (OSError, ValueError, Image.DecompressionBombError):
+        return False
+    os.replace(partial, target)  # readers never see a half-written file
+    return True
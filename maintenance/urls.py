@@ -21,19 +21,50 @@ urlpatterns = [
     # Logs
     path("logs/", views.log_list, name="log_list"),
     path("logs/new/", views.log_create, name="log_create"),
+    path("logs/feed/", views.log_feed, name="log_feed"),
+    path("logs/steps/", views.step_search, name="step_search"),
     path("logs/<int:pk>/", views.log_detail, name="log_detail"),
     path("logs/<int:pk>/edit/", views.log_update, name="log_update"),
     path("logs/<int:pk>/delete/", views.log_delete, name="log_delete"),
+    path("logs/sync/", views.log_batch_sync, name="log_batch_sync"),
+    path("logs/<int:pk>/attachments/",
+         views.attachment_upload, name="attachment_upload"),
+    path("attachments/<int:pk>/", views.attachment_file, name="attachment_file"),
+    path("attachments/<int:pk>/thumbnail/",
+         views.attachment_thumbnail, name="attachment_thumbnail"),
+
+    # Reports
+    path("reports/", views.report_list, name="report_list"),
+    path("reports/<str:kind>/<str:period>.<str:fmt>",
+         views.report_file, name="report_file"),
+
+    # Dashboard
+    path("dashboard/", views.dashboard, name="dashboard"),
+    path("dashboard/heatmap/", views.heatmap_data, name="heatmap_data"),
+
+    # Change feed
+    path("changes/", views.change_feed, name="change_feed"),
+
+    # Alarm catalog
+    path("alarms/suggest/", views.alarm_suggest, name="alarm_suggest"),
 
     # Auth
     path("accounts/signup/", views.signup, name="signup"),
+    path("site/", views.site_select, name="site_select"),
 
     # Equipment
+    path("equipment/", views.equipment_list, name="equipment_list"),
     path("equipment/add/", views.add_equipment, name="add_equipment"),
+    path("equipment/<int:pk>/", views.equipment_detail, name="equipment_detail"),
     path("equipment/<int:pk>/delete/",
          views.equipment_delete, name="equipment_delete"),
 
+    # Offline / PWA
+    path("sw.js", views.service_worker, name="service_worker"),
+    path("manifest.webmanifest", views.web_manifest, name="web_manifest"),
+
     # Health check for Railway
     path("health/", views.health_check, name="health_check"),
+    path("health/ready", views.health_ready, name="health_ready"),
 
 ]
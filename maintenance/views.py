@@ -2,22 +2,45 @@
 Views for MaintenaTrack.
 
 - log_list: searchable, paginated list of maintenance logs.
+- log_feed: server-sent events of new/updated logs (ASGI only).
 - log_detail: detail page with steps.
+- step_search: single steps ranked against a query, highlighted (HTML or JSON).
 - log_create: create a log with inline steps (login required).
 - add_equipment: AJAX endpoint to add new equipment without admin.
+- alarm_suggest: JSON type-ahead of the site's alarm codes and names.
+- equipment_list: JSON equipment list (cached by the service worker).
+- equipment_detail: equipment page with reliability metrics and recent logs.
+- attachment_upload/attachment_file/attachment_thumbnail: log and step photos.
+- log_batch_sync: batch endpoint replaying logs queued offline.
+- report_list/report_file: stored zone reports (written by build_reports).
+- dashboard/heatmap_data: zone × hour/weekday incident heatmap and its JSON.
+- change_feed: JSON pages of log, step and equipment changes after a cursor.
+- service_worker/web_manifest: PWA plumbing for offline field use.
+- health_check/health_ready: liveness and readiness probes.
+- site_select: switch the site the session works at.
 - signup: simple user registration.
 - home/about: static pages.
 """
 
+import json
 from typing import Any, Dict
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth import login as auth_login
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.forms import UserCreationForm
-from django.core.paginator import Paginator
-from django.db.models import Q
-from django.http import HttpRequest, HttpResponse, JsonResponse
+from django.core.handlers.asgi import ASGIRequest
+from django.db import DatabaseError, router, transaction
+from django.db.models import F, Max, Prefetch, Q
+from django.http import (
+    Http404, HttpRequest, HttpResponse, JsonResponse, StreamingHttpResponse,
+)
+from django.middleware.csrf import get_token
 from django.shortcuts import get_object_or_404, redirect, render
+from django.templatetags.static import static
+from django.urls import reverse
+from django.views.decorators.cache import never_cache
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
 from django.views.decorators.http import require_http_methods
 try:
     from django_ratelimit.decorators import ratelimit
@@ -28,8 +51,36 @@ except ImportError:
             return func
         return decorator
 
+from .alarms import normalize, suggest
+from .attachments import (
+    HashingUploadHandler, blob_locks, blob_path, schedule_thumbnail, serve,
+    store_upload, thumbnail_path,
+)
+from .changefeed import MAX_PAGE_SIZE, PAGE_SIZE, CursorError, CursorExpired, feed
+from .dedup import append_steps, find_duplicates
 from .forms import MaintenanceLogForm, StepFormSet
-from .models import MaintenanceLog, Equipment
+from .health import readiness
+from .heatmap import AXES, DAY_CHOICES, DEFAULT_DAYS, heatmap
+from .livefeed import broadcaster, stream
+from .listing import LIST_FIELDS, log_page, log_rows
+from .models import Attachment, MaintenanceLog, Equipment
+from .reliability import NO_FAILURES, metrics_for
+from .offline import MAX_BATCH_SIZE, apply_batch
+from .reports import KINDS, list_reports, report_path, serve_report
+from .revisions import compare, record_revision
+from .sites import select_site
+from .stepsearch import search as search_steps
+
+# Largest primary key the databases accept (BigAutoField)
+MAX_ID = 2 ** 63 - 1
+
+
+def _int_param(value: str, default=None, maximum: int = MAX_ID):
+    """``value`` as an int in 1..maximum, or ``default`` (ASCII digits only)."""
+    if not value.isascii() or not value.isdigit():
+        return default
+    number = int(value)
+    return number if 1 <= number <= maximum else default
 
 
 @require_http_methods(["GET"])
@@ -43,7 +94,7 @@ def log_list(request: HttpRequest) -> HttpResponse:
 
     qs = (
         MaintenanceLog.objects
-        .select_related("equipment", "created_by")
+        .filter(site=request.site)
         .order_by("-created_at")
     )
 
@@ -72,8 +123,8 @@ def log_list(request: HttpRequest) -> HttpResponse:
     if my_logs == "true" and request.user.is_authenticated:
         qs = qs.filter(created_by=request.user)
 
-    paginator = Paginator(qs, 10)
-    page_obj = paginator.get_page(page_number)
+    # Only the listed columns: no descriptions, no full equipment/user rows
+    page_obj = log_page(qs, page_number)
 
     return render(request, "maintenance/log_list.html", {
         "page_obj": page_obj,
@@ -85,16 +136,75 @@ def log_list(request: HttpRequest) -> HttpResponse:
     })
 
 
+@login_required
+@require_http_methods(["GET"])
+async def log_feed(request: HttpRequest) -> HttpResponse:
+    """
+    Live feed for the current site, optionally narrowed with repeatable
+    ``zone``, ``difficulty`` and ``equipment`` parameters. Needs ASGI: under
+    WSGI each client would hold a worker, so it answers 204 (which tells
+    EventSource not to reconnect) and pages keep working without it.
+    """
+    if not isinstance(request, ASGIRequest) or request.site is None:
+        return HttpResponse(status=204)
+    if len(broadcaster) >= getattr(settings, "LIVE_FEED_MAX_SUBSCRIBERS", 1000):
+        return HttpResponse("Too many live feed clients.", status=503,
+                            headers={"Retry-After": "30"})
+
+    zones = {z.strip().upper() for z in request.GET.getlist("zone") if z.strip()}
+    difficulties = set(request.GET.getlist("difficulty")) & set(
+        MaintenanceLog.Difficulty.values)
+    equipment_ids = set(filter(None, map(_int_param, request.GET.getlist("equipment"))))
+    response = StreamingHttpResponse(
+        stream(request.site, zones, difficulties, equipment_ids,
+               request.headers.get("Last-Event-ID", "")),
+        content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"  # no proxy buffering of events
+    return response
+
+
+@require_http_methods(["GET"])
+def step_search(request: HttpRequest) -> HttpResponse:
+    """Steps matching ``q`` across action and result, best first (``format=json``)."""
+    q = request.GET.get("q", "").strip()[:200]
+    page = _int_param(request.GET.get("page", "1"), 1)
+    results = search_steps(request.site, q, page) \
+        if q and request.site else None
+    if request.GET.get("format") == "json":
+        return JsonResponse(results.as_json() if results else
+                            {"query": q, "total": 0, "page": 1,
+                             "has_next": False, "results": []})
+    return render(request, "maintenance/step_search.html", {
+        "q": q, "results": results,
+    })
+
+
 @require_http_methods(["GET"])
 def log_detail(request: HttpRequest, pk: int) -> HttpResponse:
-    """Show a single log and its related steps and metadata."""
+    """Show a single log, its steps, and its edit history (``?diff=<n>``)."""
     log = get_object_or_404(
         MaintenanceLog.objects
+        .filter(site=request.site)
         .select_related("equipment", "created_by")
-        .prefetch_related("steps"),
+        .prefetch_related(
+            "steps__attachments",
+            Prefetch("attachments",
+                     queryset=Attachment.objects.filter(step__isnull=True),
+                     to_attr="log_attachments"),
+        ),
         pk=pk,
     )
-    return render(request, "maintenance/log_detail.html", {"log": log})
+    revisions = (log.revisions.select_related("user")
+                 .defer("data").order_by("-number"))
+    diff_number = request.GET.get("diff", "")
+    # Revision numbers are PositiveIntegerFields
+    number = _int_param(diff_number, maximum=2 ** 31 - 1)
+    diff = compare(log.pk, number) if number else None
+    return render(request, "maintenance/log_detail.html", {
+        "log": log, "revisions": revisions,
+        "diff": diff, "diff_number": diff_number,
+    })
 
 
 @ratelimit(key='user', rate='10/m', method='POST', block=True)
@@ -103,44 +213,90 @@ def log_detail(request: HttpRequest, pk: int) -> HttpResponse:
 def log_create(request: HttpRequest) -> HttpResponse:
     """Create a new maintenance log with inline steps (formset)."""
     if request.method == "POST":
-        form = MaintenanceLogForm(request.POST)
+        form = MaintenanceLogForm(request.POST, site=request.site)
         formset = StepFormSet(request.POST)
 
         if form.is_valid() and formset.is_valid():
-            try:
-                log = form.save(commit=False)
-
-                # Auto-fill zone if blank
-                if not log.zone and log.equipment and log.equipment.zone:
-                    log.zone = log.equipment.zone
-
-                log.created_by = request.user
-                log.save()
-
-                # Save only non-empty steps with improved validation
-                formset.instance = log
-                saved_steps = []
-                for step_form in formset:
-                    if (step_form.cleaned_data and
-                        step_form.cleaned_data.get('action') and
-                            step_form.cleaned_data.get('action').strip()):
-                        step = step_form.save(commit=False)
-                        step.log = log
-                        if not step.order:
-                            step.order = len(saved_steps) + 1
-                        if not step.performed_by:
-                            step.performed_by = request.user
-                        step.save()
-                        saved_steps.append(step)
-
-                # Add success message
+            log = form.save(commit=False)
+
+            # Auto-fill zone if blank
+            if not log.zone and log.equipment and log.equipment.zone:
+                log.zone = log.equipment.zone
+
+            if request.POST.get("append_to"):
+                # Duplicate confirmed: add these steps to the existing log,
+                # which must still be one of the duplicates of this one
+                append_to = _int_param(request.POST["append_to"])
+                duplicates = find_duplicates(
+                    log.zone, log.alarm_code, log.equipment_id, log.description,
+                    site=request.site)
+                existing = next((match["log"] for match in duplicates
+                                 if match["log"].pk == append_to), None)
+                if existing is None:
+                    messages.error(
+                        request, '❌ That log is not a possible duplicate of this one. '
+                        'Pick one below, or save a new log.')
+                    return render(request, "maintenance/log_form.html", {
+                        "form": form, "formset": formset, "duplicates": duplicates,
+                    })
+                with transaction.atomic(using=existing._state.db):
+                    record_revision(existing.pk)
+                    added = append_steps(existing, [
+                        f.cleaned_data for f in formset if f.cleaned_data
+                    ], request.user)
+                    record_revision(existing.pk, request.user)
                 messages.success(
-                    request, f'✅ Log "{log.alarm_code}" saved successfully with {len(saved_steps)} steps!')
-                return redirect('maintenance:log_detail', pk=log.pk)
-
-            except Exception as e:
-                messages.error(request, f'❌ Error saving log: {str(e)}')
-                # Re-populate form with submitted data
+                    request, f'✅ Added {added} steps to existing log "{existing.alarm_code}".')
+                return redirect('maintenance:log_detail', pk=existing.pk)
+
+            if not request.POST.get("confirm_new"):
+                duplicates = find_duplicates(
+                    log.zone, log.alarm_code, log.equipment_id, log.description,
+                    site=request.site)
+                if duplicates:
+                    messages.warning(
+                        request, '⚠️ This looks like an incident that was already logged. '
+                        'Append your steps to it, or save a new log anyway.')
+                    return render(request, "maintenance/log_form.html", {
+                        "form": form, "formset": formset, "duplicates": duplicates,
+                    })
+
+            log.site = request.site
+            log.created_by = request.user
+            try:
+                # The log, its steps and first revision commit together with
+                # the change feed and outbox rows their signals write
+                with transaction.atomic(using=router.db_for_write(MaintenanceLog)):
+                    log.save()
+
+                    # Save only non-empty steps with improved validation
+                    formset.instance = log
+                    saved_steps = []
+                    for step_form in formset:
+                        if (step_form.cleaned_data and
+                            step_form.cleaned_data.get('action') and
+                                step_form.cleaned_data.get('action').strip()):
+                            step = step_form.save(commit=False)
+                            step.log = log
+                            if not step.order:
+                                step.order = len(saved_steps) + 1
+                            if not step.performed_by:
+                                step.performed_by = request.user
+                            step.save()
+                            saved_steps.append(step)
+                    record_revision(log.pk, request.user)
+            except DatabaseError as e:
+                # Rolled back: nothing was saved, so the form can be resent
+                log.pk, log._state.adding = None, True
+                messages.error(request, f'❌ Error saving log, nothing was saved: {str(e)}')
+                return render(request, "maintenance/log_form.html", {
+                    "form": form, "formset": formset
+                }, status=500)
+
+            # Add success message
+            messages.success(
+                request, f'✅ Log "{log.alarm_code}" saved successfully with {len(saved_steps)} steps!')
+            return redirect('maintenance:log_detail', pk=log.pk)
         else:
             # Handle form validation errors
             error_messages = []
@@ -157,7 +313,7 @@ def log_create(request: HttpRequest) -> HttpResponse:
                     request, f'❌ Please fix the following errors: {"; ".join(error_messages)}')
 
     else:
-        form = MaintenanceLogForm()
+        form = MaintenanceLogForm(site=request.site)
         formset = StepFormSet()
 
     return render(request, "maintenance/log_form.html", {
@@ -206,12 +362,15 @@ def add_equipment(request: HttpRequest) -> HttpResponse:
             max_num = max(max_num, int(match.group(1)))
 
     try:
-        equipment = Equipment.objects.create(
-            name=name,
-            asset_tag=f"AUTO-{max_num + 1}",  # unique asset tag
-            zone=zone,  # use provided zone
-            status=Equipment.Status.ACTIVE,
-        )
+        # Rolled back with its change feed row if the insert fails
+        with transaction.atomic(using=router.db_for_write(Equipment)):
+            equipment = Equipment.objects.create(
+                site=request.site,
+                name=name,
+                asset_tag=f"AUTO-{max_num + 1}",  # unique asset tag
+                zone=zone,  # use provided zone
+                status=Equipment.Status.ACTIVE,
+            )
         return JsonResponse({
             "id": equipment.id,
             "name": equipment.name,
@@ -220,7 +379,8 @@ def add_equipment(request: HttpRequest) -> HttpResponse:
     except IntegrityError:
         # Equipment with this name and zone already exists
         # Return the existing equipment instead
-        equipment = Equipment.objects.filter(name=name, zone=zone).first()
+        equipment = Equipment.objects.filter(
+            site=request.site, name=name, zone=zone).first()
         if equipment:
             return JsonResponse({
                 "id": equipment.id,
@@ -234,6 +394,276 @@ def add_equipment(request: HttpRequest) -> HttpResponse:
             }, status=400)
 
 
+@login_required
+@require_http_methods(["GET"])
+def equipment_list(request: HttpRequest) -> HttpResponse:
+    """JSON list of equipment for offline pickers (cached by the service worker)."""
+    equipment = Equipment.objects.filter(site=request.site).exclude(
+        status=Equipment.Status.RETIRED
+    ).values("id", "name", "zone", "asset_tag")
+    return JsonResponse({"equipment": list(equipment)})
+
+
+@require_http_methods(["GET"])
+def equipment_detail(request: HttpRequest, pk: int) -> HttpResponse:
+    """One piece of equipment: its reliability next to its zone's, and its logs."""
+    equipment = get_object_or_404(
+        Equipment.objects.filter(site=request.site), pk=pk)
+    metrics = metrics_for(request.site)
+    logs = log_rows(
+        MaintenanceLog.objects
+        .filter(site=request.site, equipment=equipment)
+        .order_by("-created_at")[:10]
+        .values(*LIST_FIELDS)
+    )
+    return render(request, "maintenance/equipment_detail.html", {
+        "equipment": equipment,
+        "rows": [
+            ("This equipment", metrics["equipment"].get(equipment.pk, NO_FAILURES)),
+            (f"Zone {equipment.zone}", metrics["zones"].get(equipment.zone, NO_FAILURES)),
+        ],
+        "since": metrics["since"],
+        "computed_at": metrics["computed_at"],
+        "logs": logs,
+    })
+
+
+@login_required
+@require_http_methods(["GET"])
+def alarm_suggest(request: HttpRequest) -> HttpResponse:
+    """Alarm codes whose code or name starts with ``q``, most logged first."""
+    q = request.GET.get("q", "").strip()[:50]
+    if not q or request.site is None:
+        return JsonResponse({"suggestions": []})
+    return JsonResponse({"suggestions": suggest(request.site, q)})
+
+
+@ratelimit(key='user', rate='30/m', method='POST', block=True)
+@login_required
+@require_http_methods(["GET", "POST"])
+def log_batch_sync(request: HttpRequest) -> HttpResponse:
+    """
+    Replay logs queued offline.
+    GET hands the client a fresh CSRF token; POST takes
+    {"logs": [{"idempotency_key": ..., <log fields>, "steps": [...]}, ...]}
+    and answers with one result per item in the same order.
+    """
+    if request.method == "GET":
+        return JsonResponse({"csrfToken": get_token(request),
+                             "maxBatchSize": MAX_BATCH_SIZE})
+
+    try:
+        payload = json.loads(request.body or b"{}")
+    except ValueError:
+        return JsonResponse({"error": "Body must be JSON."}, status=400)
+
+    items = payload.get("logs") if isinstance(payload, dict) else None
+    if not isinstance(items, list) or not all(isinstance(i, dict) for i in items):
+        return JsonResponse({"error": "'logs' must be a list of objects."}, status=400)
+    if len(items) > MAX_BATCH_SIZE:
+        return JsonResponse(
+            {"error": f"At most {MAX_BATCH_SIZE} logs per batch."}, status=400)
+
+    return JsonResponse({"results": apply_batch(request.user, items, request.site)})
+
+
+@csrf_exempt  # CSRF is checked in _store_attachments, after the upload handler is set
+@ratelimit(key='user', rate='20/m', method='POST', block=True)
+@login_required
+@require_http_methods(["POST"])
+def attachment_upload(request: HttpRequest, pk: int) -> HttpResponse:
+    """Attach photos/files to a log, or to one of its steps (``step`` field)."""
+    handler = HashingUploadHandler(request)
+    request.upload_handlers = [handler]
+    try:
+        return _store_attachments(request, pk, handler)
+    finally:
+        handler.cleanup()  # uploads rejected by CSRF, validation or errors
+
+
+@csrf_protect
+def _store_attachments(request: HttpRequest, pk: int,
+                       handler: HashingUploadHandler) -> HttpResponse:
+    log = get_object_or_404(
+        MaintenanceLog.objects.filter(site=request.site), pk=pk)
+    step_id = _int_param(request.POST.get("step", ""))
+    step = log.steps.filter(pk=step_id).first() if step_id else None
+
+    uploads = request.FILES.getlist("files")
+    # Held until the attachments have committed: until then a deletion
+    # would find no reference to content they reuse
+    with blob_locks(upload.sha256 for upload in uploads), \
+            transaction.atomic(using=log._state.db):
+        for upload in uploads:
+            sha256 = store_upload(upload)
+            Attachment.objects.create(
+                log=log, step=step, sha256=sha256, size=upload.size,
+                content_type=upload.content_type,
+                original_name=(upload.name or "upload")[:255],
+                uploaded_by=request.user,
+            )
+            schedule_thumbnail(sha256, upload.content_type, using=log._state.db)
+
+    for error in handler.rejected:
+        messages.error(request, f"❌ Not attached: {error}")
+    if uploads:
+        messages.success(request, f"✅ Attached {len(uploads)} file(s).")
+    return redirect(reverse("maintenance:log_detail", args=[log.pk]) + "#attachments")
+
+
+@require_http_methods(["GET", "HEAD"])
+def attachment_file(request: HttpRequest, pk: int) -> HttpResponse:
+    """The attached file, with Range support and long-lived caching."""
+    attachment = get_object_or_404(
+        Attachment.objects.filter(log__site=request.site), pk=pk)
+    path = blob_path(attachment.sha256)
+    if not path.exists():
+        raise Http404("Attachment file is missing.")
+    return serve(request, path, attachment.content_type,
+                 f'"{attachment.sha256}"', attachment.original_name)
+
+
+@require_http_methods(["GET", "HEAD"])
+def attachment_thumbnail(request: HttpRequest, pk: int) -> HttpResponse:
+    """JPEG thumbnail of an image attachment (404 until it has been rendered)."""
+    attachment = get_object_or_404(
+        Attachment.objects.filter(log__site=request.site), pk=pk)
+    path = thumbnail_path(attachment.sha256)
+    if not path.exists():
+        raise Http404("Thumbnail not ready.")
+    return serve(request, path, "image/jpeg", f'"{attachment.sha256}-thumb"')
+
+
+@login_required
+@require_http_methods(["GET"])
+def report_list(request: HttpRequest) -> HttpResponse:
+    """Stored shift and weekly reports of the current site, newest first."""
+    return render(request, "maintenance/report_list.html", {
+        "reports": [(kind, list_reports(request.site, kind)[:30])
+                    for kind in KINDS] if request.site else [],
+    })
+
+
+@login_required
+@require_http_methods(["GET"])
+def dashboard(request: HttpRequest) -> HttpResponse:
+    """Incident heatmap page; static/maintenance/js/heatmap.js draws it."""
+    return render(request, "maintenance/dashboard.html", {
+        "axes": list(AXES), "day_choices": DAY_CHOICES, "default_days": DEFAULT_DAYS,
+        "difficulties": MaintenanceLog.Difficulty.values,
+    })
+
+
+@login_required
+@require_http_methods(["GET"])
+def heatmap_data(request: HttpRequest) -> HttpResponse:
+    """
+    Logs per zone and hour of day (``axis=hour``), day of week (``weekday``)
+    or both (``week``) as {"zones": [...], "columns": [...], "counts": [[...]]},
+    filtered by ``days``, ``difficulty`` and ``alarm_code``.
+    """
+    axis = request.GET.get("axis", "hour")
+    days = _int_param(request.GET.get("days", str(DEFAULT_DAYS)))
+    difficulty = request.GET.get("difficulty", "")
+    if axis not in AXES:
+        return JsonResponse(
+            {"error": f"axis must be one of {', '.join(AXES)}."}, status=400)
+    if days not in DAY_CHOICES:
+        return JsonResponse(
+            {"error": f"days must be one of {', '.join(map(str, DAY_CHOICES))}."},
+            status=400)
+    if difficulty and difficulty not in MaintenanceLog.Difficulty.values:
+        return JsonResponse({"error": "Unknown difficulty."}, status=400)
+    if request.site is None:
+        raise Http404("No site selected.")
+    alarm_code = normalize(request.GET.get("alarm_code", ""))[:50]
+    return JsonResponse(heatmap(request.site, axis, days, difficulty, alarm_code))
+
+
+@login_required
+@require_http_methods(["GET"])
+def change_feed(request: HttpRequest) -> HttpResponse:
+    """
+    Up to ``limit`` changes after ``cursor`` (from the start without one) as
+    {"changes": [...], "cursor": "...", "has_more": bool}. Pass the returned
+    cursor to read on; 410 means it is too old and the feed must be read
+    again from the start.
+    """
+    limit = _int_param(request.GET.get("limit", str(PAGE_SIZE)), maximum=MAX_PAGE_SIZE)
+    if limit is None:
+        return JsonResponse(
+            {"error": f"limit must be between 1 and {MAX_PAGE_SIZE}."}, status=400)
+    if request.site is None:
+        raise Http404("No site selected.")
+    try:
+        page = feed(request.site, request.GET.get("cursor", ""), limit)
+    except CursorExpired as exc:
+        return JsonResponse({"error": str(exc)}, status=410)
+    except CursorError as exc:
+        return JsonResponse({"error": str(exc)}, status=400)
+    return JsonResponse(page)
+
+
+@login_required
+@require_http_methods(["GET", "HEAD"])
+def report_file(request: HttpRequest, kind: str, period: str, fmt: str) -> HttpResponse:
+    """One stored report (``period`` may be ``latest``) as HTML or CSV."""
+    path = report_path(request.site, kind, period, fmt) if request.site else None
+    if path is None:
+        raise Http404("Report not found.")
+    return serve_report(request, path, fmt)
+
+
+@never_cache
+@require_http_methods(["GET"])
+def service_worker(request: HttpRequest) -> HttpResponse:
+    """Service worker script, served from the site root so it controls every page."""
+    response = render(request, "maintenance/sw.js", {
+        "shell_urls": [
+            reverse("maintenance:home"),
+            reverse("maintenance:log_list"),
+            reverse("maintenance:log_create"),
+            static("maintenance/css/base.css"),
+            static("maintenance/js/offline.js"),
+            static("maintenance/js/log_form.js"),
+            static("maintenance/img/product.png"),
+        ],
+        "equipment_url": reverse("maintenance:equipment_list"),
+        "static_prefix": static(""),
+    }, content_type="application/javascript")
+    response["Service-Worker-Allowed"] = "/"
+    return response
+
+
+@require_http_methods(["GET"])
+def web_manifest(request: HttpRequest) -> HttpResponse:
+    """Web app manifest so technicians can install MaintenaTrack on devices."""
+    return JsonResponse({
+        "name": "MaintenaTrack",
+        "short_name": "MaintenaTrack",
+        "start_url": reverse("maintenance:log_list"),
+        "scope": "/",
+        "display": "standalone",
+        "background_color": "#f6f7f8",
+        "theme_color": "#e4002b",
+        "icons": [{
+            "src": static("maintenance/img/product.png"),
+            "sizes": "1237x908",
+            "type": "image/png",
+        }],
+    }, content_type="application/manifest+json")
+
+
+@login_required
+@require_http_methods(["POST"])
+def site_select(request: HttpRequest) -> HttpResponse:
+    """Switch the site this session works at (the site picker in the nav)."""
+    site = select_site(request, request.POST.get("site", ""))
+    if site is None:
+        messages.error(request, "You don't have access to that site.")
+    return redirect("maintenance:log_list")
+
+
 @ratelimit(key='ip', rate='5/m', method='POST', block=True)
 @require_http_methods(["GET", "POST"])
 def signup(request: HttpRequest) -> HttpResponse:
@@ -262,11 +692,57 @@ def about(request: HttpRequest) -> HttpResponse:
     return render(request, "maintenance/about.html")
 
 
+def _save_step_changes(log: MaintenanceLog, formset, user) -> list:
+    """
+    Apply the step formset in place, keeping step ids stable for the revision
+    history: existing steps are updated, steps whose action was cleared are
+    deleted, new ones are added. Returns the steps the log now has.
+    """
+    kept, removed = [], []
+    for step_form in formset:
+        data = step_form.cleaned_data
+        if not data:
+            continue
+        if not (data.get('action') or '').strip() or data.get('DELETE', False):
+            if step_form.instance.pk:
+                removed.append(step_form.instance.pk)
+            continue
+        kept.append(step_form)
+
+    # Delete one by one so the counter signals fire
+    for step in log.steps.filter(pk__in=removed):
+        step.delete()
+
+    # Park reordered steps out of range so swapped orders don't collide
+    moved = [f.instance.pk for f in kept
+             if f.instance.pk and 'order' in f.changed_data]
+    log.steps.filter(pk__in=moved).update(order=F('order') + 10000)
+
+    next_order = (log.steps.exclude(pk__in=moved)
+                  .aggregate(last=Max('order'))['last'] or 0) + 1
+    saved_steps = []
+    for step_form in kept:
+        step = step_form.save(commit=False)
+        if step.pk and not step_form.has_changed():
+            saved_steps.append(step)
+            continue
+        step.log = log
+        if not step.order:
+            step.order = next_order
+            next_order += 1
+        if not step.performed_by:
+            step.performed_by = user
+        step.save()
+        saved_steps.append(step)
+    return saved_steps
+
+
 @login_required
 @require_http_methods(["GET", "POST"])
 def log_update(request: HttpRequest, pk: int) -> HttpResponse:
     """Update a maintenance log - only by the creator."""
-    log = get_object_or_404(MaintenanceLog, pk=pk)
+    log = get_object_or_404(
+        MaintenanceLog.objects.filter(site=request.site), pk=pk)
 
     # Check if user is the creator
     if log.created_by != request.user:
@@ -274,30 +750,16 @@ def log_update(request: HttpRequest, pk: int) -> HttpResponse:
         return redirect("maintenance:log_detail", pk=pk)
 
     if request.method == "POST":
-        form = MaintenanceLogForm(request.POST, instance=log)
+        form = MaintenanceLogForm(request.POST, instance=log, site=request.site)
         formset = StepFormSet(request.POST, instance=log)
 
         if form.is_valid() and formset.is_valid():
-            log = form.save()
-
-            # Clear existing steps to avoid constraint violations
-            log.steps.all().delete()
-
-            # Save new steps
-            saved_steps = []
-            for step_form in formset:
-                if (step_form.cleaned_data and
-                    step_form.cleaned_data.get('action') and
-                        step_form.cleaned_data.get('action').strip() and
-                        not step_form.cleaned_data.get('DELETE', False)):
-                    step = step_form.save(commit=False)
-                    step.log = log
-                    if not step.order:
-                        step.order = len(saved_steps) + 1
-                    if not step.performed_by:
-                        step.performed_by = request.user
-                    step.save()
-                    saved_steps.append(step)
+            with transaction.atomic(using=log._state.db):
+                # Capture any edits made outside the app before this one
+                record_revision(log.pk)
+                log = form.save()
+                saved_steps = _save_step_changes(log, formset, request.user)
+                record_revision(log.pk, request.user)
 
             messages.success(
                 request, f"Maintenance log '{log.alarm_code}' updated successfully with {len(saved_steps)} step(s).")
@@ -331,7 +793,7 @@ def log_update(request: HttpRequest, pk: int) -> HttpResponse:
             messages.warning(
                 request, "Please correct the errors below and try submitting again.")
     else:
-        form = MaintenanceLogForm(instance=log)
+        form = MaintenanceLogForm(instance=log, site=request.site)
         formset = StepFormSet(instance=log)
 
     return render(request, "maintenance/log_form.html", {
@@ -346,7 +808,8 @@ def log_update(request: HttpRequest, pk: int) -> HttpResponse:
 @require_http_methods(["GET", "POST"])
 def log_delete(request: HttpRequest, pk: int) -> HttpResponse:
     """Delete a maintenance log - only by the creator."""
-    log = get_object_or_404(MaintenanceLog, pk=pk)
+    log = get_object_or_404(
+        MaintenanceLog.objects.filter(site=request.site), pk=pk)
 
     # Check if user is the creator
     if log.created_by != request.user:
@@ -365,7 +828,8 @@ def log_delete(request: HttpRequest, pk: int) -> HttpResponse:
 @require_http_methods(["POST"])
 def equipment_delete(request: HttpRequest, pk: int) -> HttpResponse:
     """Delete equipment - only by users who created logs with it."""
-    equipment = get_object_or_404(Equipment, pk=pk)
+    equipment = get_object_or_404(
+        Equipment.objects.filter(site=request.site), pk=pk)
 
     # Check if user has any logs with this equipment
     user_logs_with_equipment = MaintenanceLog.objects.filter(
@@ -388,15 +852,23 @@ def equipment_delete(request: HttpRequest, pk: int) -> HttpResponse:
             request, "Cannot delete equipment that other users have logged with.")
         return redirect("maintenance:log_list")
 
+    equipment.delete()
+    messages.success(
+        request, f"Equipment '{equipment.name}' deleted successfully.")
+    return redirect("maintenance:log_list")
+
 
 @require_http_methods(["GET"])
 def health_check(request: HttpRequest) -> HttpResponse:
     """Simple health check endpoint for Railway."""
     return HttpResponse("OK", content_type='text/plain')
 
-    equipment.delete()
-    messages.success(
-        request, f"Equipment '{equipment.name}' deleted successfully.")
-    return redirect("maintenance:log_list")
+
+@never_cache
+@require_http_methods(["GET"])
+def health_ready(request: HttpRequest) -> JsonResponse:
+    """Readiness: 200 when DB, cache, migrations and disk are healthy, else 503."""
+    report = readiness()
+    return JsonResponse(report, status=200 if report["ready"] else 503)
 
 
@@ -3,6 +3,17 @@ ASGI config for maintenatrack project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+The live log feed (/logs/feed/) streams server-sent events and only works
+under ASGI; under WSGI it answers 204 and the log list works without it.
+Serve it with uvicorn, either for the whole site or as a second process
+that the proxy routes /logs/feed/ to (the rest stays on gunicorn/WSGI,
+which runs the synchronous views on more threads):
+
+    uvicorn maintenatrack.asgi:application --host 0.0.0.0 --port 8001
+
+With several ASGI workers, keep LIVE_FEED_POLL_SECONDS > 0 so each worker
+also sees logs saved by the others.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
@@ -39,10 +39,14 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
+    "maintenance.middleware.AccessLogMiddleware",
+    "maintenance.middleware.ReplicaRoutingMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
-    "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "maintenance.middleware.CachedAuthenticationMiddleware",
+    "maintenance.middleware.SiteMiddleware",
+    "maintenance.middleware.ProfilingMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -59,6 +63,7 @@ TEMPLATES = [
                 "django.template.context_processors.request",
                 "django.contrib.auth.context_processors.auth",
                 "django.contrib.messages.context_processors.messages",
+                "maintenance.context_processors.site",
             ],
         },
     },
@@ -89,6 +94,132 @@ else:
         }
     }
 
+# Optional read replica (e.g. a Postgres streaming replica, or a second SQLite
+# file locally: sqlite:////abs/path/replica.sqlite3). Reads from read-only
+# requests go there; see maintenance.routers / maintenance.middleware.
+DATABASE_REPLICA_URL = os.environ.get('DATABASE_REPLICA_URL')
+
+if DATABASE_REPLICA_URL:
+    DATABASES['replica'] = dj_database_url.parse(DATABASE_REPLICA_URL)
+    # Tests run against one database; the replica mirrors it
+    DATABASES['replica']['TEST'] = {'MIRROR': 'default'}
+
+# Optional per-site databases: "code=url,code=url" adds a "site_<code>"
+# alias per entry (e.g. plant-b=sqlite:////abs/path/plant-b.sqlite3 locally).
+# A Site whose database field names the alias keeps its equipment and logs
+# there; see maintenance.sites and maintenance.routers.SiteRouter.
+SITE_DATABASE_URLS = os.environ.get('SITE_DATABASE_URLS', '')
+for entry in filter(None, (e.strip() for e in SITE_DATABASE_URLS.split(','))):
+    code, _, url = entry.partition('=')
+    DATABASES[f'site_{code.strip()}'] = dj_database_url.parse(url.strip())
+
+DATABASE_ROUTERS = [
+    "maintenance.routers.SiteRouter",
+    "maintenance.routers.ReplicaRouter",
+]
+
+# Site used when a user belongs to none (created by migration 0011), and
+# seconds the site list is cached (site and membership changes still reach
+# every worker at once: the cache is keyed by a shared version stamp)
+DEFAULT_SITE_CODE = os.environ.get('DEFAULT_SITE_CODE', 'main')
+SITE_CACHE_TTL = int(os.environ.get('SITE_CACHE_TTL', '300'))
+
+# Seconds a user's reads stay on the primary after they write
+REPLICA_STICKY_SECONDS = int(os.environ.get('REPLICA_STICKY_SECONDS', '5'))
+
+# Caches. Rate-limit counters must be shared by every Gunicorn worker, so
+# django-ratelimit uses a database-backed counter store instead of the
+# per-process LocMem default.
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "ratelimit": {
+        "BACKEND": "maintenance.cache.CounterCache",
+    },
+    # Version stamps of per-process caches (maintenance.cache.current_version),
+    # shared so an invalidation reaches every worker
+    "versions": {
+        "BACKEND": "maintenance.cache.CounterCache",
+    },
+}
+RATELIMIT_USE_CACHE = "ratelimit"
+VERSION_STAMP_CACHE = "versions"
+
+# Optional shared cache (needs the `redis` package). Without it the default
+# cache is per process: fine for one worker, but with several Gunicorn
+# workers cached_db sessions and the user cache below only stay coherent
+# through a shared cache.
+REDIS_URL = os.environ.get('REDIS_URL')
+if REDIS_URL:
+    CACHES["default"] = {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": REDIS_URL,
+    }
+
+# Session storage: "db" (Django's default), "cached_db" (reads from the
+# cache, writes through to the DB) or "signed_cookies" (no server-side
+# storage; the session is readable by the client and logging out cannot
+# revoke a copied cookie).
+SESSION_MODE = os.environ.get('SESSION_MODE', 'db')
+SESSION_ENGINE = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}[SESSION_MODE]
+
+# Seconds the authenticated User is cached (maintenance.auth); 0 disables.
+# Off unless the cache is shared: with per-process LocMem a deactivated or
+# demoted user would keep access on the other workers for the TTL.
+AUTH_USER_CACHE = "default"
+AUTH_USER_CACHE_TTL = int(os.environ.get('AUTH_USER_CACHE_TTL',
+                                         '30' if REDIS_URL else '0'))
+
+# /health/ready: seconds probe results are reused, and the free space below
+# which the logs/ volume is reported as not ready
+HEALTH_PROBE_TTL = int(os.environ.get('HEALTH_PROBE_TTL', '5'))
+HEALTH_MIN_FREE_DISK_MB = int(os.environ.get('HEALTH_MIN_FREE_DISK_MB', '100'))
+
+# Live feed (/logs/feed/, ASGI only): seconds between database polls that
+# pick up other workers' changes (0 with a single worker: saves in this
+# process are pushed directly), and the most clients one worker serves
+LIVE_FEED_POLL_SECONDS = float(os.environ.get('LIVE_FEED_POLL_SECONDS', '2'))
+LIVE_FEED_MAX_SUBSCRIBERS = int(os.environ.get('LIVE_FEED_MAX_SUBSCRIBERS', '1000'))
+
+# Seconds each worker keeps its in-memory alarm type-ahead index before
+# rebuilding it (edits to the catalog rebuild it at once)
+ALARM_INDEX_TTL = int(os.environ.get('ALARM_INDEX_TTL', '300'))
+
+# Zone reports (manage.py build_reports): shift start times (local), hours of
+# recent shifts recomputed on every run, and top alarms listed per zone
+REPORT_SHIFT_STARTS = [
+    s.strip() for s in os.environ.get('REPORT_SHIFT_STARTS', '06:00,14:00,22:00').split(',')
+    if s.strip()
+]
+REPORT_LOOKBACK_HOURS = int(os.environ.get('REPORT_LOOKBACK_HOURS', '48'))
+REPORT_TOP_ALARMS = int(os.environ.get('REPORT_TOP_ALARMS', '5'))
+
+# Reliability metrics (equipment page, admin): days of logs they cover and
+# seconds a site's computed metrics stay cached (new logs drop them at once)
+RELIABILITY_WINDOW_DAYS = int(os.environ.get('RELIABILITY_WINDOW_DAYS', '180'))
+RELIABILITY_CACHE_TTL = int(os.environ.get('RELIABILITY_CACHE_TTL', '900'))
+
+# Seconds a heatmap (dashboard) stays cached per filter; new logs drop it at once
+HEATMAP_CACHE_TTL = int(os.environ.get('HEATMAP_CACHE_TTL', '300'))
+
+# Change feed (api/changes/): days tombstones are kept (older cursors must
+# read the feed again from the start)
+CHANGE_FEED_TOMBSTONE_DAYS = int(os.environ.get('CHANGE_FEED_TOMBSTONE_DAYS', '30'))
+
+# Webhooks (manage.py deliver_webhooks): seconds a request may take, requests
+# an event gets before it is given up, the first retry delay (doubling, with
+# jitter, up to the maximum) and days delivered events are kept
+WEBHOOK_TIMEOUT_SECONDS = int(os.environ.get('WEBHOOK_TIMEOUT_SECONDS', '10'))
+WEBHOOK_MAX_ATTEMPTS = int(os.environ.get('WEBHOOK_MAX_ATTEMPTS', '10'))
+WEBHOOK_BACKOFF_SECONDS = int(os.environ.get('WEBHOOK_BACKOFF_SECONDS', '30'))
+WEBHOOK_BACKOFF_MAX_SECONDS = int(os.environ.get('WEBHOOK_BACKOFF_MAX_SECONDS', '3600'))
+WEBHOOK_RETENTION_DAYS = int(os.environ.get('WEBHOOK_RETENTION_DAYS', '7'))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -133,8 +264,74 @@ STATIC_URL = "static/"
 # <— where collectstatic will gather files
 STATIC_ROOT = BASE_DIR / "staticfiles"
 
+# Hashed + gzip/Brotli pre-compressed static files. WhiteNoise serves hashed
+# names with "Cache-Control: max-age=315360000, public, immutable".
+STORAGES = {
+    "default": {
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+    },
+    "staticfiles": {
+        "BACKEND": "maintenance.storage.MinifiedManifestStaticFilesStorage",
+    },
+}
+# Missing manifest entries fall back to unhashed names instead of a 500
+WHITENOISE_MANIFEST_STRICT = False
+
+# Uploaded attachments (maintenance.attachments), stored by content hash and
+# served by the app itself (Range requests, immutable caching)
+MEDIA_ROOT = os.environ.get('MEDIA_ROOT', BASE_DIR / 'media')
+ATTACHMENT_MAX_BYTES = int(os.environ.get('ATTACHMENT_MAX_MB', '10')) * 1024 * 1024
+ATTACHMENT_THUMBNAIL_WORKERS = int(os.environ.get('ATTACHMENT_THUMBNAIL_WORKERS', '2'))
+
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
+
+# Logging: JSON lines written by a background thread (QueueHandler ->
+# QueueListener) to a rotated file, so slow disks never stall requests.
+# Each running process (Gunicorn worker, command) holds a slot and writes its
+# own logs/django.<slot>.log: rotating one file from several processes loses
+# records. Slots are reused, so recycled workers add no files.
+# AccessLogMiddleware adds one record per request to maintenance.access.
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'json': {
+            '()': 'maintenance.structured_logging.JsonFormatter',
+        },
+    },
+    'handlers': {
+        'file': {
+            'level': 'INFO',
+            'class': 'maintenance.structured_logging.QueuedFileHandler',
+            'filename': BASE_DIR / 'logs' / 'django.log',
+            'maxBytes': 10 * 1024 * 1024,
+            'backupCount': 5,
+            'formatter': 'json',
+        },
+        'console': {
+            'level': 'INFO',
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'django': {
+            'handlers': ['file', 'console'],
+            'level': 'WARNING',
+            'propagate': True,
+        },
+        'maintenance': {
+            'handlers': ['file', 'console'],
+            'level': 'INFO',
+            'propagate': True,
+        },
+        'maintenance.access': {
+            'handlers': ['file'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
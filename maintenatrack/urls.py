@@ -3,7 +3,13 @@ from django.contrib import admin
 from django.urls import path
 from django.urls import path, include 
 
+from maintenance.admin import profile_detail_view, profile_list_view
+
 urlpatterns = [
+    path("admin/profiles/", admin.site.admin_view(profile_list_view),
+         name="admin_profiles"),
+    path("admin/profiles/<str:profile_id>/",
+         admin.site.admin_view(profile_detail_view), name="admin_profile_detail"),
     path("admin/", admin.site.urls),
     path("accounts/", include("django.contrib.auth.urls")),  # login/logout/password views
     path("", include("maintenance.urls", namespace="maintenance")),